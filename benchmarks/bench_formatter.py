@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Formatter micro-benchmarks for xiayan-mcp.
+
+Times MarkdownFormatter.format, format_markdown_for_wechat, _apply_theme,
+_clean_html_for_wechat and EncodingUtils.fix_encoding over the generated
+corpus (see corpus.py). Each benchmark is measured the way pyperf does it:
+the loop count is calibrated so one value takes at least ``--min-time``,
+warmup values are discarded and mean/stdev/median are reported over
+``--values`` samples. Per-call setup (e.g. parsing a fresh soup for
+_clean_html_for_wechat) is excluded from the timings.
+
+Usage:
+    python benchmarks/bench_formatter.py
+    python benchmarks/bench_formatter.py --bench format --docs typical large
+    python benchmarks/bench_formatter.py --output formatter.json
+    python benchmarks/bench_formatter.py --compare formatter.json --threshold 0.1
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import frontmatter
+from bs4 import BeautifulSoup
+
+from corpus import CORPUS_SIZES, DEFAULT_SEED, build_corpus, make_corrupted
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.utils.encoding import EncodingUtils
+
+BENCHMARKS = (
+    'format',
+    'format_markdown_for_wechat',
+    '_apply_theme',
+    '_clean_html_for_wechat',
+    'fix_encoding',
+    'fix_encoding_corrupted',
+)
+
+
+def measure(func: Callable, setup: Optional[Callable] = None, values: int = 10,
+            warmups: int = 1, min_time: float = 0.1) -> Dict:
+    """
+    Time ``func`` pyperf-style.
+
+    Args:
+        func: Function to benchmark; called with the value returned by ``setup``
+        setup: Optional per-call setup whose cost is not measured
+        values: Number of samples to keep
+        warmups: Number of samples to discard first
+        min_time: Minimum duration of one sample in seconds
+
+    Returns:
+        Dictionary with loops, mean, stdev, median, min (seconds per call) and values
+    """
+    def sample(loops: int) -> float:
+        elapsed = 0.0
+        if setup is None:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            elapsed = time.perf_counter() - start
+        else:
+            for _ in range(loops):
+                arg = setup()
+                start = time.perf_counter()
+                func(arg)
+                elapsed += time.perf_counter() - start
+        return elapsed / loops
+
+    # 校准循环次数，使每个样本至少持续min_time
+    loops = 1
+    while True:
+        per_call = sample(loops)
+        if per_call * loops >= min_time or loops >= 1 << 20:
+            break
+        loops = max(loops * 2, math.ceil(min_time / max(per_call, 1e-9)))
+
+    for _ in range(warmups):
+        sample(loops)
+    samples = [sample(loops) for _ in range(values)]
+    return {
+        'loops': loops,
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'values': samples,
+    }
+
+
+def build_benchmarks(formatter: MarkdownFormatter, corpus: Dict[str, str],
+                     theme_id: str) -> Dict[str, Dict]:
+    """Return ``{name: {'func', 'setup', 'bytes'}}`` for every benchmark and document."""
+    theme = formatter.theme_manager.get_theme(theme_id)
+    benchmarks = {}
+    for doc, content in corpus.items():
+        body = frontmatter.loads(content).content
+        html_content = formatter.md.reset().convert(body)
+        corrupted = make_corrupted(content)
+        size = len(content.encode('utf-8'))
+
+        benchmarks[f"format/{doc}"] = {
+            'func': lambda c=content: formatter.format(c, theme_id), 'bytes': size}
+        benchmarks[f"format_markdown_for_wechat/{doc}"] = {
+            'func': lambda c=content: formatter.format_markdown_for_wechat(c), 'bytes': size}
+        benchmarks[f"_apply_theme/{doc}"] = {
+            'func': lambda h=html_content: formatter._apply_theme(h, theme), 'bytes': size}
+        benchmarks[f"_clean_html_for_wechat/{doc}"] = {
+            'func': formatter._clean_html_for_wechat,
+            'setup': lambda h=html_content: BeautifulSoup(h, 'html.parser'),
+            'bytes': size}
+        benchmarks[f"fix_encoding/{doc}"] = {
+            'func': lambda c=content: EncodingUtils.fix_encoding(c), 'bytes': size}
+        benchmarks[f"fix_encoding_corrupted/{doc}"] = {
+            'func': lambda c=corrupted: EncodingUtils.fix_encoding(c), 'bytes': size}
+    return benchmarks
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Compare medians with a previous run; return messages for slowdowns beyond ``threshold``."""
+    previous = baseline.get('benchmarks', {})
+    failures = []
+    print(f"\nComparison with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        before = previous[name]['median']
+        after = result['median']
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ slower"
+            failures.append(f"{name} 变慢 {change:.1%}（{_format_time(before)} -> {_format_time(after)}）")
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"  {name:44s} {_format_time(before):>10s} -> {_format_time(after):>10s} ({change:+.1%}){flag}")
+    return failures
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark the Markdown formatter and encoding utilities")
+    parser.add_argument('--bench', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help='Benchmarks to run')
+    parser.add_argument('--docs', nargs='+', choices=list(CORPUS_SIZES), default=list(CORPUS_SIZES),
+                        help='Corpus documents to run against')
+    parser.add_argument('--theme', default='default', help='Theme used by format and _apply_theme')
+    parser.add_argument('--values', type=int, default=10, help='Samples per benchmark')
+    parser.add_argument('--warmups', type=int, default=1, help='Discarded warmup samples')
+    parser.add_argument('--min-time', type=float, default=0.1, help='Minimum seconds per sample')
+    parser.add_argument('--fast', action='store_true', help='Quick run: 3 values, 0.02s per sample')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Corpus seed')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Previous JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Fail when a median slows down by more than this fraction')
+    args = parser.parse_args(argv)
+    if args.fast:
+        args.values, args.min_time = 3, 0.02
+
+    # 基准测试不应计入日志输出的耗时
+    logging.getLogger('xiayan_mcp').setLevel(logging.CRITICAL)
+
+    corpus = {name: content for name, content in build_corpus(args.seed).items() if name in args.docs}
+    formatter = MarkdownFormatter()
+    benchmarks = build_benchmarks(formatter, corpus, args.theme)
+
+    results = {}
+    for bench in args.bench:
+        for doc in args.docs:
+            name = f"{bench}/{doc}"
+            spec = benchmarks[name]
+            result = measure(spec['func'], spec.get('setup'), args.values, args.warmups, args.min_time)
+            result['bytes'] = spec['bytes']
+            results[name] = result
+            throughput = spec['bytes'] / result['median'] / 1e6
+            print(f"{name:44s} {_format_time(result['mean']):>10s} +- {_format_time(result['stdev']):>9s}"
+                  f"  ({throughput:7.2f} MB/s, {result['loops']} loops)")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'theme': args.theme,
+        'benchmarks': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+    failures = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            failures = compare(results, json.load(f), args.threshold)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+End-to-end publish throughput benchmark for xiayan-mcp.
+
+Runs the full publish_article path (encoding fix, formatting, cover and
+inline image uploads, draft creation) against the local fake WeChat API and
+reports articles per second, p50/p95/p99 latency and per-stage timings for
+each combination of article size, image count, theme and concurrency.
+
+Usage:
+    python benchmarks/bench_publish.py
+    python benchmarks/bench_publish.py --sizes small large --images 0 10 --concurrency 1 8 16
+    python benchmarks/bench_publish.py --output results.json
+    python benchmarks/bench_publish.py --compare baseline.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.pipeline import PUBLISH_STAGES, PublishPipeline
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.testing.fake_wechat import FakeWeChatServer
+from xiayan_mcp.utils.concurrency import gather_bounded
+
+# 文章正文的大致字节数
+ARTICLE_SIZES = {
+    'small': 1_000,
+    'medium': 10_000,
+    'large': 100_000,
+}
+
+# 报告中的阶段分组：cover和inline_images并发执行，合并为media
+STAGE_GROUPS = {
+    'encoding': ('encoding',),
+    'format': ('format',),
+    'media': ('cover', 'inline_images'),
+    'draft': ('draft',),
+}
+
+_PARAGRAPH = (
+    "夏颜公众号助手将Markdown文章格式化为微信公众号支持的HTML，"
+    "并通过接口发布到草稿箱。本段文字用于填充基准测试文章，"
+    "包含**加粗**、*斜体*、`行内代码`和[链接](https://example.com)。\n\n"
+)
+
+_CODE_BLOCK = (
+    "```python\n"
+    "def fibonacci(n):\n"
+    "    a, b = 0, 1\n"
+    "    for _ in range(n):\n"
+    "        a, b = b, a + b\n"
+    "    return a\n"
+    "```\n\n"
+)
+
+
+def make_article(size: str, image_urls: List[str], index: int) -> str:
+    """Generate a Markdown article of roughly the given size."""
+    target = ARTICLE_SIZES[size]
+    parts = [f"---\ntitle: 基准测试文章 {index}\n---\n\n# 基准测试文章 {index}\n\n"]
+    images = list(image_urls)
+    section = 0
+    while sum(len(part.encode('utf-8')) for part in parts) < target or images:
+        section += 1
+        parts.append(f"## 第{section}节\n\n")
+        parts.append(_PARAGRAPH * 3)
+        parts.append("- 列表项一\n- 列表项二\n- 列表项三\n\n")
+        parts.append("> 引用内容，用于测试引用块样式。\n\n")
+        if section % 3 == 0:
+            parts.append(_CODE_BLOCK)
+        if images:
+            parts.append(f"![图片{section}]({images.pop(0)})\n\n")
+    return "".join(parts)
+
+
+def make_image(index: int) -> bytes:
+    """Generate a small JPEG image."""
+    from PIL import Image
+
+    img = Image.new('RGB', (320, 200), color=(40 + index * 13 % 200, 120, 180))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    return {
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'mean': round(statistics.mean(values), 2) if values else 0.0,
+    }
+
+
+async def run_scenario(size: str, images: int, theme: str, concurrency: int, articles: int,
+                       latency_ms: float, jitter_ms: float) -> Dict:
+    """Publish ``articles`` articles through one scenario and collect timings."""
+    async with FakeWeChatServer(latency_ms=latency_ms, jitter_ms=jitter_ms, seed=0) as fake:
+        publisher = WeChatPublisher()
+        publisher.base_url = fake.base_url
+        publisher.app_id = fake.app_id
+        publisher.app_secret = fake.app_secret
+        pipeline = PublishPipeline(MarkdownFormatter(), publisher)
+
+        documents = []
+        for index in range(articles):
+            urls = [fake.host_image(make_image(index * images + i), f"bench_{index}_{i}.jpg")
+                    for i in range(images)]
+            documents.append(make_article(size, urls, index))
+
+        latencies: List[float] = []
+        stage_times: Dict[str, List[float]] = {stage: [] for stage in PUBLISH_STAGES}
+        errors: List[str] = []
+
+        async def publish_one(content: str) -> None:
+            timings: Dict[str, float] = {}
+
+            async def on_stage(event: Dict) -> None:
+                if event['status'] == 'finished':
+                    timings[event['stage']] = event['elapsed_ms']
+
+            start = time.perf_counter()
+            try:
+                await pipeline.run(content, theme_id=theme, on_stage=on_stage)
+            except Exception as e:
+                errors.append(str(e))
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+            for stage, elapsed_ms in timings.items():
+                stage_times[stage].append(elapsed_ms)
+
+        try:
+            start = time.perf_counter()
+            await gather_bounded((publish_one(content) for content in documents), concurrency)
+            wall_s = time.perf_counter() - start
+        finally:
+            await publisher.close()
+
+        stages = {}
+        for group, members in STAGE_GROUPS.items():
+            # 并发执行的阶段取较慢的一个作为该组耗时
+            per_article = [max(values) for values in zip(*(stage_times[m] for m in members))]
+            stages[group] = _distribution(per_article)
+
+        return {
+            'size': size,
+            'images': images,
+            'theme': theme,
+            'concurrency': concurrency,
+            'articles': articles,
+            'succeeded': len(latencies),
+            'errors': errors[:5],
+            'wall_s': round(wall_s, 3),
+            'articles_per_s': round(len(latencies) / wall_s, 2) if wall_s else 0.0,
+            'latency_ms': _distribution(latencies),
+            'stages_ms': stages,
+            'api_calls': fake.stats()['calls'],
+        }
+
+
+def scenario_key(result: Dict) -> str:
+    return f"{result['size']}/img{result['images']}/{result['theme']}/c{result['concurrency']}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline: Dict, max_regression: float) -> List[str]:
+    """Compare throughput with a previous run; return messages for regressions."""
+    previous = {scenario_key(r): r for r in baseline.get('scenarios', [])}
+    failures = []
+    print(f"\nComparison with {baseline.get('commit') or 'baseline'}:")
+    for result in results:
+        key = scenario_key(result)
+        if key not in previous:
+            continue
+        before = previous[key]['articles_per_s']
+        after = result['articles_per_s']
+        change = (after - before) / before if before else 0.0
+        print(f"  {key:32s} {before:8.2f} -> {after:8.2f} articles/s ({change:+.1%})")
+        if change < -max_regression:
+            failures.append(f"{key} 吞吐量下降 {-change:.1%}")
+    return failures
+
+
+def print_result(result: Dict) -> None:
+    latency = result['latency_ms']
+    stages = "  ".join(
+        f"{stage} {timings['p50']:.1f}/{timings['p95']:.1f}"
+        for stage, timings in result['stages_ms'].items()
+    )
+    print(f"{scenario_key(result):32s} {result['articles_per_s']:8.2f} art/s  "
+          f"p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  p99 {latency['p99']:8.1f} ms  "
+          f"[{stages}]" + (f"  errors {result['articles'] - result['succeeded']}" if result['errors'] else ""))
+
+
+async def run_all(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    for size, images, theme, concurrency in itertools.product(
+            args.sizes, args.images, args.themes, args.concurrency):
+        result = await run_scenario(size, images, theme, concurrency, args.articles,
+                                    args.latency_ms, args.jitter_ms)
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end publishing against a fake WeChat API")
+    parser.add_argument('--sizes', nargs='+', default=['small', 'large'], choices=list(ARTICLE_SIZES))
+    parser.add_argument('--images', nargs='+', type=int, default=[0, 5], help='Inline images per article')
+    parser.add_argument('--themes', nargs='+', default=['default', 'orangeheart'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--articles', type=int, default=20, help='Articles per scenario')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake API latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='Fake API latency jitter')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Previous JSON results to compare throughput against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Fail when throughput drops by more than this fraction')
+    args = parser.parse_args(argv)
+
+    # 包内模块在导入时已配置日志，这里只保留警告以上级别
+    logging.getLogger('xiayan_mcp').setLevel(logging.WARNING)
+    print("scenario (size/images/theme/concurrency)  throughput  latency  "
+          "[stage p50/p95 ms: encoding format media draft]")
+    results = asyncio.run(run_all(args))
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'fake_api': {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms},
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+    failures = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            failures = compare(results, json.load(f), args.max_regression)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
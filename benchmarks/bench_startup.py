@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for xiayan-mcp.
+
+Spawns the server over stdio the way an MCP client does, drives the
+``initialize`` / ``tools/list`` handshake and reports wall-clock times and an
+``-X importtime`` breakdown. No WeChat credentials are needed.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --max-overhead-ms 150
+    python benchmarks/bench_startup.py --json > startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+
+# 所有MCP SDK版本都支持的协议版本
+PROTOCOL_VERSION = "2024-11-05"
+
+# 服务器本身必须导入的MCP SDK模块，用于测量基线
+SDK_IMPORTS = "import mcp.server, mcp.server.stdio, mcp.types"
+
+# 应在list_tools之后才加载的依赖（pygments会被MCP SDK的依赖导入，不在此列）
+LAZY_PACKAGES = ('markdown', 'bs4', 'jinja2', 'aiohttp', 'frontmatter')
+
+
+def _server_env(data_dir: str) -> Dict[str, str]:
+    """Environment for a spawned server: no credentials, isolated data dir."""
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': SRC_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'WECHAT_APP_ID': '',
+        'WECHAT_APP_SECRET': '',
+        'XIAYAN_DATA_DIR': data_dir,
+    })
+    return env
+
+
+def _send(proc: subprocess.Popen, message: Dict) -> None:
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+
+def _receive(proc: subprocess.Popen, request_id: int) -> Dict:
+    """Read stdout until the response to ``request_id`` arrives."""
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("服务器在握手完成前退出")
+        message = json.loads(line)
+        if message.get('id') == request_id:
+            if 'error' in message:
+                raise RuntimeError(f"服务器返回错误: {message['error']}")
+            return message
+
+
+def measure_handshake(python_args: Optional[List[str]] = None) -> Dict:
+    """
+    Spawn the server once and time the handshake.
+
+    Args:
+        python_args: Extra interpreter options, e.g. ``['-X', 'importtime']``
+
+    Returns:
+        Dictionary with initialize_ms, list_tools_ms, tool_count and the
+        stderr output written before the list_tools response
+    """
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryFile('w+') as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, *(python_args or []), '-m', 'xiayan_mcp.server'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+            env=_server_env(data_dir), text=True, encoding='utf-8',
+        )
+        try:
+            _send(proc, {
+                "jsonrpc": "2.0", "id": 1, "method": "initialize",
+                "params": {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "capabilities": {},
+                    "clientInfo": {"name": "bench_startup", "version": "0"},
+                },
+            })
+            _receive(proc, 1)
+            initialize_ms = (time.perf_counter() - start) * 1000
+
+            _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+            _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}})
+            tools = _receive(proc, 2)['result']['tools']
+            list_tools_ms = (time.perf_counter() - start) * 1000
+            # 只统计list_tools之前的输出，之后的后台预加载不计入启动时间
+            stderr_size = os.fstat(stderr.fileno()).st_size
+        finally:
+            proc.stdin.close()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        stderr.seek(0)
+        return {
+            'initialize_ms': initialize_ms,
+            'list_tools_ms': list_tools_ms,
+            'tool_count': len(tools),
+            'stderr': stderr.buffer.read(stderr_size).decode('utf-8', errors='replace'),
+        }
+
+
+def measure_sdk_baseline() -> float:
+    """Time a bare interpreter that only imports the MCP SDK modules the server needs."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', SDK_IMPORTS], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parse ``-X importtime`` output.
+
+    Returns:
+        Entries with module, self_ms and cumulative_ms, in import order
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def summarize_imports(entries: List[Dict], top: int = 15) -> Dict:
+    """Group import time by top-level package and list the slowest modules."""
+    by_package: Dict[str, float] = {}
+    for entry in entries:
+        package = entry['module'].split('.')[0]
+        by_package[package] = by_package.get(package, 0.0) + entry['self_ms']
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    modules = sorted(entries, key=lambda entry: entry['cumulative_ms'], reverse=True)[:top]
+    return {
+        'packages': [{'package': name, 'self_ms': round(ms, 1)} for name, ms in packages],
+        'modules': modules,
+        'total_ms': round(sum(entry['self_ms'] for entry in entries), 1),
+    }
+
+
+def run_benchmark(runs: int = 5, top: int = 15) -> Dict:
+    """Run the handshake ``runs`` times plus one importtime run.
+
+    Server and baseline runs are interleaved, and the overhead is computed
+    from the fastest run of each, which is the least noisy estimate of
+    cold-start cost on a busy machine.
+    """
+    results, baselines = [], []
+    for _ in range(runs):
+        results.append(measure_handshake())
+        baselines.append(measure_sdk_baseline())
+    importtime = measure_handshake(['-X', 'importtime'])
+
+    initialize = [r['initialize_ms'] for r in results]
+    list_tools = [r['list_tools_ms'] for r in results]
+    baseline_ms = min(baselines)
+    entries = parse_importtime(importtime['stderr'])
+    return {
+        'runs': runs,
+        'tool_count': results[0]['tool_count'],
+        'initialize_ms': {'median': statistics.median(initialize), 'min': min(initialize)},
+        'list_tools_ms': {'median': statistics.median(list_tools), 'min': min(list_tools)},
+        'sdk_baseline_ms': baseline_ms,
+        'overhead_ms': min(list_tools) - baseline_ms,
+        'imports': summarize_imports(entries, top),
+        'eager_packages': sorted({
+            entry['module'].split('.')[0] for entry in entries
+            if entry['module'].split('.')[0] in LAZY_PACKAGES
+        }),
+    }
+
+
+def check_thresholds(report: Dict, max_list_tools_ms: Optional[float],
+                     max_overhead_ms: Optional[float]) -> List[str]:
+    """Return a message for each exceeded threshold."""
+    failures = []
+    list_tools_ms = report['list_tools_ms']['median']
+    if max_list_tools_ms is not None and list_tools_ms > max_list_tools_ms:
+        failures.append(f"list_tools耗时 {list_tools_ms:.0f}ms 超过阈值 {max_list_tools_ms:.0f}ms")
+    if max_overhead_ms is not None and report['overhead_ms'] > max_overhead_ms:
+        failures.append(f"服务器自身启动开销 {report['overhead_ms']:.0f}ms 超过阈值 {max_overhead_ms:.0f}ms")
+    if report['eager_packages']:
+        failures.append(f"以下依赖在list_tools之前被导入: {', '.join(report['eager_packages'])}")
+    return failures
+
+
+def print_report(report: Dict) -> None:
+    """Print a human readable report."""
+    print(f"Runs: {report['runs']}, tools: {report['tool_count']}")
+    print(f"initialize:  median {report['initialize_ms']['median']:7.1f} ms  "
+          f"min {report['initialize_ms']['min']:7.1f} ms")
+    print(f"list_tools:  median {report['list_tools_ms']['median']:7.1f} ms  "
+          f"min {report['list_tools_ms']['min']:7.1f} ms")
+    print(f"SDK baseline (fastest python -c '{SDK_IMPORTS}'): {report['sdk_baseline_ms']:.1f} ms")
+    print(f"Server overhead (fastest list_tools - baseline): {report['overhead_ms']:.1f} ms")
+
+    imports = report['imports']
+    print(f"\nImport time by package (total {imports['total_ms']} ms):")
+    for item in imports['packages']:
+        print(f"  {item['self_ms']:8.1f} ms  {item['package']}")
+    print("\nSlowest modules (cumulative):")
+    for item in imports['modules']:
+        print(f"  {item['cumulative_ms']:8.1f} ms  {item['module']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure xiayan-mcp startup time over stdio")
+    parser.add_argument('--runs', type=int, default=5, help='Number of handshakes to time')
+    parser.add_argument('--top', type=int, default=15, help='Number of packages/modules to list')
+    parser.add_argument('--max-list-tools-ms', type=float, default=None,
+                        help='Fail if median time-to-list_tools exceeds this')
+    parser.add_argument('--max-overhead-ms', type=float, default=150,
+                        help='Fail if fastest time-to-list_tools minus the SDK baseline exceeds this')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.runs, args.top)
+    failures = check_thresholds(report, args.max_list_tools_ms, args.max_overhead_ms)
+    report['failures'] = failures
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("\n✅ 启动耗时在阈值内")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Deterministic Markdown corpus for the formatter benchmarks.
+
+Generates Chinese technical articles with headings, paragraphs, code blocks,
+tables, lists, quotes and images. The same seed always yields byte-identical
+documents, so timings stay comparable across commits.
+
+Usage:
+    python benchmarks/corpus.py --output corpus/    # write the corpus as .md files
+"""
+
+import argparse
+import os
+import random
+import sys
+from typing import Dict, List, Optional
+
+# 文档名 -> 目标字节数
+CORPUS_SIZES = {
+    'tiny': 500,
+    'typical': 8_000,
+    'large': 120_000,
+}
+
+DEFAULT_SEED = 20240601
+
+_TOPICS = [
+    ('异步编程', 'asyncio'), ('数据库索引', 'sqlite'), ('缓存设计', 'lru_cache'),
+    ('性能分析', 'cProfile'), ('并发控制', 'Semaphore'), ('序列化', 'json'),
+    ('网络请求', 'aiohttp'), ('模板渲染', 'jinja2'), ('日志系统', 'logging'),
+]
+
+_SENTENCES = [
+    "在实际项目中，{topic}往往决定了系统的整体吞吐量和响应延迟。",
+    "使用`{api}`时需要注意资源的生命周期，避免在热路径上重复创建对象。",
+    "下面的示例展示了**{topic}**的一种常见写法，并给出了*性能对比*。",
+    "根据我们的测试，合理配置{topic}之后，p95延迟下降了约{num}%。",
+    "更多细节可以参考[官方文档](https://docs.python.org/3/library/{api}.html)。",
+    "需要强调的是，{topic}并不是银弹，过早优化反而会增加维护成本。",
+    "如果数据量超过{num}万条，建议先做基准测试再决定方案。",
+]
+
+_CODE_TEMPLATES = [
+    (
+        "python",
+        "import {api}\n\n"
+        "def process(items):\n"
+        "    \"\"\"处理{topic}相关的数据\"\"\"\n"
+        "    results = []\n"
+        "    for index, item in enumerate(items):\n"
+        "        if item is None:\n"
+        "            continue\n"
+        "        results.append((index, item * {num}))\n"
+        "    return results\n"
+    ),
+    (
+        "javascript",
+        "async function fetchData(url) {{\n"
+        "  // {topic}示例\n"
+        "  const response = await fetch(url, {{ timeout: {num} }});\n"
+        "  if (!response.ok) throw new Error('请求失败');\n"
+        "  return response.json();\n"
+        "}}\n"
+    ),
+    (
+        "bash",
+        "# 安装依赖并运行{topic}基准\n"
+        "pip install {api}\n"
+        "python -m timeit -n {num} \"import {api}\"\n"
+    ),
+]
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    topic, api = rng.choice(_TOPICS)
+    return template.format(topic=topic, api=api, num=rng.randint(5, 95))
+
+
+def _paragraph(rng: random.Random) -> str:
+    return "".join(_fill(rng, rng.choice(_SENTENCES)) for _ in range(rng.randint(3, 6))) + "\n\n"
+
+
+def _code_block(rng: random.Random) -> str:
+    language, template = rng.choice(_CODE_TEMPLATES)
+    return f"```{language}\n{_fill(rng, template)}```\n\n"
+
+
+def _table(rng: random.Random) -> str:
+    rows = ["| 方案 | 平均耗时(ms) | 内存(MB) | 备注 |", "| --- | ---: | ---: | --- |"]
+    for _ in range(rng.randint(3, 6)):
+        topic, api = rng.choice(_TOPICS)
+        rows.append(f"| {topic} | {rng.uniform(0.5, 300):.1f} | {rng.randint(10, 512)} | `{api}` |")
+    return "\n".join(rows) + "\n\n"
+
+
+def _image(rng: random.Random, index: int) -> str:
+    return f"![示意图{index}](https://example.com/images/figure-{index}-{rng.randint(1000, 9999)}.png)\n\n"
+
+
+def _section(rng: random.Random, number: int) -> str:
+    topic, _ = rng.choice(_TOPICS)
+    parts = [f"## {number}. {topic}实践\n\n", _paragraph(rng)]
+    kind = number % 4
+    if kind == 0:
+        parts.append(_code_block(rng))
+    elif kind == 1:
+        parts.append(_table(rng))
+    elif kind == 2:
+        parts.append(_image(rng, number))
+    else:
+        parts.append("- 优点：实现简单，易于维护\n- 缺点：高并发下存在锁竞争\n"
+                     "  1. 可以通过分片缓解\n  2. 也可以改为无锁结构\n\n")
+        parts.append(f"> 提示：{_fill(rng, rng.choice(_SENTENCES))}\n\n")
+    parts.append(f"### {number}.1 小结\n\n")
+    parts.append(_paragraph(rng))
+    return "".join(parts)
+
+
+def generate_article(target_bytes: int, seed: int = DEFAULT_SEED) -> str:
+    """Generate one article of at least ``target_bytes`` UTF-8 bytes."""
+    rng = random.Random(f"{seed}-{target_bytes}")
+    parts = [
+        "---\n",
+        f"title: Python性能优化实战（{target_bytes // 1000}KB）\n",
+        "author: 夏颜\n",
+        "---\n\n",
+        "# Python性能优化实战\n\n",
+        _paragraph(rng),
+    ]
+    size = sum(len(part.encode('utf-8')) for part in parts)
+    number = 0
+    while size < target_bytes:
+        number += 1
+        section = _section(rng, number) if target_bytes > 1_000 else _paragraph(rng)
+        parts.append(section)
+        size += len(section.encode('utf-8'))
+    return "".join(parts)
+
+
+def make_corrupted(content: str) -> str:
+    """Inject the escape artefacts EncodingUtils.fix_encoding is meant to repair."""
+    return (content.replace('<', '\\x3c').replace('>', '\\x3e')
+            .replace('"', '&quot;').replace('&', '&amp;', 1))
+
+
+def build_corpus(seed: int = DEFAULT_SEED) -> Dict[str, str]:
+    """Return ``{name: markdown}`` for every corpus size."""
+    return {name: generate_article(size, seed) for name, size in CORPUS_SIZES.items()}
+
+
+def write_corpus(directory: str, seed: int = DEFAULT_SEED) -> List[str]:
+    """Write the corpus to ``directory`` and return the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, content in build_corpus(seed).items():
+        path = os.path.join(directory, f"{name}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate the formatter benchmark corpus")
+    parser.add_argument('--output', required=True, help='Directory to write the .md files to')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+    for path in write_corpus(args.output, args.seed):
+        print(f"{path}: {os.path.getsize(path)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
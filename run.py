@@ -3,7 +3,6 @@
 启动脚本 for xiayan-mcp
 """
 
-import asyncio
 import sys
 import os
 
@@ -16,4 +15,4 @@ from xiayan_mcp.server import main
 if __name__ == "__main__":
     print("=== 夏颜公众号助手 (xiayan-mcp) ===", file=sys.stderr)
     print("正在启动MCP服务器...", file=sys.stderr)
-    asyncio.run(main())
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -2,6 +2,12 @@
 
 __version__ = "0.1.0"
 
-from .server import XiayanMCPServer
+__all__ = ["XiayanMCPServer", "__version__"]
 
-__all__ = ["XiayanMCPServer", "__version__"]
\ No newline at end of file
+
+def __getattr__(name):
+    # 延迟导入服务器，避免仅使用子模块时加载MCP SDK
+    if name == "XiayanMCPServer":
+        from .server import XiayanMCPServer
+        return XiayanMCPServer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
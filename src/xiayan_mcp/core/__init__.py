@@ -1,6 +1,17 @@
 """Core functionality initialization."""
 
-from .formatter import MarkdownFormatter
-from .publisher import WeChatPublisher
+import importlib
 
-__all__ = ["MarkdownFormatter", "WeChatPublisher"]
\ No newline at end of file
+# 格式化和发布模块依赖markdown、aiohttp等较重的库，按需导入
+_LAZY_EXPORTS = {
+    "MarkdownFormatter": ".formatter",
+    "WeChatPublisher": ".publisher",
+}
+
+__all__ = ["MarkdownFormatter", "WeChatPublisher"]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
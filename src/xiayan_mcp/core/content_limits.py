@@ -0,0 +1,145 @@
+"""Pre-flight size checks for WeChat article content.
+
+``draft/add`` rejects articles whose HTML exceeds about 2MB or whose text
+exceeds 20,000 characters, but only after covers and images have been
+uploaded. The formatter measures every article while it still holds the
+DOM, so oversized articles can be rejected, or split into a multi-part
+series at heading boundaries, before anything is sent to WeChat.
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Sequence
+
+# 微信图文消息的内容限制，可通过环境变量调整
+MAX_CONTENT_BYTES = int(os.getenv('XIAYAN_MAX_CONTENT_BYTES', str(2 * 1024 * 1024)))
+MAX_CONTENT_CHARS = int(os.getenv('XIAYAN_MAX_CONTENT_CHARS', '20000'))
+
+# 超出限制时的处理方式
+OVERSIZE_MODES = ('reject', 'split')
+
+_HEADING_TAGS = ('h1', 'h2', 'h3')
+
+
+class ContentTooLargeError(ValueError):
+    """Formatted content exceeds WeChat's size limits."""
+
+
+@dataclass(frozen=True)
+class ContentStats:
+    """Size of one formatted article."""
+
+    html_bytes: int
+    text_chars: int
+    image_count: int
+
+    def violations(self, max_bytes: int = None, max_chars: int = None) -> List[str]:
+        """Descriptions of the limits this article exceeds, empty if it fits."""
+        max_bytes = MAX_CONTENT_BYTES if max_bytes is None else max_bytes
+        max_chars = MAX_CONTENT_CHARS if max_chars is None else max_chars
+        problems = []
+        if self.html_bytes > max_bytes:
+            problems.append(f"HTML大小{self.html_bytes}字节，超过{max_bytes}字节")
+        if self.text_chars > max_chars:
+            problems.append(f"正文{self.text_chars}字，超过{max_chars}字")
+        return problems
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def count_text_chars(node) -> int:
+    """Visible characters of a node, with runs of whitespace counted once."""
+    # NavigableString是str的子类
+    text = str(node) if isinstance(node, str) else node.get_text(' ')
+    return len(' '.join(text.split()))
+
+
+def measure(node, html: str) -> ContentStats:
+    """
+    Measure formatted content.
+
+    Args:
+        node: Parsed content (BeautifulSoup or Tag)
+        html: Final HTML string of the content
+
+    Returns:
+        ContentStats of the content
+    """
+    return ContentStats(
+        html_bytes=len(html.encode('utf-8')),
+        text_chars=count_text_chars(node),
+        image_count=len(node.find_all('img')),
+    )
+
+
+def _sections(blocks: Sequence) -> List[List]:
+    """Group top-level blocks into sections that each start at a heading."""
+    sections: List[List] = []
+    for block in blocks:
+        if not sections or getattr(block, 'name', None) in _HEADING_TAGS:
+            sections.append([])
+        sections[-1].append(block)
+    return sections
+
+
+def split_blocks(blocks: Sequence, max_bytes: int, max_chars: int, overhead_bytes: int = 0) -> List[List]:
+    """
+    Pack top-level content blocks into parts that each fit the limits.
+
+    Parts break at headings where possible: whole sections are packed
+    greedily, and only a section that does not fit on its own is broken
+    between its blocks.
+
+    Args:
+        blocks: Top-level nodes of the article body
+        max_bytes: Maximum HTML bytes per part
+        max_chars: Maximum visible characters per part
+        overhead_bytes: Bytes added to every part by the surrounding template
+
+    Returns:
+        Lists of blocks, one per part
+
+    Raises:
+        ContentTooLargeError: If a single block exceeds the limits
+    """
+    parts: List[List] = []
+    current: List = []
+    size = [overhead_bytes, 0]
+
+    def fits(added_bytes: int, added_chars: int) -> bool:
+        return size[0] + added_bytes <= max_bytes and size[1] + added_chars <= max_chars
+
+    def flush():
+        nonlocal current
+        if current:
+            parts.append(current)
+        current = []
+        size[:] = [overhead_bytes, 0]
+
+    for section in _sections(blocks):
+        measured = [(block, len(str(block).encode('utf-8')), count_text_chars(block)) for block in section]
+        section_bytes = sum(m[1] for m in measured)
+        section_chars = sum(m[2] for m in measured)
+
+        if not fits(section_bytes, section_chars):
+            flush()
+        if fits(section_bytes, section_chars):
+            current.extend(section)
+            size[0] += section_bytes
+            size[1] += section_chars
+            continue
+
+        # 单个章节超出限制，在段落之间拆分
+        for block, block_bytes, block_chars in measured:
+            if not fits(block_bytes, block_chars):
+                flush()
+                if not fits(block_bytes, block_chars):
+                    raise ContentTooLargeError(
+                        f"单个段落超出微信内容限制（{block_bytes}字节，{block_chars}字），无法拆分")
+            current.append(block)
+            size[0] += block_bytes
+            size[1] += block_chars
+
+    flush()
+    return parts
@@ -0,0 +1,97 @@
+"""Builder for multi-article WeChat drafts."""
+
+import asyncio
+import logging
+from typing import Dict, List
+
+from .pipeline import prepare_article
+from .publisher import MAX_DRAFT_ARTICLES
+from ..utils.concurrency import gather_bounded, run_in_cpu_pool
+
+logger = logging.getLogger(__name__)
+
+
+class MultiArticleDraftBuilder:
+    """Format several Markdown documents and submit them as one draft.
+
+    Documents are formatted in parallel on the shared CPU pool, all covers and
+    inline images are uploaded concurrently, and the articles are submitted
+    with a single ``draft/add`` call.
+    """
+
+    def __init__(self, formatter, publisher):
+        """
+        Initialize the builder.
+
+        Args:
+            formatter: MarkdownFormatter instance
+            publisher: WeChatPublisher instance
+        """
+        self.formatter = formatter
+        self.publisher = publisher
+
+    async def build(self, documents: List[Dict], theme_id: str = "default",
+                    author: str = "Xiayan MCP", need_open_comment: int = 0,
+                    only_fans_can_comment: int = 0, concurrency: int = 4) -> Dict:
+        """
+        Build and submit a multi-article draft.
+
+        Args:
+            documents: Up to 8 dictionaries with ``content`` (Markdown) and
+                       optional ``theme_id``, ``cover``, ``author`` and ``digest``
+            theme_id: Default theme for documents without their own
+            author: Default author for documents without their own
+            need_open_comment: Enable open comments (0/1)
+            only_fans_can_comment: Only fans can comment (0/1)
+            concurrency: Maximum number of concurrent uploads
+
+        Returns:
+            Dictionary with the draft media_id and per-article title and cover
+        """
+        if not documents:
+            raise ValueError("至少需要一篇文章")
+        if len(documents) > MAX_DRAFT_ARTICLES:
+            raise ValueError(f"一个草稿最多包含{MAX_DRAFT_ARTICLES}篇文章，当前为{len(documents)}篇")
+        for i, doc in enumerate(documents):
+            if not doc.get("content"):
+                raise ValueError(f"第{i + 1}篇文章内容为空")
+
+        # 1. 并行格式化
+        prepared = await asyncio.gather(*(
+            run_in_cpu_pool(prepare_article, self.formatter, doc["content"],
+                            doc.get("theme_id") or theme_id)
+            for doc in documents
+        ))
+        logger.info(f"{len(prepared)} 篇文章格式化完成")
+
+        # 2. 并发上传所有封面和正文图片
+        covers = gather_bounded(
+            (self.publisher._get_or_create_cover(doc.get("cover") or item["cover"], item["content"])
+             for doc, item in zip(documents, prepared)),
+            concurrency
+        )
+        contents = asyncio.gather(*(
+            self.publisher.upload_inline_images(item["content"], concurrency)
+            for item in prepared
+        ))
+        cover_media_ids, contents = await asyncio.gather(covers, contents)
+
+        # 3. 一次API调用提交全部文章
+        articles = [
+            self.publisher._build_draft_article(
+                item["title"], content, cover_media_id,
+                doc.get("author") or author, need_open_comment, only_fans_can_comment,
+                doc.get("digest", "")
+            )
+            for doc, item, content, cover_media_id in zip(documents, prepared, contents, cover_media_ids)
+        ]
+        media_id = await self.publisher.add_multi_article_draft(articles)
+        logger.info(f"多图文草稿添加成功，media_id: {media_id}")
+
+        return {
+            "media_id": media_id,
+            "articles": [
+                {"title": article["title"], "cover_media_id": article.get("thumb_media_id", "")}
+                for article in articles
+            ],
+        }
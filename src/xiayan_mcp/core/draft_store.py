@@ -0,0 +1,159 @@
+"""Local record of submitted drafts for idempotent publishing."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from ..utils.paths import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# 发布键的有效期（秒），0表示关闭幂等发布
+PUBLISH_KEY_TTL = float(os.getenv('XIAYAN_PUBLISH_KEY_TTL', str(24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS publish_keys (
+    key TEXT PRIMARY KEY,
+    media_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    article_count INTEGER NOT NULL,
+    cover TEXT NOT NULL DEFAULT '',
+    cover_media_id TEXT NOT NULL DEFAULT '',
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_publish_keys_media_id ON publish_keys (media_id);
+"""
+
+
+def _digest(parts: Iterable[Any]) -> str:
+    data = json.dumps(list(parts), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def publish_key(content: str, *context: str) -> str:
+    """Default publish key of an article: hash of its content and context, e.g. the theme."""
+    return 'content:' + _digest([content, *context])
+
+
+def draft_hash(articles: Iterable[Dict[str, Any]], **options: Any) -> str:
+    """
+    Hash of what would be submitted for a draft, before any upload.
+
+    Args:
+        articles: Dictionaries with ``title``, ``content`` and ``cover``
+        **options: Other draft fields, e.g. author and comment settings
+
+    Returns:
+        Hex digest; it changes whenever the submitted draft would change
+    """
+    return _digest([
+        [[article.get('title', ''), article.get('content', ''), article.get('cover', '')] for article in articles],
+        options,
+    ])
+
+
+class DraftStore:
+    """Publish keys and the drafts they created, stored in SQLite.
+
+    A repeated publish with the same key and content returns the recorded
+    draft instead of creating a new one; the same key with changed content
+    updates the recorded draft. Keys expire after ``PUBLISH_KEY_TTL`` seconds.
+    """
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None, ttl: Optional[float] = None):
+        """
+        Initialize the store.
+
+        Args:
+            db_path: SQLite database path (default: ``<data dir>/drafts.db``)
+            ttl: Key lifetime in seconds (default: ``PUBLISH_KEY_TTL``)
+        """
+        self.db_path = Path(db_path) if db_path else None
+        self.ttl = PUBLISH_KEY_TTL if ttl is None else ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._locks: 'weakref.WeakValueDictionary[str, asyncio.Lock]' = weakref.WeakValueDictionary()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use."""
+        if self._conn is None:
+            db_path = self.db_path or get_data_dir() / 'drafts.db'
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+            self.prune()
+        return self._conn
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Lock serializing concurrent publishes with the same key."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the draft recorded for a publish key.
+
+        Args:
+            key: Publish key
+
+        Returns:
+            Record with media_id, content_hash, article_count, cover,
+            cover_media_id and the original publish result, or None if the
+            key is unknown or expired
+        """
+        row = self.conn.execute("SELECT * FROM publish_keys WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row['updated_at'] > self.ttl:
+            return None
+        record = dict(row)
+        record['result'] = json.loads(record['result'])
+        return record
+
+    def put(self, key: str, media_id: str, content_hash: str, article_count: int,
+            result: Dict[str, Any], cover: str = '', cover_media_id: str = '') -> None:
+        """Record the draft created or updated for a publish key."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO publish_keys (key, media_id, content_hash, article_count, cover, "
+                "cover_media_id, result, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET media_id = excluded.media_id, "
+                "content_hash = excluded.content_hash, article_count = excluded.article_count, "
+                "cover = excluded.cover, cover_media_id = excluded.cover_media_id, "
+                "result = excluded.result, updated_at = excluded.updated_at",
+                (key, media_id, content_hash, article_count, cover or '', cover_media_id or '',
+                 json.dumps(result, ensure_ascii=False), now, now)
+            )
+
+    def prune(self) -> int:
+        """
+        Delete expired keys.
+
+        Returns:
+            Number of keys deleted
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM publish_keys WHERE updated_at < ?", (time.time() - max(self.ttl, 0),))
+        return cursor.rowcount
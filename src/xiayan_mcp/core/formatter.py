@@ -4,45 +4,84 @@ import re
 import html
 import json
 import logging
-from typing import Dict, Optional
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import frontmatter
 import markdown
 from bs4 import BeautifulSoup
 from jinja2 import Environment, BaseLoader
 
+from . import content_limits
+from .content_limits import ContentStats, measure, split_blocks
 from ..themes.theme_manager import ThemeManager
+from ..utils import metrics, tracing
 from ..utils.encoding import enconding_utils
 
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
+# Markdown扩展配置
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.toc',
+    'markdown.extensions.tables',
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.footnotes',
+    'markdown.extensions.attr_list',
+    'markdown.extensions.def_list',
+    'markdown.extensions.abbr',
+    'markdown.extensions.md_in_html',
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    'codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': True
+    }
+}
+
+
+def compile_style(declarations: Dict[str, str]) -> str:
+    """把CSS属性字典转换为style字符串"""
+    return '; '.join(f"{prop}: {value}" for prop, value in declarations.items())
+
+
+@lru_cache(maxsize=1024)
+def parse_style(style: str) -> Tuple[Tuple[str, str], ...]:
+    """解析style属性为(属性, 值)元组，文章中重复出现的style只解析一次"""
+    declarations = {}
+    for prop in style.split(';'):
+        if ':' in prop:
+            key, value = prop.split(':', 1)
+            declarations[key.strip()] = value.strip()
+    return tuple(declarations.items())
+
+
+@lru_cache(maxsize=1024)
+def merge_style(existing_style: str, element_style: str) -> str:
+    """合并已有样式和元素样式，相同属性以元素样式为准"""
+    declarations = dict(parse_style(existing_style))
+    declarations.update(parse_style(element_style))
+    return compile_style(declarations)
+
 
 class MarkdownFormatter:
     """Enhanced Markdown formatter with themes for WeChat publishing."""
     
-    def __init__(self):
-        """Initialize the formatter."""
-        self.theme_manager = ThemeManager()
+    def __init__(self, theme_manager: Optional[ThemeManager] = None):
+        """Initialize the formatter.
+
+        Args:
+            theme_manager: Theme manager to share, a new one is created if omitted
+        """
+        self.theme_manager = theme_manager or ThemeManager()
         
-        # 配置Markdown扩展
-        self.md = markdown.Markdown(extensions=[
-            'markdown.extensions.extra',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.tables',
-            'markdown.extensions.fenced_code',
-            'markdown.extensions.footnotes',
-            'markdown.extensions.attr_list',
-            'markdown.extensions.def_list',
-            'markdown.extensions.abbr',
-            'markdown.extensions.md_in_html',
-        ], extension_configs={
-            'codehilite': {
-                'css_class': 'highlight',
-                'use_pygments': True
-            }
-        })
+        # Markdown实例不是线程安全的，每个线程使用各自的实例
+        self._md_local = threading.local()
         
         # 微信兼容的CSS样式
         self.base_styles = {
@@ -129,6 +168,22 @@ class MarkdownFormatter:
                 'border-radius': '4px'
             }
         }
+        
+        # 预先编译好的style字符串，格式化时直接使用
+        self.compiled_element_styles = {
+            tag_name: compile_style(declarations)
+            for tag_name, declarations in self.element_styles.items()
+        }
+
+    @property
+    def md(self) -> markdown.Markdown:
+        """Markdown converter for the current thread."""
+        md = getattr(self._md_local, 'md', None)
+        if md is None:
+            md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS,
+                                   extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+            self._md_local.md = md
+        return md
 
     def fix_encoding(self, content):
         """修复编码问题（使用统一编码处理工具）"""
@@ -159,15 +214,23 @@ class MarkdownFormatter:
             theme_id: Theme identifier to apply
             
         Returns:
-            Dictionary containing title, cover, and formatted HTML content
+            Dictionary containing title, cover, formatted HTML content and
+            its size (``stats``, a ContentStats)
         """
+        with tracing.span('formatter.format', theme=theme_id):
+            return self._format(content, theme_id)
+
+    def _format(self, content: str, theme_id: str) -> Dict[str, str]:
+        """Format markdown content; see ``format``."""
+        start = time.perf_counter()
         try:
             # 修复输入内容的编码
             if isinstance(content, bytes):
                 content = content.decode('utf-8')
             
             # Parse frontmatter
-            post = frontmatter.loads(content)
+            with tracing.span('frontmatter.loads'):
+                post = frontmatter.loads(content)
             metadata = post.metadata
             markdown_content = post.content
             
@@ -178,17 +241,20 @@ class MarkdownFormatter:
             logger.info(f"处理文章: {title}")
             
             # Convert markdown to HTML
-            html_content = self.md.convert(markdown_content)
+            with tracing.span('md.convert', bytes=len(markdown_content)):
+                html_content = self.md.reset().convert(markdown_content)
             
             # If no cover in frontmatter, try to extract from content
             if not cover:
-                first_image = self._extract_images(html_content)
+                with tracing.span('_extract_images'):
+                    first_image = self._extract_images(html_content)
                 if first_image:
                     cover = first_image[0] if isinstance(first_image, list) else first_image
             
             # Apply theme styling
             theme = self.theme_manager.get_theme(theme_id)
-            styled_html = self._apply_theme(html_content, theme)
+            with tracing.span('_apply_theme', theme=theme_id):
+                styled_html, stats = self._render_article(html_content, theme)
             
             # 确保编码正确
             if isinstance(styled_html, bytes):
@@ -197,7 +263,8 @@ class MarkdownFormatter:
             result = {
                 "title": title,
                 "cover": cover,
-                "content": styled_html
+                "content": styled_html,
+                "stats": stats
             }
             
             logger.info(f"格式化完成，标题: {title}")
@@ -211,6 +278,8 @@ class MarkdownFormatter:
                 "cover": "",
                 "content": f"<p>格式化错误: {str(e)}</p>"
             }
+        finally:
+            metrics.FORMAT_SECONDS.observe(time.perf_counter() - start, 'format')
 
     def format_markdown_for_wechat(self, content: str) -> str:
         """
@@ -222,13 +291,20 @@ class MarkdownFormatter:
         Returns:
             格式化后的HTML内容字符串
         """
+        with tracing.span('formatter.format_markdown_for_wechat'):
+            return self._format_markdown_for_wechat(content)
+
+    def _format_markdown_for_wechat(self, content: str) -> str:
+        """将Markdown内容格式化为微信公众号HTML，见format_markdown_for_wechat"""
+        start = time.perf_counter()
         try:
             # 修复输入内容的编码
             if isinstance(content, bytes):
                 content = content.decode('utf-8')
             
             # Parse frontmatter
-            post = frontmatter.loads(content)
+            with tracing.span('frontmatter.loads'):
+                post = frontmatter.loads(content)
             metadata = post.metadata
             markdown_content = post.content
             
@@ -237,16 +313,18 @@ class MarkdownFormatter:
             logger.info(f"处理文章: {title}")
             
             # Convert markdown to HTML
-            html_content = self.md.convert(markdown_content)
+            with tracing.span('md.convert', bytes=len(markdown_content)):
+                html_content = self.md.reset().convert(markdown_content)
             
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Clean up HTML for WeChat compatibility
-            self._clean_html_for_wechat(soup)
-            
-            # Apply additional WeChat-compatible styles
-            self._apply_enhanced_styles(soup)
+            with tracing.span('_clean_html_for_wechat'):
+                # Parse HTML with BeautifulSoup
+                soup = BeautifulSoup(html_content, 'html.parser')
+                
+                # Clean up HTML for WeChat compatibility
+                self._clean_html_for_wechat(soup)
+                
+                # Apply additional WeChat-compatible styles
+                self._apply_enhanced_styles(soup)
             
             # 修复编码问题
             result_html = str(soup)
@@ -265,6 +343,8 @@ class MarkdownFormatter:
             logger.exception("详细错误信息: ")
             # 返回包含错误信息的HTML
             return f'<p>格式化错误: {str(e)}</p>'
+        finally:
+            metrics.FORMAT_SECONDS.observe(time.perf_counter() - start, 'format_markdown_for_wechat')
 
     def _apply_theme(self, html_content: str, theme: 'Theme') -> str:
         """
@@ -277,6 +357,19 @@ class MarkdownFormatter:
         Returns:
             Styled HTML content
         """
+        return self._render_article(html_content, theme)[0]
+
+    def _render_article(self, html_content: str, theme: 'Theme') -> Tuple[str, ContentStats]:
+        """
+        Apply theme styling and measure the result while the DOM is at hand.
+        
+        Args:
+            html_content: Raw HTML content
+            theme: Theme to apply
+            
+        Returns:
+            Styled HTML content and its ContentStats
+        """
         try:
             # Parse HTML
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -289,11 +382,52 @@ class MarkdownFormatter:
             
             # 直接使用_wrap_in_template方法，确保主题CSS样式能够正确应用
             # 这个方法会创建包含CSS样式的完整HTML结构
-            return self._wrap_in_template(str(soup), theme)
+            styled_html = self._wrap_in_template(str(soup), theme)
                 
         except Exception as e:
             logger.error(f"Applying theme error: {e}")
-            return str(soup)
+            styled_html = str(soup)
+        
+        return styled_html, measure(soup, styled_html)
+
+    def split_content(self, html_content: str, theme_id: str = "default",
+                      max_bytes: Optional[int] = None, max_chars: Optional[int] = None) -> List[Tuple[str, ContentStats]]:
+        """
+        Split formatted content into parts that fit WeChat's size limits.
+        
+        Parts break at h1-h3 headings where possible, and each part is
+        wrapped in the theme template again.
+        
+        Args:
+            html_content: HTML returned by ``format``
+            theme_id: Theme the content was formatted with
+            max_bytes: Maximum HTML bytes per part, defaults to MAX_CONTENT_BYTES
+            max_chars: Maximum visible characters per part, defaults to MAX_CONTENT_CHARS
+            
+        Returns:
+            (HTML, ContentStats) for each part
+            
+        Raises:
+            ContentTooLargeError: If a single paragraph exceeds the limits
+        """
+        max_bytes = content_limits.MAX_CONTENT_BYTES if max_bytes is None else max_bytes
+        max_chars = content_limits.MAX_CONTENT_CHARS if max_chars is None else max_chars
+        
+        theme = self.theme_manager.get_theme(theme_id)
+        soup = BeautifulSoup(html_content, 'html.parser')
+        body = soup.find('div', class_='article-content') or soup
+        blocks = [child for child in body.children
+                  if not (isinstance(child, str) and not child.strip())]
+        overhead = len(self._wrap_in_template('', theme).encode('utf-8'))
+        
+        parts = []
+        for part_blocks in split_blocks(blocks, max_bytes, max_chars, overhead):
+            part_soup = BeautifulSoup('', 'html.parser')
+            for block in part_blocks:
+                part_soup.append(block.extract())
+            part_html = self._wrap_in_template(str(part_soup), theme)
+            parts.append((part_html, measure(part_soup, part_html)))
+        return parts
 
     def _combine_styles(self, theme_css: str) -> str:
         """组合主题样式和微信兼容样式"""
@@ -323,29 +457,17 @@ class MarkdownFormatter:
 
     def _apply_enhanced_styles(self, soup):
         """应用增强的微信兼容样式"""
-        for tag in soup.find_all():
-            tag_name = tag.name.lower()
-            
-            if tag_name in self.element_styles:
+        compiled_styles = self.compiled_element_styles
+        for tag in soup.find_all(list(compiled_styles)):
+            element_style = compiled_styles[tag.name]
+            existing_style = tag.get('style')
+            
+            if not existing_style or existing_style == element_style:
+                # 没有已有样式，直接使用预编译的样式
+                tag['style'] = element_style
+            else:
                 # 合并样式
-                existing_style = tag.get('style', '')
-                element_style = self.element_styles[tag_name]
-                
-                # 解析现有样式
-                css_dict = {}
-                if existing_style:
-                    for prop in existing_style.split(';'):
-                        if ':' in prop:
-                            key, value = prop.split(':', 1)
-                            css_dict[key.strip()] = value.strip()
-                
-                # 添加微信样式
-                for prop, value in self.element_styles[tag_name].items():
-                    css_dict[prop] = value
-                
-                # 转换回字符串
-                new_style = '; '.join([f"{k}: {v}" for k, v in css_dict.items()])
-                tag['style'] = new_style
+                tag['style'] = merge_style(existing_style, element_style)
 
     def _clean_html_for_wechat(self, soup):
         """
@@ -377,7 +499,7 @@ class MarkdownFormatter:
                 
                 # 确保有基本样式
                 if 'style' not in tag.attrs:
-                    tag['style'] = self.element_styles['img']
+                    tag['style'] = self.compiled_element_styles['img']
             
             # 清理a标签
             elif tag.name == 'a':
@@ -394,11 +516,11 @@ class MarkdownFormatter:
             # 清理代码块
             elif tag.name == 'pre':
                 if 'style' not in tag.attrs:
-                    tag['style'] = self.element_styles['pre']
+                    tag['style'] = self.compiled_element_styles['pre']
             
             elif tag.name == 'code':
                 if 'style' not in tag.attrs:
-                    tag['style'] = self.element_styles['code']
+                    tag['style'] = self.compiled_element_styles['code']
         
         # 转换不支持的元素
         for hr in soup.find_all('hr'):
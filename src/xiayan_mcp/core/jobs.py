@@ -0,0 +1,316 @@
+"""Persistent background publish jobs."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .pipeline import PUBLISH_STAGES
+from ..utils.paths import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+# 已结束的任务状态
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    stages TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobManager:
+    """Run publish jobs on an in-process worker queue.
+
+    Jobs and their per-stage progress are stored in SQLite. Jobs that were
+    queued or running when the server stopped are queued again on start.
+    """
+
+    def __init__(self, pipeline, db_path: Optional[Union[str, Path]] = None, workers: int = 2):
+        """
+        Initialize the job manager.
+
+        Args:
+            pipeline: PublishPipeline used to execute jobs
+            db_path: SQLite database path (default: ``<data dir>/jobs.db``)
+            workers: Number of jobs executed at the same time
+        """
+        self.pipeline = pipeline
+        self.db_path = Path(db_path) if db_path else None
+        self.workers = max(1, workers)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._closing = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use."""
+        if self._conn is None:
+            db_path = self.db_path or get_data_dir() / 'jobs.db'
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    # ========== Lifecycle ==========
+
+    async def start(self) -> int:
+        """
+        Start the workers and requeue unfinished jobs.
+
+        Returns:
+            Number of jobs requeued
+        """
+        if self._queue is not None:
+            return 0
+
+        self._closing = False
+        self._queue = asyncio.Queue()
+        rows = self.conn.execute(
+            "SELECT job_id, status FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+        for row in rows:
+            if row['status'] == 'running':
+                # 服务器重启前未完成的任务从头重新执行
+                self._update(row['job_id'], status='queued', stages=self._initial_stages())
+            self._queue.put_nowait(row['job_id'])
+        if rows:
+            logger.info(f"重新排队 {len(rows)} 个未完成的发布任务")
+
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return len(rows)
+
+    async def close(self) -> None:
+        """Stop the workers and close the database connection.
+
+        Running jobs stay in the ``running`` state and are requeued on next start.
+        """
+        self._closing = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._running.clear()
+        self._queue = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ========== Public API ==========
+
+    async def submit(self, params: Dict[str, Any]) -> str:
+        """
+        Queue a publish job.
+
+        Args:
+            params: publish_article arguments, with ``content`` or ``file_path``
+
+        Returns:
+            Job ID
+        """
+        if not params.get("content") and not params.get("file_path"):
+            raise ValueError("content或file_path不能为空")
+
+        await self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (job_id, status, params, stages, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False),
+                 json.dumps(self._initial_stages()), now, now)
+            )
+        self._queue.put_nowait(job_id)
+        logger.info(f"发布任务已提交: {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get the status of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dictionary, or None if the job does not exist
+        """
+        row = self.conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        List the most recent jobs.
+
+        Args:
+            status: Only return jobs with this status
+            limit: Maximum number of jobs
+
+        Returns:
+            Job dictionaries, newest first
+        """
+        if status:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            True if the job was cancelled, False if it does not exist or already finished
+        """
+        job = self.get(job_id)
+        if not job or job['status'] in FINISHED_STATUSES:
+            return False
+
+        # 排队中的任务由worker取出时跳过；运行中的任务直接取消
+        self._update(job_id, status='cancelled')
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        logger.info(f"发布任务已取消: {job_id}")
+        return True
+
+    async def wait(self, job_id: str, poll_interval: float = 0.05) -> Dict:
+        """Wait until a job has finished and return it."""
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            await asyncio.sleep(poll_interval)
+
+    # ========== Execution ==========
+
+    async def _worker(self) -> None:
+        """Take jobs from the queue and execute them one by one."""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.get(job_id)
+                if not job or job['status'] != 'queued':
+                    continue
+                self._update(job_id, status='running')
+                task = asyncio.create_task(self._execute(job_id, job['params']))
+                self._running[job_id] = task
+                try:
+                    result = await task
+                    self._update(job_id, status='succeeded', result=result)
+                except asyncio.CancelledError:
+                    if self._closing:
+                        # worker自身被取消（服务器关闭），任务保持running状态待重启后重新执行
+                        raise
+                except Exception as e:
+                    logger.error(f"发布任务 {job_id} 失败: {e}")
+                    self._update(job_id, status='failed', error=str(e))
+                finally:
+                    self._running.pop(job_id, None)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job_id: str, params: Dict[str, Any]) -> Dict:
+        """Run the publish pipeline for one job, recording stage progress."""
+        stages = self._initial_stages()
+
+        async def on_stage(event: Dict[str, Any]) -> None:
+            stage = stages[event['stage']]
+            stage['status'] = 'running' if event['status'] == 'started' else 'done'
+            if 'elapsed_ms' in event:
+                stage['elapsed_ms'] = round(event['elapsed_ms'], 1)
+            if 'bytes' in event:
+                stage['bytes'] = event['bytes']
+            self._update(job_id, stages=stages)
+
+        content = await self.pipeline.load_content(params)
+        return await self.pipeline.run(
+            content,
+            theme_id=params.get("theme_id") or "default",
+            permanent_cover=params.get("permanent_cover", False),
+            author=params.get("author") or "Xiayan MCP",
+            need_open_comment=params.get("need_open_comment", 0),
+            only_fans_can_comment=params.get("only_fans_can_comment", 0),
+            on_stage=on_stage,
+            oversize=params.get("oversize") or "reject",
+            idempotency_key=params.get("idempotency_key"),
+        )
+
+    # ========== Storage ==========
+
+    def _status(self, job_id: str) -> Optional[str]:
+        """Current status of a job."""
+        row = self.conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row['status'] if row else None
+
+    @staticmethod
+    def _initial_stages() -> Dict[str, Dict]:
+        """Stage progress of a job that has not started."""
+        return {stage: {'status': 'pending'} for stage in PUBLISH_STAGES}
+
+    def _update(self, job_id: str, status: Optional[str] = None, stages: Optional[Dict] = None,
+                result: Optional[Dict] = None, error: Optional[str] = None) -> None:
+        """Update selected fields of a job."""
+        fields = {'updated_at': time.time()}
+        if status is not None:
+            fields['status'] = status
+        if stages is not None:
+            fields['stages'] = json.dumps(stages)
+        if result is not None:
+            fields['result'] = json.dumps(result, ensure_ascii=False)
+        if error is not None:
+            fields['error'] = error
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.conn:
+            if status in ('succeeded', 'failed'):
+                # 已取消的任务不再被覆盖为完成状态
+                self.conn.execute(
+                    f"UPDATE jobs SET {assignments} WHERE job_id = ? AND status != 'cancelled'",
+                    (*fields.values(), job_id)
+                )
+            else:
+                self.conn.execute(
+                    f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id)
+                )
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        """Convert a database row to a job dictionary."""
+        params = json.loads(row['params'])
+        return {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'params': params,
+            'source': params.get('file_path') or 'content',
+            'stages': json.loads(row['stages']),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
@@ -0,0 +1,234 @@
+"""Garbage collector for orphaned and duplicate permanent materials."""
+
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .material_store import PAGE_SIZE
+from ..utils.concurrency import RateLimiter, gather_bounded
+
+logger = logging.getLogger(__name__)
+
+# GC运行模式
+GC_MODES = ('report', 'dry_run', 'delete')
+
+_IMG_SRC_PATTERN = re.compile(r'<img[^>]+?(?:data-src|src)=["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+class MaterialGC:
+    """Find and delete permanent image materials no longer used by any article.
+
+    Usage is collected from drafts (``draft/batchget``), published articles
+    (``freepublish/batchget``) and news materials. An image is referenced when
+    its ``media_id`` is used as ``thumb_media_id`` or its URL appears in an
+    article. Voice and video materials cannot be cross-referenced this way and
+    are never collected.
+    """
+
+    def __init__(self, publisher, store):
+        """
+        Initialize the collector.
+
+        Args:
+            publisher: WeChatPublisher used to list articles and delete materials
+            store: MaterialStore mirroring the permanent materials
+        """
+        self.publisher = publisher
+        self.store = store
+
+    async def run(self, mode: str = 'dry_run', include_orphans: bool = True,
+                  include_duplicates: bool = True, min_age_days: float = 1,
+                  max_deletions: Optional[int] = None, concurrency: int = 4,
+                  rate_per_second: float = 5) -> Dict:
+        """
+        Run the garbage collector.
+
+        Args:
+            mode: 'report' (usage summary), 'dry_run' (list candidates) or 'delete'
+            include_orphans: Collect images not referenced by any article
+            include_duplicates: Collect unreferenced copies of images with the same content hash
+            min_age_days: Never collect materials updated more recently than this
+            max_deletions: Maximum number of materials to delete in one run
+            concurrency: Maximum number of concurrent API calls
+            rate_per_second: Maximum number of delete calls per second
+
+        Returns:
+            GC report dictionary
+        """
+        if mode not in GC_MODES:
+            raise ValueError(f"不支持的GC模式: {mode}")
+
+        await self.store.sync(['image', 'news'], concurrency=concurrency)
+        media_ids, urls = await self.collect_references(concurrency)
+
+        materials = self.store.all_materials('image')
+        candidates = self.find_candidates(
+            materials, media_ids, urls, include_orphans, include_duplicates, min_age_days
+        )
+        if max_deletions is not None:
+            candidates = candidates[:max_deletions]
+
+        referenced = sum(1 for m in materials if self._is_referenced(m, media_ids, urls))
+        report = {
+            'mode': mode,
+            'total_materials': len(materials),
+            'referenced': referenced,
+            'unreferenced': len(materials) - referenced,
+            'duplicate_groups': len(self._duplicate_groups(materials)),
+            'candidate_count': len(candidates),
+        }
+        if mode == 'report':
+            return report
+
+        report['candidates'] = candidates
+        if mode == 'delete':
+            deleted, failed = await self._delete(candidates, concurrency, rate_per_second)
+            report['deleted'] = deleted
+            report['failed'] = failed
+        return report
+
+    # ========== References ==========
+
+    async def collect_references(self, concurrency: int = 4) -> Tuple[Set[str], Set[str]]:
+        """
+        Collect material usage from drafts, published articles and news materials.
+
+        Args:
+            concurrency: Maximum number of concurrent page fetches
+
+        Returns:
+            Tuple of (referenced media IDs, referenced image URLs)
+        """
+        media_ids: Set[str] = set()
+        urls: Set[str] = set()
+
+        items = await self._fetch_all(self.publisher.get_draft_list, concurrency)
+        items += await self._fetch_all(self.publisher.get_published_list, concurrency)
+        for item in items:
+            self._add_news_references(item.get('content', {}).get('news_item', []), media_ids, urls)
+
+        for item in self.store.raw_items('news'):
+            self._add_news_references(item.get('content', {}).get('news_item', []), media_ids, urls)
+
+        logger.info(f"素材引用收集完成: {len(media_ids)} 个media_id, {len(urls)} 个图片URL")
+        return media_ids, urls
+
+    async def _fetch_all(self, fetch_page, concurrency: int) -> List[Dict]:
+        """Fetch all pages of a paginated article listing."""
+        first_page = self._check(await fetch_page(0, PAGE_SIZE))
+        total_count = int(first_page.get('total_count', 0))
+        pages = [first_page] + await gather_bounded(
+            (fetch_page(offset, PAGE_SIZE) for offset in range(PAGE_SIZE, total_count, PAGE_SIZE)),
+            concurrency
+        )
+        return [item for page in pages for item in self._check(page).get('item', [])]
+
+    @staticmethod
+    def _check(result: Dict) -> Dict:
+        """Raise on WeChat API error responses."""
+        if result.get('errcode'):
+            raise Exception(f"获取文章列表失败: {result.get('errmsg', 'Unknown error')} "
+                            f"(错误码: {result.get('errcode')})")
+        return result
+
+    @staticmethod
+    def _add_news_references(news_items: List[Dict], media_ids: Set[str], urls: Set[str]) -> None:
+        """Record thumbs and inline images used by a list of news items."""
+        for news in news_items:
+            if news.get('thumb_media_id'):
+                media_ids.add(news['thumb_media_id'])
+            if news.get('thumb_url'):
+                urls.add(news['thumb_url'])
+            urls.update(_IMG_SRC_PATTERN.findall(news.get('content', '')))
+
+    @staticmethod
+    def _is_referenced(material: Dict, media_ids: Set[str], urls: Set[str]) -> bool:
+        """Whether a material is used by any article."""
+        return material['media_id'] in media_ids or bool(material['url'] and material['url'] in urls)
+
+    # ========== Candidates ==========
+
+    @staticmethod
+    def _duplicate_groups(materials: List[Dict]) -> Dict[str, List[Dict]]:
+        """Group materials by content hash, keeping only groups with copies."""
+        groups: Dict[str, List[Dict]] = {}
+        for material in materials:
+            if material['content_hash']:
+                groups.setdefault(material['content_hash'], []).append(material)
+        return {h: group for h, group in groups.items() if len(group) > 1}
+
+    def find_candidates(self, materials: List[Dict], media_ids: Set[str], urls: Set[str],
+                        include_orphans: bool = True, include_duplicates: bool = True,
+                        min_age_days: float = 1) -> List[Dict]:
+        """
+        Select materials that can be deleted.
+
+        Referenced materials are always kept. Within a group of duplicates
+        with no referenced copy, the newest copy is kept.
+
+        Args:
+            materials: Material summaries from the store, newest first
+            media_ids: Referenced media IDs
+            urls: Referenced image URLs
+            include_orphans: Collect unreferenced materials
+            include_duplicates: Collect unreferenced copies of duplicated content
+            min_age_days: Never collect materials updated more recently than this
+
+        Returns:
+            Candidate list with media_id, name, update_time, content_hash and reason
+        """
+        cutoff = time.time() - min_age_days * 86400
+        reasons: Dict[str, str] = {}
+
+        if include_duplicates:
+            for group in self._duplicate_groups(materials).values():
+                referenced = [m for m in group if self._is_referenced(m, media_ids, urls)]
+                keep = referenced or group[:1]
+                for material in group:
+                    if material not in keep:
+                        reasons[material['media_id']] = 'duplicate'
+
+        if include_orphans:
+            for material in materials:
+                if not self._is_referenced(material, media_ids, urls):
+                    reasons.setdefault(material['media_id'], 'orphan')
+
+        return [
+            {
+                'media_id': m['media_id'],
+                'name': m['name'],
+                'update_time': m['update_time'],
+                'content_hash': m['content_hash'],
+                'reason': reasons[m['media_id']],
+            }
+            for m in reversed(materials)  # 最旧的优先删除
+            if m['media_id'] in reasons and m['update_time'] < cutoff
+        ]
+
+    # ========== Deletion ==========
+
+    async def _delete(self, candidates: List[Dict], concurrency: int,
+                      rate_per_second: float) -> Tuple[List[str], List[Dict]]:
+        """Delete candidates with bounded concurrency and rate limiting."""
+        limiter = RateLimiter(rate_per_second)
+
+        async def _delete_one(media_id: str) -> bool:
+            await limiter.acquire()
+            return await self.publisher.delete_permanent_material(media_id)
+
+        results = await gather_bounded(
+            (_delete_one(c['media_id']) for c in candidates), concurrency, return_exceptions=True
+        )
+
+        deleted, failed = [], []
+        for candidate, result in zip(candidates, results):
+            if result is True:
+                self.store.remove(candidate['media_id'])
+                deleted.append(candidate['media_id'])
+            else:
+                error = str(result) if isinstance(result, Exception) else '删除失败'
+                failed.append({'media_id': candidate['media_id'], 'error': error})
+
+        logger.info(f"素材GC完成: 删除 {len(deleted)} 个, 失败 {len(failed)} 个")
+        return deleted, failed
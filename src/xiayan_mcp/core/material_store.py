@@ -0,0 +1,363 @@
+"""Local SQLite mirror of WeChat permanent materials."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from ..utils.concurrency import gather_bounded
+from ..utils.paths import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# 永久素材类型（batchget_material支持的类型）
+MATERIAL_TYPES = ('image', 'video', 'voice', 'news')
+
+# batchget_material单页最大数量
+PAGE_SIZE = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS materials (
+    media_id TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    update_time INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    search_text TEXT NOT NULL DEFAULT '',
+    raw TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_materials_type_time ON materials (media_type, update_time DESC);
+CREATE INDEX IF NOT EXISTS idx_materials_name ON materials (name);
+CREATE INDEX IF NOT EXISTS idx_materials_hash ON materials (content_hash);
+CREATE TABLE IF NOT EXISTS sync_state (
+    media_type TEXT PRIMARY KEY,
+    total_count INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+class MaterialStore:
+    """Local, indexed mirror of the permanent materials of an account.
+
+    Materials are fetched page by page from ``material/batchget_material`` and
+    kept in SQLite, so listing and searching no longer need a network round
+    trip per page. Only new or changed materials are rewritten on sync.
+    """
+
+    def __init__(self, publisher, db_path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            publisher: WeChatPublisher used to fetch materials
+            db_path: SQLite database path (default: ``<data dir>/materials.db``)
+        """
+        self.publisher = publisher
+        self.db_path = Path(db_path) if db_path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fts_enabled = False
+        self._sync_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use."""
+        if self._conn is None:
+            db_path = self.db_path or get_data_dir() / 'materials.db'
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(_SCHEMA)
+            self._fts_enabled = self._init_fts(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _init_fts(conn: sqlite3.Connection) -> bool:
+        """Create the full-text index if the SQLite build supports FTS5 trigrams."""
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts "
+                "USING fts5(media_id UNINDEXED, search_text, tokenize='trigram')"
+            )
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite不支持FTS5 trigram，搜索将使用LIKE: {e}")
+            return False
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ========== Sync ==========
+
+    async def sync(self, media_types: Optional[Iterable[str]] = None, concurrency: int = 4,
+                   hash_content: bool = True) -> Dict[str, Dict[str, int]]:
+        """
+        Synchronize the local mirror with the WeChat server.
+
+        Args:
+            media_types: Material types to sync (default: all permanent types)
+            concurrency: Maximum number of concurrent page fetches and downloads
+            hash_content: Download new or changed images to compute content hashes
+
+        Returns:
+            Per-type statistics (total, added, updated, removed)
+        """
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+
+        async with self._sync_lock:
+            stats = {}
+            for media_type in media_types or MATERIAL_TYPES:
+                if media_type not in MATERIAL_TYPES:
+                    raise ValueError(f"不支持的素材类型: {media_type}")
+                stats[media_type] = await self._sync_type(media_type, concurrency, hash_content)
+            return stats
+
+    async def _fetch_page(self, media_type: str, offset: int) -> Dict:
+        """Fetch one page of permanent materials and check for API errors."""
+        result = await self.publisher.get_media_list(media_type, True, offset, PAGE_SIZE)
+        if result.get('errcode'):
+            raise Exception(f"获取素材列表失败: {result.get('errmsg', 'Unknown error')} "
+                            f"(错误码: {result.get('errcode')})")
+        return result
+
+    async def _sync_type(self, media_type: str, concurrency: int, hash_content: bool) -> Dict[str, int]:
+        """Sync one material type."""
+        first_page = await self._fetch_page(media_type, 0)
+        total_count = int(first_page.get('total_count', 0))
+
+        # 其余页并发获取
+        offsets = range(PAGE_SIZE, total_count, PAGE_SIZE)
+        pages = [first_page] + await gather_bounded(
+            (self._fetch_page(media_type, offset) for offset in offsets), concurrency
+        )
+        remote_items = {}
+        for page in pages:
+            for item in page.get('item', []):
+                remote_items[item['media_id']] = item
+
+        known = {
+            row['media_id']: (row['update_time'], row['content_hash'])
+            for row in self.conn.execute(
+                "SELECT media_id, update_time, content_hash FROM materials WHERE media_type = ?",
+                (media_type,)
+            )
+        }
+        changed = [
+            item for media_id, item in remote_items.items()
+            if media_id not in known
+            or known[media_id][0] != self._update_time(item)
+            or (hash_content and known[media_id][1] is None and item.get('url'))
+        ]
+
+        hashes = await gather_bounded(
+            (self._content_hash(media_type, item, hash_content) for item in changed),
+            concurrency
+        )
+
+        now = time.time()
+        removed = [media_id for media_id in known if media_id not in remote_items]
+        with self.conn:
+            for item, content_hash in zip(changed, hashes):
+                self._upsert(media_type, item, content_hash, now)
+            for media_id in removed:
+                self._delete_row(media_id)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (media_type, total_count, synced_at) VALUES (?, ?, ?)",
+                (media_type, total_count, now)
+            )
+
+        added = sum(1 for item in changed if item['media_id'] not in known)
+        stats = {
+            'total': len(remote_items),
+            'added': added,
+            'updated': len(changed) - added,
+            'removed': len(removed),
+        }
+        logger.info(f"素材同步完成 ({media_type}): {stats}")
+        return stats
+
+    @staticmethod
+    def _update_time(item: Dict) -> int:
+        """Get the update time of a material item."""
+        return int(item.get('update_time') or item.get('content', {}).get('update_time') or 0)
+
+    async def _content_hash(self, media_type: str, item: Dict, hash_content: bool) -> Optional[str]:
+        """Compute the content hash of a material item.
+
+        News are hashed from their article payload; images are downloaded from
+        their URL. Voice and video items carry no URL and are not hashed.
+        """
+        if media_type == 'news':
+            news_items = item.get('content', {}).get('news_item', [])
+            payload = json.dumps(news_items, ensure_ascii=False, sort_keys=True)
+            return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+        url = item.get('url')
+        if not hash_content or not url:
+            return None
+        try:
+            data, _ = await self.publisher._download_media(url)
+            return hashlib.sha256(data).hexdigest()
+        except Exception as e:
+            logger.warning(f"下载素材 {item.get('media_id')} 计算哈希失败: {e}")
+            return None
+
+    def _upsert(self, media_type: str, item: Dict, content_hash: Optional[str], synced_at: float) -> None:
+        """Insert or replace one material row and its search entry."""
+        if media_type == 'news':
+            news_items = item.get('content', {}).get('news_item', [])
+            name = news_items[0].get('title', '') if news_items else ''
+            search_text = '\n'.join(
+                ' '.join(filter(None, (news.get('title'), news.get('author'), news.get('digest'))))
+                for news in news_items
+            )
+        else:
+            name = item.get('name', '')
+            search_text = name
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO materials "
+            "(media_id, media_type, name, url, update_time, content_hash, search_text, raw, synced_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (item['media_id'], media_type, name, item.get('url', ''), self._update_time(item),
+             content_hash, search_text, json.dumps(item, ensure_ascii=False), synced_at)
+        )
+        if self._fts_enabled:
+            self.conn.execute("DELETE FROM materials_fts WHERE media_id = ?", (item['media_id'],))
+            self.conn.execute(
+                "INSERT INTO materials_fts (media_id, search_text) VALUES (?, ?)",
+                (item['media_id'], search_text)
+            )
+
+    def _delete_row(self, media_id: str) -> None:
+        """Delete one material row and its search entry."""
+        self.conn.execute("DELETE FROM materials WHERE media_id = ?", (media_id,))
+        if self._fts_enabled:
+            self.conn.execute("DELETE FROM materials_fts WHERE media_id = ?", (media_id,))
+
+    def remove(self, media_id: str) -> None:
+        """Remove a material from the mirror (e.g. after deleting it remotely)."""
+        with self.conn:
+            self._delete_row(media_id)
+
+    def invalidate(self, media_type: str) -> None:
+        """Mark a material type as stale so the next listing re-syncs it."""
+        # 缩略图素材在batchget_material中归入image类型
+        if media_type == 'thumb':
+            media_type = 'image'
+        with self.conn:
+            self.conn.execute("DELETE FROM sync_state WHERE media_type = ?", (media_type,))
+
+    # ========== Queries ==========
+
+    def is_synced(self, media_type: str) -> bool:
+        """Whether the given material type has been synced at least once."""
+        row = self.conn.execute(
+            "SELECT 1 FROM sync_state WHERE media_type = ?", (media_type,)
+        ).fetchone()
+        return row is not None
+
+    def list_materials(self, media_type: str, offset: int = 0, count: int = 20) -> Dict:
+        """
+        List mirrored materials, newest first.
+
+        Args:
+            media_type: Type of media ('image', 'voice', 'video', 'news')
+            offset: Starting offset for pagination
+            count: Number of items to retrieve
+
+        Returns:
+            Dictionary shaped like a ``batchget_material`` response
+        """
+        total_count = self.conn.execute(
+            "SELECT COUNT(*) FROM materials WHERE media_type = ?", (media_type,)
+        ).fetchone()[0]
+        rows = self.conn.execute(
+            "SELECT raw FROM materials WHERE media_type = ? "
+            "ORDER BY update_time DESC, media_id LIMIT ? OFFSET ?",
+            (media_type, count, offset)
+        ).fetchall()
+        items = [json.loads(row['raw']) for row in rows]
+        return {'total_count': total_count, 'item_count': len(items), 'item': items}
+
+    def search(self, query: str, media_type: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        Search mirrored materials by name (and title/author/digest for news).
+
+        Args:
+            query: Text to search for
+            media_type: Optional material type filter
+            limit: Maximum number of results
+
+        Returns:
+            List of matching materials with media_id, media_type, name, url and update_time
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        type_clause = " AND m.media_type = ?" if media_type else ""
+        type_params = (media_type,) if media_type else ()
+
+        # trigram分词只能匹配至少3个字符的查询，较短的查询使用LIKE
+        if self._fts_enabled and len(query) >= 3:
+            fts_query = '"' + query.replace('"', '""') + '"'
+            rows = self.conn.execute(
+                "SELECT m.* FROM materials_fts f JOIN materials m ON m.media_id = f.media_id "
+                "WHERE materials_fts MATCH ?" + type_clause +
+                " ORDER BY m.update_time DESC LIMIT ?",
+                (fts_query, *type_params, limit)
+            ).fetchall()
+        else:
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            rows = self.conn.execute(
+                "SELECT m.* FROM materials m WHERE m.search_text LIKE ? ESCAPE '\\'" + type_clause +
+                " ORDER BY m.update_time DESC LIMIT ?",
+                (pattern, *type_params, limit)
+            ).fetchall()
+
+        return [self._row_summary(row) for row in rows]
+
+    def all_materials(self, media_type: str) -> List[Dict]:
+        """Get summaries of all mirrored materials of one type, newest first."""
+        rows = self.conn.execute(
+            "SELECT * FROM materials WHERE media_type = ? ORDER BY update_time DESC, media_id",
+            (media_type,)
+        ).fetchall()
+        return [self._row_summary(row) for row in rows]
+
+    def raw_items(self, media_type: str) -> List[Dict]:
+        """Get the raw ``batchget_material`` items of one type."""
+        rows = self.conn.execute(
+            "SELECT raw FROM materials WHERE media_type = ?", (media_type,)
+        ).fetchall()
+        return [json.loads(row['raw']) for row in rows]
+
+    def find_by_hash(self, content_hash: str) -> List[Dict]:
+        """Get all mirrored materials with the given content hash."""
+        rows = self.conn.execute(
+            "SELECT * FROM materials WHERE content_hash = ? ORDER BY update_time DESC",
+            (content_hash,)
+        ).fetchall()
+        return [self._row_summary(row) for row in rows]
+
+    @staticmethod
+    def _row_summary(row: sqlite3.Row) -> Dict:
+        """Convert a materials row to a summary dictionary."""
+        return {
+            'media_id': row['media_id'],
+            'media_type': row['media_type'],
+            'name': row['name'],
+            'url': row['url'],
+            'update_time': row['update_time'],
+            'content_hash': row['content_hash'],
+        }
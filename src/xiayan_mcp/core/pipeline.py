@@ -0,0 +1,398 @@
+"""Shared article publishing pipeline."""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .content_limits import ContentTooLargeError
+from .draft_store import draft_hash, publish_key
+from ..utils import metrics, tracing
+from ..utils.concurrency import run_in_cpu_pool
+from ..utils.encoding import enconding_utils
+from ..utils.minify import MINIFY_HTML, minify_html
+
+logger = logging.getLogger(__name__)
+
+_MARKDOWN_H1_PATTERN = re.compile(r'^#\s+(.+)', re.MULTILINE)
+
+# 发布流程的各个阶段
+PUBLISH_STAGES = ('encoding', 'format', 'cover', 'inline_images', 'draft')
+
+# 阶段事件回调，参数为 {"stage", "status", "elapsed_ms", "bytes", ...}
+StageCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def fix_article_encoding(content: str) -> str:
+    """
+    Fix encoding issues in raw Markdown content.
+
+    Args:
+        content: Raw Markdown content (str or UTF-8 bytes)
+
+    Returns:
+        Fixed Markdown content
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    try:
+        return enconding_utils.fix_encoding(content)
+    except Exception as e:
+        logger.warning(f"修复内容编码时出错: {e}，继续使用原始内容")
+        return content
+
+
+def format_article(formatter, content: str, theme_id: str = "default",
+                   oversize: str = "reject") -> Dict[str, Any]:
+    """
+    Format one Markdown document whose encoding has already been fixed.
+
+    Args:
+        formatter: MarkdownFormatter instance
+        content: Markdown content with optional frontmatter
+        theme_id: Theme identifier to apply
+        oversize: What to do when the content exceeds WeChat's size limits:
+                  ``reject`` raises ContentTooLargeError, ``split`` splits it
+                  into a multi-part series (returned as ``parts``)
+
+    Returns:
+        Dictionary containing title, cover, formatted HTML content, its
+        ContentStats and, for split articles, the list of parts
+    """
+    formatted = formatter.format(content, theme_id)
+    html_content = formatted.get("content", "")
+    if not html_content.strip():
+        raise ValueError("格式化后的内容为空")
+
+    # 与单篇发布保持一致的最终编码检查
+    if enconding_utils.needs_encoding_fix(html_content):
+        html_content = enconding_utils.fix_encoding(html_content)
+
+    # 去掉文档外壳、多余空白和重复样式，减小草稿请求体积
+    stats = formatted.get("stats")
+    if MINIFY_HTML:
+        html_content = minify_html(html_content)
+    if stats is not None:
+        stats = replace(stats, html_bytes=len(html_content.encode('utf-8')))
+
+    title = formatted.get("title", "")
+    if not title:
+        # frontmatter中没有标题时使用第一个一级标题
+        title_match = _MARKDOWN_H1_PATTERN.search(content)
+        title = title_match.group(1).strip() if title_match else "未命名文章"
+
+    prepared = {
+        "title": title,
+        "cover": formatted.get("cover", ""),
+        "content": html_content,
+        "stats": stats,
+    }
+
+    # 在上传封面和调用接口之前检查内容大小
+    problems = stats.violations() if stats is not None else []
+    if problems:
+        if oversize != "split":
+            raise ContentTooLargeError(
+                f"文章内容超出微信限制：{'；'.join(problems)}。可以将oversize设置为split自动拆分为多篇")
+        prepared["parts"] = split_article(formatter, prepared, theme_id)
+    return prepared
+
+
+def split_article(formatter, prepared: Dict[str, Any], theme_id: str = "default") -> List[Dict[str, Any]]:
+    """
+    Split an oversized formatted article into a series of at most 8 parts.
+
+    Args:
+        formatter: MarkdownFormatter the article was formatted with
+        prepared: Result of :func:`format_article`
+        theme_id: Theme identifier the article was formatted with
+
+    Returns:
+        Parts with title (numbered, e.g. ``标题（1/3）``), cover, content and stats
+    """
+    from .publisher import MAX_DRAFT_ARTICLES
+
+    parts = formatter.split_content(prepared["content"], theme_id)
+    if len(parts) > MAX_DRAFT_ARTICLES:
+        raise ContentTooLargeError(
+            f"文章拆分后共{len(parts)}篇，超过一个草稿最多{MAX_DRAFT_ARTICLES}篇的限制")
+    logger.info(f"文章超出微信内容限制，已按标题拆分为{len(parts)}篇: {prepared['title']}")
+    series = []
+    for i, (html_content, stats) in enumerate(parts, 1):
+        if MINIFY_HTML:
+            html_content = minify_html(html_content)
+            stats = replace(stats, html_bytes=len(html_content.encode('utf-8')))
+        series.append({
+            "title": f"{prepared['title']}（{i}/{len(parts)}）" if len(parts) > 1 else prepared["title"],
+            "cover": prepared["cover"],
+            "content": html_content,
+            "stats": stats,
+        })
+    return series
+
+
+def prepare_article(formatter, content: str, theme_id: str = "default",
+                    oversize: str = "reject") -> Dict[str, Any]:
+    """
+    Fix encoding and format one Markdown document.
+
+    This is CPU bound and safe to run on worker threads.
+
+    Args:
+        formatter: MarkdownFormatter instance
+        content: Raw Markdown content with optional frontmatter
+        theme_id: Theme identifier to apply
+        oversize: ``reject`` or ``split``, see :func:`format_article`
+
+    Returns:
+        Dictionary containing title, cover, formatted HTML content and its stats
+    """
+    return format_article(formatter, fix_article_encoding(content), theme_id, oversize)
+
+
+class PublishPipeline:
+    """Publish pipeline split into stages that can be observed and scheduled.
+
+    Formatting stages run on the shared CPU pool; upload and draft stages run
+    on the publisher's shared HTTP session.
+    """
+
+    def __init__(self, formatter, publisher):
+        """
+        Initialize the pipeline.
+
+        Args:
+            formatter: MarkdownFormatter instance
+            publisher: WeChatPublisher instance
+        """
+        self.formatter = formatter
+        self.publisher = publisher
+
+    @asynccontextmanager
+    async def _stage(self, name: str, on_stage: Optional[StageCallback]):
+        """Time a stage and report its start and end to ``on_stage``.
+
+        The yielded dictionary can be filled with extra fields such as ``bytes``.
+        """
+        info: Dict[str, Any] = {}
+        if on_stage:
+            await on_stage({"stage": name, "status": "started"})
+        start = time.perf_counter()
+        with tracing.span(f"stage.{name}") as span:
+            yield info
+            if 'bytes' in info:
+                span.set_attribute('bytes', info['bytes'])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.PUBLISH_STAGE_SECONDS.observe(elapsed_ms / 1000, name)
+        size = f"，{info['bytes']} 字节" if 'bytes' in info else ""
+        logger.info(f"发布阶段 {name} 完成，耗时 {elapsed_ms:.1f}ms{size}")
+        if on_stage:
+            await on_stage({"stage": name, "status": "finished", "elapsed_ms": elapsed_ms, **info})
+
+    async def prepare(self, content: str, theme_id: str = "default",
+                      on_stage: Optional[StageCallback] = None,
+                      oversize: str = "reject") -> Dict[str, Any]:
+        """
+        Run the encoding and format stages on the CPU pool.
+
+        Oversized content is rejected, or split, in the format stage before
+        any upload happens.
+
+        Args:
+            content: Raw Markdown content with optional frontmatter
+            theme_id: Theme identifier to apply
+            on_stage: Optional stage event callback
+            oversize: ``reject`` or ``split``, see :func:`format_article`
+
+        Returns:
+            Dictionary containing title, cover, formatted HTML content, its
+            stats, the default publish key and, for split articles, the list
+            of parts
+        """
+        async with self._stage("encoding", on_stage) as info:
+            content = await run_in_cpu_pool(fix_article_encoding, content)
+            info["bytes"] = len(content.encode('utf-8'))
+
+        async with self._stage("format", on_stage) as info:
+            prepared = await run_in_cpu_pool(format_article, self.formatter, content, theme_id, oversize)
+            info["bytes"] = len(prepared["content"].encode('utf-8'))
+            if "parts" in prepared:
+                info["parts"] = len(prepared["parts"])
+
+        # 相同Markdown和主题的重复发布返回已有草稿
+        prepared["publish_key"] = publish_key(content, theme_id)
+        return prepared
+
+    async def publish(self, prepared: Dict[str, Any], permanent_cover: bool = False,
+                      author: str = "Xiayan MCP", need_open_comment: int = 0,
+                      only_fans_can_comment: int = 0,
+                      on_stage: Optional[StageCallback] = None,
+                      idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run the cover, inline image and draft stages.
+
+        Publishing is idempotent per publish key: a repeat with the same key
+        and content returns the existing draft without running any stage,
+        and a repeat with changed content updates that draft through
+        draft/update, reusing its cover when the cover did not change.
+
+        Args:
+            prepared: Result of :meth:`prepare`
+            permanent_cover: Whether to upload cover as permanent material
+            author: Article author
+            need_open_comment: Enable open comments (0/1)
+            only_fans_can_comment: Only fans can comment (0/1)
+            on_stage: Optional stage event callback
+            idempotency_key: Client supplied publish key (default: hash of
+                the Markdown and theme, see :meth:`prepare`)
+
+        Returns:
+            Dictionary with media_id, title, status and cover_media_id, plus
+            the part titles (``parts``) for split articles and ``deduplicated``
+            or ``updated`` when an existing draft was returned or updated
+        """
+        parts = prepared.get("parts") or [prepared]
+        cover = prepared.get("cover", "")
+        content_hash = draft_hash(parts, author=author, need_open_comment=need_open_comment,
+                                  only_fans_can_comment=only_fans_can_comment)
+
+        async def _publish(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            return await self._publish_parts(prepared, parts, author, need_open_comment,
+                                             only_fans_can_comment, on_stage, record)
+
+        return await self.publisher._publish_once(
+            idempotency_key or prepared.get("publish_key"), content_hash, len(parts), cover, _publish)
+
+    async def _publish_parts(self, prepared: Dict[str, Any], parts: List[Dict[str, Any]], author: str,
+                             need_open_comment: int, only_fans_can_comment: int,
+                             on_stage: Optional[StageCallback],
+                             record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Publish an article, or the parts of a split article sharing one cover, as one draft."""
+        cover = prepared.get("cover", "")
+
+        async def _cover() -> str:
+            async with self._stage("cover", on_stage):
+                # 更新草稿时封面未变化则沿用，不再上传新的永久素材
+                return (self.publisher._reusable_cover(record, cover)
+                        or await self.publisher._get_or_create_cover(cover, parts[0]["content"]))
+
+        async def _inline_images() -> List[str]:
+            async with self._stage("inline_images", on_stage) as info:
+                result = await asyncio.gather(*(
+                    self.publisher.upload_inline_images(part["content"]) for part in parts
+                ))
+                info["bytes"] = sum(len(content.encode('utf-8')) for content in result)
+                return result
+
+        cover_media_id, contents = await asyncio.gather(_cover(), _inline_images())
+
+        async with self._stage("draft", on_stage) as info:
+            articles = [
+                self.publisher._build_draft_article(
+                    part["title"], content, cover_media_id, author, need_open_comment, only_fans_can_comment
+                )
+                for part, content in zip(parts, contents)
+            ]
+            info["bytes"] = sum(len(content.encode('utf-8')) for content in contents)
+            media_id, updated = await self.publisher._submit_draft(articles, record)
+
+        result = self.publisher._build_publish_result(media_id, prepared["title"], cover_media_id)
+        if prepared.get("parts"):
+            result["parts"] = [part["title"] for part in parts]
+        if updated:
+            result["updated"] = True
+        return result
+
+    async def run(self, content: str, theme_id: str = "default", permanent_cover: bool = False,
+                  author: str = "Xiayan MCP", need_open_comment: int = 0,
+                  only_fans_can_comment: int = 0,
+                  on_stage: Optional[StageCallback] = None,
+                  oversize: str = "reject", idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Run all stages for one Markdown document."""
+        prepared = await self.prepare(content, theme_id, on_stage, oversize)
+        return await self.publish(prepared, permanent_cover, author, need_open_comment,
+                                  only_fans_can_comment, on_stage, idempotency_key)
+
+    async def load_content(self, item: Dict) -> str:
+        """
+        Get the Markdown content of an item given as ``content`` or ``file_path``.
+
+        Args:
+            item: Dictionary with ``content`` or ``file_path``
+
+        Returns:
+            Raw Markdown content
+        """
+        content = item.get("content")
+        if not content and item.get("file_path"):
+            content = await run_in_cpu_pool(_read_text, item["file_path"])
+        if not content:
+            raise ValueError("content或file_path不能为空")
+        return content
+
+    async def run_batch(self, items: List[Dict], concurrency: int = 4,
+                        defaults: Optional[Dict] = None,
+                        on_item: Optional[Callable[[Dict], Awaitable[None]]] = None) -> List[Dict]:
+        """
+        Publish many articles, continuing past individual failures.
+
+        Formatting of all items is scheduled on the CPU pool right away; each
+        item then enters the upload/draft stages as soon as it is formatted,
+        with at most ``concurrency`` items uploading at the same time.
+
+        Args:
+            items: Dictionaries with ``content`` or ``file_path`` and optional
+                   ``theme_id``, ``author``, ``permanent_cover``,
+                   ``need_open_comment``, ``only_fans_can_comment``, ``oversize``
+                   and ``idempotency_key``
+            concurrency: Maximum number of items in the upload/draft stages
+            defaults: Default values for the optional item fields
+            on_item: Optional callback receiving each item report when it finishes
+
+        Returns:
+            Per-item status reports in input order
+        """
+        defaults = defaults or {}
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _publish_one(index: int, item: Dict) -> Dict:
+            options = {**defaults, **item}
+            report = {"index": index, "source": item.get("file_path") or "content"}
+            start = time.perf_counter()
+            try:
+                content = await self.load_content(options)
+                prepared = await self.prepare(content, options.get("theme_id") or "default",
+                                              oversize=options.get("oversize") or "reject")
+                report["title"] = prepared["title"]
+                async with semaphore:
+                    result = await self.publish(
+                        prepared,
+                        permanent_cover=options.get("permanent_cover", False),
+                        author=options.get("author") or "Xiayan MCP",
+                        need_open_comment=options.get("need_open_comment", 0),
+                        only_fans_can_comment=options.get("only_fans_can_comment", 0),
+                        idempotency_key=item.get("idempotency_key"),
+                    )
+                report.update(status="success", media_id=result["media_id"],
+                              cover_media_id=result.get("cover_media_id", ""))
+                for flag in ("deduplicated", "updated"):
+                    if result.get(flag):
+                        report[flag] = True
+            except Exception as e:
+                logger.warning(f"批量发布第{index + 1}篇失败: {e}")
+                report.update(status="error", error=str(e))
+            report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            if on_item:
+                await on_item(report)
+            return report
+
+        return await asyncio.gather(*(_publish_one(i, item) for i, item in enumerate(items)))
+
+
+def _read_text(path: str) -> str:
+    """Read a UTF-8 text file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
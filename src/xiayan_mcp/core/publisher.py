@@ -1,13 +1,22 @@
 """WeChat Official Account publisher."""
 
 import os
+import re
+import time
 import asyncio
 import logging
-from typing import Dict, Optional, List, Union, Tuple
+from typing import Any, Awaitable, Callable, Dict, Optional, List, Union, Tuple
 import aiohttp
 import json
 import mimetypes
 import tempfile
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from .draft_store import DraftStore, draft_hash, publish_key
+from ..utils import log, metrics, tracing
+from ..utils.concurrency import gather_bounded, run_in_cpu_pool
+from ..utils.minify import MINIFY_HTML, minify_html
 
 # 配置日志
 logging.basicConfig(
@@ -20,6 +29,18 @@ logger.setLevel(logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+# 共享HTTP连接池大小
+HTTP_POOL_SIZE = int(os.getenv('WECHAT_HTTP_POOL_SIZE', '10'))
+
+# 单个草稿最多包含的文章数
+MAX_DRAFT_ARTICLES = 8
+
+# 微信图片域名，正文中这些地址的图片无需重新上传
+WECHAT_IMAGE_HOSTS = ('http://mmbiz.qpic.cn', 'https://mmbiz.qpic.cn',
+                      'http://mmbiz.qlogo.cn', 'https://mmbiz.qlogo.cn')
+
+INLINE_IMAGE_PATTERN = re.compile(r'<img[^>]+src="([^"]+)"', re.IGNORECASE)
+
 
 # 微信API错误码映射表
 WECHAT_ERROR_CODES = {
@@ -163,9 +184,74 @@ class WeChatPublisher:
         """Initialize the publisher with WeChat API credentials."""
         self.app_id = os.getenv('WECHAT_APP_ID', '')
         self.app_secret = os.getenv('WECHAT_APP_SECRET', '')
-        self.base_url = 'https://api.weixin.qq.com/cgi-bin'
+        # 可指向本地模拟接口（xiayan_mcp.testing.fake_wechat）进行离线测试
+        self.base_url = os.getenv('WECHAT_API_BASE_URL', 'https://api.weixin.qq.com/cgi-bin').rstrip('/')
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[int] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._default_cover_media_id: Optional[str] = None
+        self._default_cover_lock: Optional[asyncio.Lock] = None
+        # 发布键和对应草稿的本地记录，用于幂等发布
+        self.draft_store = DraftStore()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use.
+
+        The session is bound to the event loop it was created on, so a new one
+        is created when the publisher is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  trace_configs=[self._trace_config()])
+            self._session_loop = loop
+        return self._session
+
+    def _api_endpoint(self, url) -> str:
+        """Metric label for a request URL, e.g. ``draft/add``; non-API URLs are ``external``."""
+        base = urlsplit(self.base_url)
+        if url.host != base.hostname or not url.path.startswith(base.path):
+            return 'external'
+        return url.path[len(base.path):].strip('/') or '/'
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Trace hooks recording per-endpoint request latency, status and tracing spans."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.start = time.perf_counter()
+            context.endpoint = self._api_endpoint(params.url)
+            context.span = tracing.start_span(f"http {context.endpoint}", method=params.method)
+
+        async def on_request_end(session, context, params):
+            metrics.WECHAT_API_SECONDS.observe(time.perf_counter() - context.start, context.endpoint)
+            metrics.WECHAT_API_REQUESTS.inc(context.endpoint, params.response.status)
+            context.span.set_attribute('status', params.response.status)
+            context.span.end()
+
+        async def on_request_exception(session, context, params):
+            metrics.WECHAT_API_REQUESTS.inc(context.endpoint, 'error')
+            context.span.end(params.exception)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    @asynccontextmanager
+    async def _session_scope(self):
+        """Yield the shared HTTP session without closing it afterwards."""
+        yield await self._get_session()
+
+    async def close(self) -> None:
+        """Close the shared HTTP session and the draft record database."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        self.draft_store.close()
 
     def _handle_wechat_api_error(self, data: Dict, context: str = "操作") -> None:
         """Handle WeChat API error responses.
@@ -181,7 +267,11 @@ class WeChatPublisher:
             return  # No error, upload successful
             
         errcode = data.get('errcode')
+        if errcode in (None, 0):
+            return  # No error (e.g. {"errcode": 0, "errmsg": "ok"} or {"url": ...})
+        
         errmsg = data.get('errmsg', 'Unknown error')
+        metrics.record_wechat_error(errcode, WECHAT_ERROR_CODES)
         
         # Get friendly error message from mapping table
         friendly_msg = WECHAT_ERROR_CODES.get(errcode, errmsg)
@@ -194,7 +284,9 @@ class WeChatPublisher:
         
         # Check if token is still valid
         if self.access_token and self.token_expires_at and time.time() < self.token_expires_at:
+            metrics.record_cache('access_token', True)
             return self.access_token
+        metrics.record_cache('access_token', False)
 
         if not self.app_id or not self.app_secret:
             raise ValueError("WECHAT_APP_ID and WECHAT_APP_SECRET environment variables are required")
@@ -208,7 +300,7 @@ class WeChatPublisher:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope() as session:
                 async with session.get(url, params=params) as response:
                     # First check response status
                     if response.status != 200:
@@ -219,7 +311,7 @@ class WeChatPublisher:
                     response_text = await response.text()
                     
                     # Debug: Log response for troubleshooting
-                    logger.debug(f"Token response: {response_text[:200]}")
+                    logger.debug("Token response: %s", response_text[:200])
                     
                     try:
                         data = json.loads(response_text)
@@ -231,6 +323,7 @@ class WeChatPublisher:
                     self._handle_wechat_api_error(data, "获取访问令牌")
                     
                     self.access_token = data['access_token']
+                    metrics.TOKEN_REFRESHES.inc('token')
                     expires_in = data.get('expires_in', 7200)
                     self.token_expires_at = time.time() + expires_in - 300  # Refresh 5 minutes before expiry
                     return self.access_token
@@ -253,7 +346,7 @@ class WeChatPublisher:
             "force_refresh": False
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -267,7 +360,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Log response for troubleshooting
-                logger.debug(f"Stable token response: {response_text[:200]}")
+                logger.debug("Stable token response: %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
@@ -282,6 +375,7 @@ class WeChatPublisher:
                     raise Exception(f"Invalid response from stable token API: 缺少必要字段")
                 
                 self.access_token = result['access_token']
+                metrics.TOKEN_REFRESHES.inc('stable_token')
                 expires_in = result['expires_in']
                 self.token_expires_at = time.time() + expires_in - 300  # Refresh 5 minutes before expiry
                 return self.access_token
@@ -405,7 +499,8 @@ class WeChatPublisher:
                 temp_path = None
             
             # Resize image to meet thumb requirements
-            resized_path = await self._resize_image_for_thumb(media_path)
+            with tracing.span('_resize_image_for_thumb'):
+                resized_path = await self._resize_image_for_thumb(media_path)
             media_path = resized_path
             
             # Read the resized file
@@ -446,7 +541,7 @@ class WeChatPublisher:
             
             data.add_field('media', media_data, filename=filename, content_type=content_type)
             
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope() as session:
                 data = aiohttp.FormData()
                 
                 if permanent and media_type == 'video' and description:
@@ -455,6 +550,7 @@ class WeChatPublisher:
                                  content_type='application/json')
                 
                 data.add_field('media', media_data, filename=filename, content_type=content_type)
+                metrics.UPLOAD_BYTES.inc(media_type, amount=len(media_data))
                 
                 async with session.post(url, data=data) as response:
                     # First check response status
@@ -466,7 +562,7 @@ class WeChatPublisher:
                     response_text = await response.text()
                     
                     # Debug: Log first 200 chars of response for troubleshooting
-                    logger.debug(f"Upload response (first 200 chars): {response_text[:200]}")
+                    logger.debug("Upload response (first 200 chars): %s", response_text[:200])
                     
                     try:
                         result = json.loads(response_text)
@@ -495,7 +591,7 @@ class WeChatPublisher:
 
     async def _download_media(self, url: str) -> Tuple[bytes, str]:
         """Download media from remote URL and return data with filename."""
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             async with session.get(url) as response:
                 if response.status != 200:
                     raise Exception(f"Failed to download media: HTTP {response.status}")
@@ -535,58 +631,7 @@ class WeChatPublisher:
         Returns:
             Media ID of the created draft
         """
-        access_token = await self._get_access_token()
-        url = f"{self.base_url}/draft/add?access_token={access_token}"
-        
-        # Build article object according to WeChat API requirements
-        article = {
-            "title": title,
-            "content": content,
-            "digest": "",  # Auto-generated by WeChat
-            "author": "Xiayan MCP",
-            "content_source_url": "",
-            "show_cover_pic": 0,
-            "need_open_comment": 0,
-            "only_fans_can_comment": 0
-        }
-        
-        # Only add cover media if provided and valid
-        if cover_media_id:
-            article["show_cover_pic"] = 1
-            article["thumb_media_id"] = cover_media_id
-
-        articles = [article]
-        data = {"articles": articles}
-        
-        async with aiohttp.ClientSession() as session:
-            headers = {'Content-Type': 'application/json; charset=utf-8'}
-            # 手动序列化JSON，确保中文字符不被转义
-            json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-            async with session.post(url, data=json_data, headers=headers) as response:
-                # First check response status
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"HTTP error {response.status}: {error_text}")
-                
-                # Get response text and try to parse as JSON regardless of content type
-                response_text = await response.text()
-                
-                # Debug: Log first 200 chars of response for troubleshooting
-                logger.debug(f"Response (first 200 chars): {response_text[:200]}")
-                
-                try:
-                    result = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    content_type = response.headers.get('content-type', '')
-                    raise Exception(f"Failed to parse JSON response from {content_type}: {e}\nResponse content: {response_text[:500]}")
-                
-                # Handle API errors
-                self._handle_wechat_api_error(result, "添加草稿")
-                
-                if 'media_id' not in result:
-                    raise Exception(f"Failed to add draft: 缺少media_id字段")
-                
-                return result['media_id']
+        return await self._add_draft_with_options(title, content, cover_media_id)
 
     async def upload_cover_image(self, image_path: str) -> str:
         """
@@ -607,11 +652,11 @@ class WeChatPublisher:
         except Exception as e:
             raise Exception(f"Failed to upload cover image: {str(e)}")
 
-    async def _add_draft_with_options(self, title: str, content: str, cover_media_id: str = '',
-                                    author: str = "Xiayan MCP", need_open_comment: int = 0, 
-                                    only_fans_can_comment: int = 0) -> str:
+    def _build_draft_article(self, title: str, content: str, cover_media_id: str = '',
+                             author: str = "Xiayan MCP", need_open_comment: int = 0,
+                             only_fans_can_comment: int = 0, digest: str = '') -> Dict:
         """
-        Add article to WeChat draft using the new API with extended options.
+        Build one article object for the draft API.
         
         Args:
             title: Article title
@@ -620,18 +665,16 @@ class WeChatPublisher:
             author: Article author
             need_open_comment: Enable open comments (0/1)
             only_fans_can_comment: Only fans can comment (0/1)
+            digest: Article summary (empty: auto-generated by WeChat)
             
         Returns:
-            Media ID of the created draft
+            Article dictionary
         """
-        access_token = await self._get_access_token()
-        url = f"{self.base_url}/draft/add?access_token={access_token}"
-        
         # Build article object according to WeChat API requirements
         article = {
             "title": title,
             "content": content,
-            "digest": "",  # Auto-generated by WeChat
+            "digest": digest,
             "author": author,
             "content_source_url": "",
             "show_cover_pic": 0,
@@ -643,11 +686,25 @@ class WeChatPublisher:
         if cover_media_id:
             article["show_cover_pic"] = 1
             article["thumb_media_id"] = cover_media_id
+        
+        return article
 
-        articles = [article]
+    async def _post_draft(self, articles: List[Dict]) -> str:
+        """
+        Submit articles to the draft/add API in a single call.
+        
+        Args:
+            articles: Article objects built by _build_draft_article
+            
+        Returns:
+            Media ID of the created draft
+        """
+        access_token = await self._get_access_token()
+        url = f"{self.base_url}/draft/add?access_token={access_token}"
+        
         data = {"articles": articles}
         
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -661,7 +718,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Log first 200 chars of response for troubleshooting
-                logger.debug(f"Response (first 200 chars): {response_text[:200]}")
+                logger.debug("Response (first 200 chars): %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
@@ -677,9 +734,172 @@ class WeChatPublisher:
                 
                 return result['media_id']
 
+    async def _update_draft(self, media_id: str, index: int, article: Dict) -> None:
+        """
+        Replace one article of an existing draft through the draft/update API.
+        
+        Args:
+            media_id: Media ID of the draft
+            index: Position of the article in the draft (0 for the first)
+            article: Article object built by _build_draft_article
+        """
+        access_token = await self._get_access_token()
+        url = f"{self.base_url}/draft/update?access_token={access_token}"
+        
+        data = {"media_id": media_id, "index": index, "articles": article}
+        
+        async with self._session_scope() as session:
+            headers = {'Content-Type': 'application/json; charset=utf-8'}
+            json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+            async with session.post(url, data=json_data, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"HTTP error {response.status}: {error_text}")
+                
+                response_text = await response.text()
+                try:
+                    result = json.loads(response_text)
+                except json.JSONDecodeError as e:
+                    raise Exception(f"Failed to parse JSON response: {e}\nResponse content: {response_text[:500]}")
+                
+                self._handle_wechat_api_error(result, "更新草稿")
+
+    async def _submit_draft(self, articles: List[Dict], record: Optional[Dict] = None) -> Tuple[str, bool]:
+        """
+        Submit articles as a new draft, or as an update of a recorded draft.
+        
+        The recorded draft is updated article by article through draft/update
+        when it has the same number of articles; otherwise a new draft is added.
+        
+        Args:
+            articles: Article objects built by _build_draft_article
+            record: Draft record of the publish key (see DraftStore.get)
+            
+        Returns:
+            (media_id, updated)
+        """
+        if record and record['article_count'] == len(articles):
+            for index, article in enumerate(articles):
+                await self._update_draft(record['media_id'], index, article)
+            return record['media_id'], True
+        return await self._post_draft(articles), False
+
+    def _reusable_cover(self, record: Optional[Dict], cover: str) -> Optional[str]:
+        """Cover media ID of a recorded draft, if it was made from the same cover."""
+        if record and record['cover_media_id'] and record['cover'] == (cover or ''):
+            return record['cover_media_id']
+        return None
+
+    async def _publish_once(self, key: Optional[str], content_hash: str, article_count: int, cover: str,
+                            publish: Callable[[Optional[Dict]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Run ``publish`` at most once per publish key and content.
+        
+        A repeated publish with the same key and content returns the recorded
+        result without uploading anything or calling draft/add. With changed
+        content, ``publish`` receives the record so it can reuse the cover and
+        update the recorded draft.
+        
+        Args:
+            key: Publish key; None disables deduplication
+            content_hash: draft_hash of the articles and options
+            article_count: Number of articles in the draft
+            cover: Cover source of the draft
+            publish: Coroutine function taking the draft record (or None) and
+                     returning a publish result with media_id and cover_media_id
+            
+        Returns:
+            Publish result; ``deduplicated`` or ``updated`` is set when an
+            existing draft was returned or updated
+        """
+        store = self.draft_store
+        if not key or not store.enabled:
+            return await publish(None)
+        
+        async with store.lock(key):
+            record = store.get(key)
+            if record and record['content_hash'] == content_hash:
+                log.log_event(logger, logging.INFO, 'publish.deduplicated', media_id=record['media_id'])
+                return {**record['result'], 'deduplicated': True}
+            
+            result = await publish(record)
+            stored = {k: v for k, v in result.items() if k not in ('deduplicated', 'updated')}
+            store.put(key, result['media_id'], content_hash, article_count, stored,
+                      cover, result.get('cover_media_id', ''))
+            return result
+
+    async def _add_draft_with_options(self, title: str, content: str, cover_media_id: str = '',
+                                    author: str = "Xiayan MCP", need_open_comment: int = 0, 
+                                    only_fans_can_comment: int = 0) -> str:
+        """
+        Add article to WeChat draft using the new API with extended options.
+        
+        Args:
+            title: Article title
+            content: HTML content
+            cover_media_id: Media ID for cover image
+            author: Article author
+            need_open_comment: Enable open comments (0/1)
+            only_fans_can_comment: Only fans can comment (0/1)
+            
+        Returns:
+            Media ID of the created draft
+        """
+        article = self._build_draft_article(
+            title, content, cover_media_id, author, need_open_comment, only_fans_can_comment
+        )
+        return await self._post_draft([article])
+
+    async def add_multi_article_draft(self, articles: List[Dict]) -> str:
+        """
+        Add several articles to WeChat as one multi-article draft.
+        
+        Args:
+            articles: Article objects built by _build_draft_article (1-8 items)
+            
+        Returns:
+            Media ID of the created draft
+        """
+        if not 1 <= len(articles) <= MAX_DRAFT_ARTICLES:
+            raise ValueError(f"一个草稿最多包含{MAX_DRAFT_ARTICLES}篇文章，当前为{len(articles)}篇")
+        return await self._post_draft(articles)
+
+    async def upload_inline_images(self, content: str, concurrency: int = 4) -> str:
+        """
+        Upload images referenced in article content and point them at WeChat URLs.
+        
+        Images already hosted by WeChat are left untouched. Images that fail to
+        upload keep their original source.
+        
+        Args:
+            content: HTML content
+            concurrency: Maximum number of concurrent uploads
+            
+        Returns:
+            HTML content with rewritten image sources
+        """
+        sources = []
+        for src in INLINE_IMAGE_PATTERN.findall(content):
+            if src not in sources and not src.startswith(WECHAT_IMAGE_HOSTS) and not src.startswith('data:'):
+                sources.append(src)
+        if not sources:
+            return content
+        
+        results = await gather_bounded(
+            (self.upload_image_for_news(src) for src in sources), concurrency, return_exceptions=True
+        )
+        
+        for src, result in zip(sources, results):
+            if isinstance(result, Exception):
+                logger.warning(f"上传正文图片失败，保留原地址 {src}: {result}")
+                continue
+            content = content.replace(f'src="{src}"', f'src="{result}"')
+        return content
+
     async def publish_to_draft(self, title: str, content: str, cover: str = '', 
                               permanent_cover: bool = False, author: str = "Xiayan MCP",
-                              need_open_comment: int = 0, only_fans_can_comment: int = 0) -> Dict[str, str]:
+                              need_open_comment: int = 0, only_fans_can_comment: int = 0,
+                              idempotency_key: Optional[str] = None) -> Dict[str, str]:
         """
         Publish article to WeChat draft box.
         
@@ -691,38 +911,56 @@ class WeChatPublisher:
             author: Article author
             need_open_comment: Enable open comments (0/1)
             only_fans_can_comment: Only fans can comment (0/1)
+            idempotency_key: Publish key; repeating a publish with the same key
+                returns the existing draft, or updates it if the content changed
+                (default: hash of title and content)
             
         Returns:
             Dictionary with media_id and other response data
         """
         try:
-            logger.info(f"开始发布文章到草稿箱")
-            logger.info(f"文章标题: {title}")
-            logger.info(f"是否有封面: {'是' if cover else '否'}")
-            logger.info(f"作者: {author}")
-            logger.info(f"内容长度: {len(content)} 字符")
+            log.log_event(logger, logging.INFO, 'publish.start', title=title,
+                          has_cover=bool(cover), author=author, content_chars=len(content))
             
-            # Upload cover image if provided
-            logger.info(f"开始处理封面图片...")
-            cover_media_id = await self._get_or_create_cover(cover, content)
-            logger.info(f"封面处理完成，media_id: {cover_media_id}")
+            # 去掉文档外壳、多余空白和重复样式，减小草稿请求体积
+            if MINIFY_HTML:
+                content = await run_in_cpu_pool(minify_html, content)
+            
+            async def _publish(record: Optional[Dict]) -> Dict[str, Any]:
+                async def _cover() -> str:
+                    # 更新草稿时封面未变化则沿用，不再上传新的永久素材
+                    return self._reusable_cover(record, cover) or await self._get_or_create_cover(cover, content)
 
-            # Add as draft using new API
-            logger.info(f"开始添加到草稿箱...")
-            media_id = await self._add_draft_with_options(
-                title, content, cover_media_id, author, 
-                need_open_comment, only_fans_can_comment
-            )
-            logger.info(f"草稿添加成功，media_id: {media_id}")
+                # Upload cover image and inline images concurrently
+                cover_media_id, html_content = await asyncio.gather(
+                    _cover(), self.upload_inline_images(content)
+                )
+                log.log_event(logger, logging.DEBUG, 'publish.cover_ready', cover_media_id=cover_media_id)
+
+                # Add as draft using new API, or update the draft of the same publish key
+                article = self._build_draft_article(
+                    title, html_content, cover_media_id, author,
+                    need_open_comment, only_fans_can_comment
+                )
+                media_id, updated = await self._submit_draft([article], record)
+                result = self._build_publish_result(media_id, title, cover_media_id)
+                if updated:
+                    result['updated'] = True
+                return result
             
-            result = self._build_publish_result(media_id, title, cover_media_id)
-            logger.info(f"发布结果: {result}")
+            result = await self._publish_once(
+                idempotency_key or publish_key(content, title),
+                draft_hash([{'title': title, 'content': content, 'cover': cover}], author=author,
+                           need_open_comment=need_open_comment, only_fans_can_comment=only_fans_can_comment),
+                1, cover, _publish
+            )
+            log.log_event(logger, logging.INFO, 'publish.done', media_id=result['media_id'],
+                          cover_media_id=result.get('cover_media_id'),
+                          deduplicated=result.get('deduplicated', False), updated=result.get('updated', False))
             return result
             
         except Exception as e:
-            logger.error(f"发布到草稿箱失败: {str(e)}")
-            import traceback
-            logger.error(f"错误堆栈: {traceback.format_exc()}")
+            log.log_event(logger, logging.ERROR, 'publish.failed', exc_info=True, title=title, error=e)
             raise
     
     async def _get_or_create_cover(self, cover: str, content: str) -> str:
@@ -737,7 +975,15 @@ class WeChatPublisher:
             return await self.upload_permanent_material(first_image, 'thumb')
         else:
             # Create a default cover if no image provided (WeChat API requires thumb_media_id)
-            return await self._create_default_cover()
+            # 默认封面只上传一次，避免每次发布都新增一个相同的永久素材
+            if self._default_cover_lock is None:
+                self._default_cover_lock = asyncio.Lock()
+            async with self._default_cover_lock:
+                metrics.record_cache('default_cover', bool(self._default_cover_media_id))
+                if not self._default_cover_media_id:
+                    with tracing.span('_create_default_cover'):
+                        self._default_cover_media_id = await self._create_default_cover()
+            return self._default_cover_media_id
     
     def _build_publish_result(self, media_id: str, title: str, cover_media_id: str) -> Dict[str, str]:
         """Build publish result dictionary."""
@@ -848,24 +1094,28 @@ class WeChatPublisher:
             # If all else fails, raise an exception
             raise Exception(f"Failed to create default cover: {str(e)}")
 
-    async def get_draft_list(self) -> Dict:
-        """Get list of drafts from WeChat."""
-        import html
-        import logging
-        
-        # 设置日志
-        logger = logging.getLogger(__name__)
+    async def get_draft_list(self, offset: int = 0, count: int = 20, no_content: int = 0) -> Dict:
+        """
+        Get list of drafts from WeChat.
         
+        Args:
+            offset: Starting offset for pagination
+            count: Number of drafts to retrieve (1-20)
+            no_content: Omit article content from the response (0/1)
+            
+        Returns:
+            Dictionary with draft items and total count
+        """
         access_token = await self._get_access_token()
         url = f"{self.base_url}/draft/batchget?access_token={access_token}"
         
         data = {
-            "offset": 0,
-            "count": 20,
-            "no_content": 0
+            "offset": offset,
+            "count": count,
+            "no_content": no_content
         }
         
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -880,7 +1130,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Print first 200 chars of response for troubleshooting
-                logger.debug(f"Draft list response (first 200 chars): {response_text[:200]}")
+                logger.debug("Draft list response (first 200 chars): %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
@@ -915,9 +1165,54 @@ class WeChatPublisher:
                 except json.JSONDecodeError as e:
                     content_type = response.headers.get('content-type', '')
                     logger.error(f"Failed to parse JSON response from {content_type}: {e}")
-                    logger.error(f"Response content: {response_text[:500]}")
+                    logger.error("Response content: %s", response_text[:500])
                     raise Exception(f"Failed to parse JSON response from {content_type}: {e}\nResponse content: {response_text[:500]}")
     
+    async def get_published_list(self, offset: int = 0, count: int = 20, no_content: int = 0) -> Dict:
+        """
+        Get list of published articles (freepublish/batchget).
+        
+        Args:
+            offset: Starting offset for pagination
+            count: Number of items to retrieve (1-20)
+            no_content: Omit article content from the response (0/1)
+            
+        Returns:
+            Dictionary with published items and total count
+        """
+        access_token = await self._get_access_token()
+        url = f"{self.base_url}/freepublish/batchget?access_token={access_token}"
+        
+        data = {
+            "offset": offset,
+            "count": count,
+            "no_content": no_content
+        }
+        
+        async with self._session_scope() as session:
+            headers = {'Content-Type': 'application/json; charset=utf-8'}
+            # 手动序列化JSON，确保中文字符不被转义
+            json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+            async with session.post(url, data=json_data, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"HTTP error {response.status}: {error_text}")
+                
+                response_text = await response.text()
+                
+                # Debug: Log first 200 chars of response for troubleshooting
+                logger.debug("Published list response (first 200 chars): %s", response_text[:200])
+                
+                try:
+                    result = json.loads(response_text)
+                except json.JSONDecodeError as e:
+                    raise Exception(f"Failed to parse JSON response: {e}\nResponse: {response_text[:500]}")
+                
+                # Handle API errors
+                self._handle_wechat_api_error(result, "获取已发布文章列表")
+                
+                return result
+
     def _fix_common_encoding_issues(self, content):
         """修复常见编码问题"""
         # 修复常见的编码错误
@@ -1002,7 +1297,7 @@ class WeChatPublisher:
         
         data = {"articles": articles}
         
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -1014,7 +1309,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Log first 200 chars of response for troubleshooting
-                logger.debug(f"News material upload response (first 200 chars): {response_text[:200]}")
+                logger.debug("News material upload response (first 200 chars): %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
@@ -1060,9 +1355,10 @@ class WeChatPublisher:
         content_type = mimetypes.guess_type(filename)[0] or 'image/jpeg'
         
         # Upload to WeChat
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             data = aiohttp.FormData()
             data.add_field('media', image_data, filename=filename, content_type=content_type)
+            metrics.UPLOAD_BYTES.inc('news_image', amount=len(image_data))
             
             async with session.post(url, data=data) as response:
                 if response.status != 200:
@@ -1072,7 +1368,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Log first 200 chars of response for troubleshooting
-                logger.debug(f"Image upload response (first 200 chars): {response_text[:200]}")
+                logger.debug("Image upload response (first 200 chars): %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
@@ -1113,7 +1409,7 @@ class WeChatPublisher:
         else:
             url = f"{self.base_url}/material/get_materialcount?access_token={access_token}"
             # For temporary materials, we can only get counts, not list
-            async with aiohttp.ClientSession() as session:
+            async with self._session_scope() as session:
                 async with session.get(url) as response:
                     if response.status != 200:
                         error_text = await response.text()
@@ -1122,7 +1418,7 @@ class WeChatPublisher:
                     return await response.json()
         
         # For permanent materials, get the actual list
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -1148,7 +1444,7 @@ class WeChatPublisher:
         
         data = {"media_id": media_id}
         
-        async with aiohttp.ClientSession() as session:
+        async with self._session_scope() as session:
             headers = {'Content-Type': 'application/json; charset=utf-8'}
             # 手动序列化JSON，确保中文字符不被转义
             json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
@@ -1160,7 +1456,7 @@ class WeChatPublisher:
                 response_text = await response.text()
                 
                 # Debug: Log first 200 chars of response for troubleshooting
-                logger.debug(f"Delete response (first 200 chars): {response_text[:200]}")
+                logger.debug("Delete response (first 200 chars): %s", response_text[:200])
                 
                 try:
                     result = json.loads(response_text)
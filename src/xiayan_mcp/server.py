@@ -1,25 +1,65 @@
 """MCP Server implementation for Xiayan."""
 
 import asyncio
+import importlib
 import json
 import logging
-import html
 import re
 import sys
 import os
 import argparse
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from mcp.server import Server
+from mcp.server.stdio import stdio_server
+from mcp.types import (
+    CallToolResult,
+    ListToolsResult,
+    TextContent,
+    Tool,
+)
+
+# 只导入轻量模块；格式化、发布等依赖markdown/aiohttp的模块在首次使用时才加载
+from .core.content_limits import OVERSIZE_MODES
+from .core.jobs import JOB_STATUSES
+from .core.material_gc import GC_MODES
+from .core.material_store import MATERIAL_TYPES
+from .core.pipeline import PUBLISH_STAGES, StageCallback
+from .utils import metrics, profiling, tracing
+
+logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
 env_path = Path(__file__).parent.parent.parent / '.env'
-if env_path.exists():
-    with open(env_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                os.environ[key] = value.strip('"\'')
+
+# 启动后在后台线程中预加载的模块
+_HEAVY_MODULES = (
+    '.core.formatter',
+    '.core.publisher',
+)
+
+# 预加载前等待客户端首次list_tools的最长时间（秒）
+_WARM_UP_DELAY = 1.0
+
+# 所有工具都接受的性能分析参数
+PROFILE_ARGUMENT = {
+    "type": "string",
+    "enum": list(profiling.PROFILE_MODES),
+    "description": "Profile this call with cProfile or a sampling profiler; the top functions are appended to the result and the full profile is saved to a local file.",
+}
+
+
+def load_env_file() -> None:
+    """Load environment variables from the .env file, if present."""
+    if env_path.exists():
+        with open(env_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    os.environ[key] = value.strip('"\'')
+
 
 # Interactive input for WeChat API credentials if not already set
 def _prompt_for_wechat_credentials(force: bool = False):
@@ -111,48 +151,22 @@ def _prompt_for_wechat_credentials(force: bool = False):
     print("✅ 微信公众号API凭证配置完成。\n")
 
 # Parse command line arguments
-def parse_args():
+def parse_args(argv: Optional[List[str]] = None):
     """Parse command line arguments for the MCP server."""
     parser = argparse.ArgumentParser(description="Xiayan MCP Server for WeChat Official Account publishing")
+    parser.add_argument('--interactive', '-i', action='store_true',
+                        help='Prompt for WeChat API credentials if they are not set')
     parser.add_argument('--reconfigure', '-r', action='store_true', 
                         help='Force reconfiguration of WeChat API credentials')
     parser.add_argument('--debug', '-d', action='store_true', 
                         help='Enable debug logging')
-    return parser.parse_args()
-
-# Parse arguments and call interactive prompt
-args = parse_args()
-
-# Set logging level based on debug flag
-if args.debug:
-    logging.basicConfig(level=logging.DEBUG)
-
-# Call the interactive prompt with force flag
-_prompt_for_wechat_credentials(force=args.reconfigure)
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-    ]
-)
-logger = logging.getLogger(__name__)
+    return parser.parse_args(argv)
 
-from mcp.server import Server
-from mcp.server.stdio import stdio_server
-from mcp.types import (
-    CallToolResult,
-    ListToolsResult,
-    TextContent,
-    Tool,
-)
 
-from .core.formatter import MarkdownFormatter
-from .core.publisher import WeChatPublisher
-from .themes.theme_manager import ThemeManager
-from .utils.encoding import enconding_utils
+def _import_heavy_modules() -> None:
+    """Import the formatter and publisher modules (markdown, pygments, bs4, jinja2, aiohttp)."""
+    for module in _HEAVY_MODULES:
+        importlib.import_module(module, __package__)
 
 
 class XiayanMCPServer:
@@ -161,15 +175,16 @@ class XiayanMCPServer:
     def __init__(self):
         """Initialize the Xiayan MCP server."""
         self.server = Server("xiayan-mcp")
-        self.theme_manager = ThemeManager()
-        self.formatter = MarkdownFormatter()
-        self.publisher = WeChatPublisher()
+        # 组件在首次使用时创建，见下方的cached_property
+        self._tools_listed: Optional[asyncio.Event] = None
         
         # Register handlers using decorators
         @self.server.list_tools()
         async def list_tools() -> ListToolsResult:
             """List available tools."""
-            return ListToolsResult(
+            if self._tools_listed is not None:
+                self._tools_listed.set()
+            result = ListToolsResult(
                 tools=[
                     Tool(
                         name="publish_article",
@@ -207,10 +222,249 @@ class XiayanMCPServer:
                                     "enum": [0, 1],
                                     "default": 0,
                                 },
+                                "oversize": {
+                                    "type": "string",
+                                    "description": "What to do when the formatted article exceeds WeChat's size limits (about 2MB HTML or 20,000 characters): reject it before uploading, or split it at headings into a multi-part series published as one multi-article draft.",
+                                    "enum": list(OVERSIZE_MODES),
+                                    "default": "reject",
+                                },
+                                "idempotency_key": {
+                                    "type": "string",
+                                    "description": "Key making the publish safe to retry: a repeat with the same key returns the existing draft, or updates it through draft/update when the content changed. Defaults to a hash of the Markdown content and theme.",
+                                },
                             },
                             "required": ["content"],
                         },
                     ),
+                    Tool(
+                        name="publish_multi_article_draft",
+                        description="Format up to 8 Markdown articles in parallel and publish them to '微信公众号' as one multi-article draft with a single API call.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "articles": {
+                                    "type": "array",
+                                    "description": "Articles in draft order (1-8).",
+                                    "minItems": 1,
+                                    "maxItems": 8,
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "content": {
+                                                "type": "string",
+                                                "description": "The original Markdown content, preserving its frontmatter (if present).",
+                                            },
+                                            "theme_id": {
+                                                "type": "string",
+                                                "description": "Theme for this article (overrides the draft theme).",
+                                            },
+                                            "cover": {
+                                                "type": "string",
+                                                "description": "Cover image path or URL (overrides frontmatter and first image).",
+                                            },
+                                            "author": {
+                                                "type": "string",
+                                                "description": "Author for this article (overrides the draft author).",
+                                            },
+                                            "digest": {
+                                                "type": "string",
+                                                "description": "Article summary.",
+                                            },
+                                        },
+                                        "required": ["content"],
+                                    },
+                                },
+                                "theme_id": {
+                                    "type": "string",
+                                    "description": "Default theme ID for all articles.",
+                                    "default": "default",
+                                },
+                                "author": {
+                                    "type": "string",
+                                    "description": "Default author for all articles.",
+                                    "default": "Xiayan MCP",
+                                },
+                                "need_open_comment": {
+                                    "type": "integer",
+                                    "description": "Enable open comments (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                                "only_fans_can_comment": {
+                                    "type": "integer",
+                                    "description": "Only fans can comment (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                            },
+                            "required": ["articles"],
+                        },
+                    ),
+                    Tool(
+                        name="publish_articles_batch",
+                        description="Format and publish many Markdown articles to '微信公众号' as separate drafts. Formatting runs in parallel and uploads are capped by concurrency; failures are reported per item without stopping the batch.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "articles": {
+                                    "type": "array",
+                                    "description": "Articles to publish. Each item needs content or file_path.",
+                                    "minItems": 1,
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "content": {
+                                                "type": "string",
+                                                "description": "The original Markdown content, preserving its frontmatter (if present).",
+                                            },
+                                            "file_path": {
+                                                "type": "string",
+                                                "description": "Path of a UTF-8 Markdown file (used when content is empty).",
+                                            },
+                                            "theme_id": {
+                                                "type": "string",
+                                                "description": "Theme for this article (overrides the batch theme).",
+                                            },
+                                            "author": {
+                                                "type": "string",
+                                                "description": "Author for this article (overrides the batch author).",
+                                            },
+                                            "idempotency_key": {
+                                                "type": "string",
+                                                "description": "Publish key for this article (see publish_article).",
+                                            },
+                                        },
+                                    },
+                                },
+                                "theme_id": {
+                                    "type": "string",
+                                    "description": "Default theme ID for all articles.",
+                                    "default": "default",
+                                },
+                                "author": {
+                                    "type": "string",
+                                    "description": "Default author for all articles.",
+                                    "default": "Xiayan MCP",
+                                },
+                                "need_open_comment": {
+                                    "type": "integer",
+                                    "description": "Enable open comments (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                                "only_fans_can_comment": {
+                                    "type": "integer",
+                                    "description": "Only fans can comment (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                                "oversize": {
+                                    "type": "string",
+                                    "description": "What to do when the formatted article exceeds WeChat's size limits (about 2MB HTML or 20,000 characters): reject it before uploading, or split it at headings into a multi-part series published as one multi-article draft.",
+                                    "enum": list(OVERSIZE_MODES),
+                                    "default": "reject",
+                                },
+                                "concurrency": {
+                                    "type": "integer",
+                                    "description": "Maximum number of articles uploading at the same time.",
+                                    "minimum": 1,
+                                    "default": 4,
+                                },
+                            },
+                            "required": ["articles"],
+                        },
+                    ),
+                    Tool(
+                        name="submit_publish_job",
+                        description="Queue a Markdown article for publishing to '微信公众号' in the background and return a job ID immediately. Use get_job_status to poll progress.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "content": {
+                                    "type": "string",
+                                    "description": "The original Markdown content to publish, preserving its frontmatter (if present).",
+                                },
+                                "file_path": {
+                                    "type": "string",
+                                    "description": "Path of a UTF-8 Markdown file (used when content is empty).",
+                                },
+                                "theme_id": {
+                                    "type": "string",
+                                    "description": "ID of the theme to use.",
+                                    "default": "default",
+                                },
+                                "permanent_cover": {
+                                    "type": "boolean",
+                                    "description": "Whether to upload cover image as permanent material (true) or temporary (false).",
+                                    "default": False,
+                                },
+                                "author": {
+                                    "type": "string",
+                                    "description": "Article author name.",
+                                    "default": "Xiayan MCP",
+                                },
+                                "need_open_comment": {
+                                    "type": "integer",
+                                    "description": "Enable open comments (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                                "only_fans_can_comment": {
+                                    "type": "integer",
+                                    "description": "Only fans can comment (0 for no, 1 for yes).",
+                                    "enum": [0, 1],
+                                    "default": 0,
+                                },
+                                "oversize": {
+                                    "type": "string",
+                                    "description": "What to do when the formatted article exceeds WeChat's size limits (about 2MB HTML or 20,000 characters): reject it before uploading, or split it at headings into a multi-part series published as one multi-article draft.",
+                                    "enum": list(OVERSIZE_MODES),
+                                    "default": "reject",
+                                },
+                                "idempotency_key": {
+                                    "type": "string",
+                                    "description": "Key making the publish safe to retry: a repeat with the same key returns the existing draft, or updates it through draft/update when the content changed. Defaults to a hash of the Markdown content and theme.",
+                                },
+                            },
+                        },
+                    ),
+                    Tool(
+                        name="get_job_status",
+                        description="Get the status and per-stage progress of a publish job, or list recent jobs when no job_id is given.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "job_id": {
+                                    "type": "string",
+                                    "description": "Job ID returned by submit_publish_job.",
+                                },
+                                "status": {
+                                    "type": "string",
+                                    "description": "Only list jobs with this status (when job_id is not given).",
+                                    "enum": list(JOB_STATUSES),
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of jobs to list (when job_id is not given).",
+                                    "default": 20,
+                                },
+                            },
+                        },
+                    ),
+                    Tool(
+                        name="cancel_job",
+                        description="Cancel a queued or running publish job.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "job_id": {
+                                    "type": "string",
+                                    "description": "Job ID returned by submit_publish_job.",
+                                },
+                            },
+                            "required": ["job_id"],
+                        },
+                    ),
                     Tool(
                         name="list_themes",
                         description="List the themes compatible with the 'publish_article' tool to publish an article to '微信公众号'.",
@@ -392,6 +646,103 @@ class XiayanMCPServer:
                                     "description": "Number of items to retrieve (1-20).",
                                     "default": 20,
                                 },
+                                "use_cache": {
+                                    "type": "boolean",
+                                    "description": "Serve permanent materials from the local mirror (synced on first use) instead of calling WeChat.",
+                                    "default": True,
+                                },
+                                "refresh": {
+                                    "type": "boolean",
+                                    "description": "Incrementally re-sync the local mirror before listing.",
+                                    "default": False,
+                                },
+                            },
+                        },
+                    ),
+                    Tool(
+                        name="sync_materials",
+                        description="Incrementally sync permanent materials into the local mirror used for fast listing and search.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "media_types": {
+                                    "type": "array",
+                                    "description": "Material types to sync (default: all).",
+                                    "items": {"type": "string", "enum": list(MATERIAL_TYPES)},
+                                },
+                                "concurrency": {
+                                    "type": "integer",
+                                    "description": "Maximum number of concurrent page fetches and downloads.",
+                                    "default": 4,
+                                },
+                            },
+                        },
+                    ),
+                    Tool(
+                        name="search_materials",
+                        description="Search permanent materials in the local mirror by name (and title/author/digest for news).",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "query": {
+                                    "type": "string",
+                                    "description": "Text to search for.",
+                                },
+                                "media_type": {
+                                    "type": "string",
+                                    "description": "Optional material type filter.",
+                                    "enum": list(MATERIAL_TYPES),
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Maximum number of results.",
+                                    "default": 20,
+                                },
+                            },
+                            "required": ["query"],
+                        },
+                    ),
+                    Tool(
+                        name="gc_materials",
+                        description="Find permanent image materials (e.g. duplicate covers) not used by any draft, published article or news material, and optionally delete them. Defaults to a dry run.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "mode": {
+                                    "type": "string",
+                                    "description": "'report' returns usage counts only, 'dry_run' also lists deletion candidates, 'delete' deletes them.",
+                                    "enum": list(GC_MODES),
+                                    "default": "dry_run",
+                                },
+                                "include_orphans": {
+                                    "type": "boolean",
+                                    "description": "Collect images not referenced by any article.",
+                                    "default": True,
+                                },
+                                "include_duplicates": {
+                                    "type": "boolean",
+                                    "description": "Collect unreferenced copies of images with identical content.",
+                                    "default": True,
+                                },
+                                "min_age_days": {
+                                    "type": "number",
+                                    "description": "Never collect materials updated more recently than this many days.",
+                                    "default": 1,
+                                },
+                                "max_deletions": {
+                                    "type": "integer",
+                                    "description": "Maximum number of materials to delete in one run.",
+                                },
+                                "concurrency": {
+                                    "type": "integer",
+                                    "description": "Maximum number of concurrent API calls.",
+                                    "default": 4,
+                                },
+                                "rate_per_second": {
+                                    "type": "number",
+                                    "description": "Maximum number of delete calls per second.",
+                                    "default": 5,
+                                },
                             },
                         },
                     ),
@@ -423,14 +774,77 @@ class XiayanMCPServer:
                             "required": ["media_id"],
                         },
                     ),
+                    Tool(
+                        name="get_metrics",
+                        description="Get runtime metrics: formatting and publish stage timings, per-endpoint WeChat API latency, error codes, token refreshes, cache hit rates and uploaded bytes.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "format": {
+                                    "type": "string",
+                                    "enum": ["json", "prometheus"],
+                                    "description": "Output format: JSON summary or Prometheus text exposition.",
+                                    "default": "json",
+                                },
+                            },
+                        },
+                    ),
+                    Tool(
+                        name="set_tracing",
+                        description="Enable or disable tracing spans (frontmatter parsing, Markdown conversion, theming, image resizing, each WeChat HTTP call) written to a local JSONL or OTLP/JSON file. Call without arguments to get the current state.",
+                        inputSchema={
+                            "type": "object",
+                            "properties": {
+                                "enabled": {
+                                    "type": "boolean",
+                                    "description": "Turn tracing on or off.",
+                                },
+                                "path": {
+                                    "type": "string",
+                                    "description": "Trace file path. Defaults to traces.jsonl in the data directory.",
+                                },
+                                "format": {
+                                    "type": "string",
+                                    "enum": list(tracing.TRACE_FORMATS),
+                                    "description": "jsonl: one span per line; otlp: OTLP/JSON export requests.",
+                                    "default": "jsonl",
+                                },
+                            },
+                        },
+                    ),
                 ]
             )
+            for tool in result.tools:
+                tool.inputSchema.setdefault("properties", {})["profile"] = PROFILE_ARGUMENT
+            return result
 
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
-            """Handle tool calls."""
+            """Handle tool calls, optionally profiling them."""
+            mode = profiling.resolve_mode(arguments.pop("profile", None)) or profiling.env_mode()
+            with tracing.span(f"tool.{name}"):
+                if not mode:
+                    return await dispatch_tool(name, arguments)
+                async with profiling.profile(mode, f"tool-{name}") as profiler:
+                    result = await dispatch_tool(name, arguments)
+                result.content.append(TextContent(type="text", text=profiling.format_summary(profiler.report)))
+                logger.info(f"工具 {name} 性能分析已保存: {profiler.report.get('file')}")
+                return result
+
+        async def dispatch_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
+            """Route a tool call to its handler."""
             if name == "publish_article":
                 return await self._handle_publish_article(arguments)
+            elif name == "publish_multi_article_draft":
+                return await self._handle_publish_multi_article_draft(arguments)
+            elif name == "publish_articles_batch":
+                return await self._handle_publish_articles_batch(arguments)
+            elif name == "submit_publish_job":
+                return await self._handle_submit_publish_job(arguments)
+            elif name == "get_job_status":
+                return await self._handle_get_job_status(arguments)
+            elif name == "cancel_job":
+                return await self._handle_cancel_job(arguments)
             elif name == "list_themes":
                 return await self._handle_list_themes(arguments)
             elif name == "preview_theme":
@@ -449,11 +863,72 @@ class XiayanMCPServer:
                 return await self._handle_upload_cover_image(arguments)
             elif name == "get_media_list":
                 return await self._handle_get_media_list(arguments)
+            elif name == "sync_materials":
+                return await self._handle_sync_materials(arguments)
+            elif name == "search_materials":
+                return await self._handle_search_materials(arguments)
+            elif name == "gc_materials":
+                return await self._handle_gc_materials(arguments)
             elif name == "delete_permanent_material":
                 return await self._handle_delete_permanent_material(arguments)
+            elif name == "get_metrics":
+                return await self._handle_get_metrics(arguments)
+            elif name == "set_tracing":
+                return await self._handle_set_tracing(arguments)
             else:
                 raise ValueError(f"Unknown tool: {name}")
 
+    # ========== Components (created on first use) ==========
+
+    @cached_property
+    def theme_manager(self):
+        """Theme manager."""
+        from .themes.theme_manager import ThemeManager
+        return ThemeManager()
+
+    @cached_property
+    def formatter(self):
+        """Markdown formatter."""
+        from .core.formatter import MarkdownFormatter
+        # 与主题工具共用同一个主题管理器，自定义主题和热加载对发布立即生效
+        return MarkdownFormatter(self.theme_manager)
+
+    @cached_property
+    def publisher(self):
+        """WeChat publisher."""
+        from .core.publisher import WeChatPublisher
+        return WeChatPublisher()
+
+    @cached_property
+    def material_store(self):
+        """Local mirror of permanent materials."""
+        from .core.material_store import MaterialStore
+        return MaterialStore(self.publisher)
+
+    @cached_property
+    def material_gc(self):
+        """Material garbage collector."""
+        from .core.material_gc import MaterialGC
+        return MaterialGC(self.publisher, self.material_store)
+
+    @cached_property
+    def draft_builder(self):
+        """Multi-article draft builder."""
+        from .core.draft_builder import MultiArticleDraftBuilder
+        return MultiArticleDraftBuilder(self.formatter, self.publisher)
+
+    @cached_property
+    def pipeline(self):
+        """Staged publish pipeline."""
+        from .core.pipeline import PublishPipeline
+        return PublishPipeline(self.formatter, self.publisher)
+
+    @cached_property
+    def job_manager(self):
+        """Background publish job manager."""
+        from .core.jobs import JobManager
+        return JobManager(self.pipeline, workers=int(os.getenv('XIAYAN_JOB_WORKERS', '2')))
+
     async def _handle_publish_article(self, arguments: Dict[str, Any]) -> CallToolResult:
         """Handle publish_article tool call."""
         logger.info("开始处理文章发布请求")
@@ -461,7 +936,8 @@ class XiayanMCPServer:
         
         try:
             # 1. 解析参数
-            content, theme_id, permanent_cover, author, need_open_comment, only_fans_can_comment = self._parse_publish_arguments(arguments)
+            (content, theme_id, permanent_cover, author, need_open_comment, only_fans_can_comment,
+             oversize, idempotency_key) = self._parse_publish_arguments(arguments)
             
             # 2. 验证内容
             if not content:
@@ -470,22 +946,19 @@ class XiayanMCPServer:
                     content=[TextContent(type="text", text="Error: content is required")]
                 )
             
-            # 3. 修复内容编码
-            content = self._fix_content_encoding(content)
-            
-            # 4. 格式化内容
-            title, html_content, cover = await self._format_content(content, theme_id)
-            
-            # 5. 最终编码检查
-            html_content = self._final_encoding_check(html_content, title, cover)
+            # 3. 修复内容编码并格式化内容，客户端提供progressToken时按阶段发送进度通知
+            on_stage = self._stage_progress_callback()
+            prepared = await self.pipeline.prepare(content, theme_id, on_stage, oversize)
             
-            # 6. 发布到微信草稿箱
-            result = await self._publish_to_wechat_draft(
-                title, html_content, cover, permanent_cover, 
-                author, need_open_comment, only_fans_can_comment
+            # 4. 上传封面和正文图片，发布到微信草稿箱
+            logger.info(f"开始发布到微信公众号草稿箱，标题: {prepared['title']}")
+            result = await self.pipeline.publish(
+                prepared, permanent_cover, author,
+                need_open_comment, only_fans_can_comment, on_stage, idempotency_key
             )
+            logger.info(f"成功发布到草稿箱，结果: {result}")
             
-            # 7. 构建响应
+            # 5. 构建响应
             return self._build_publish_response(result, permanent_cover)
             
         except Exception as e:
@@ -499,125 +972,55 @@ class XiayanMCPServer:
         author = arguments.get("author", "Xiayan MCP")
         need_open_comment = arguments.get("need_open_comment", 0)
         only_fans_can_comment = arguments.get("only_fans_can_comment", 0)
+        oversize = arguments.get("oversize", "reject")
+        idempotency_key = arguments.get("idempotency_key")
         
-        return content, theme_id, permanent_cover, author, need_open_comment, only_fans_can_comment
+        return (content, theme_id, permanent_cover, author, need_open_comment, only_fans_can_comment,
+                oversize, idempotency_key)
     
-    def _fix_content_encoding(self, content: str) -> str:
-        """Fix content encoding issues."""
-        logger.info(f"内容长度: {len(content)} 字符")
-        logger.debug(f"内容开头: {content[:200]}...")
+    def _progress_notifier(self, total: int) -> Optional[Callable[[str], Awaitable[None]]]:
+        """Build a function that reports one more completed step to the client.
         
-        # 确保内容正确编码为UTF-8
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-            logger.info("将字节内容解码为UTF-8")
-        
-        # 谨慎地修复内容中的编码问题
+        Returns None when the current request has no progressToken.
+        """
         try:
-            original_content = content
-            content = enconding_utils.fix_encoding(content)
-            if content != original_content:
-                logger.info("已修复内容编码问题")
-            else:
-                logger.debug("内容编码正常，无需修复")
-        except Exception as e:
-            logger.warning(f"修复内容编码时出错: {e}，继续使用原始内容")
+            ctx = self.server.request_context
+        except LookupError:
+            return None
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        if progress_token is None:
+            return None
         
-        return content
-    
-    async def _format_content(self, content: str, theme_id: str) -> tuple:
-        """Format content using the specified theme."""
-        logger.info(f"开始使用主题 '{theme_id}' 格式化内容")
-        title = "未命名文章"
-        html_content = ""
-        cover = ""
+        completed = 0
         
-        try:
-            # 使用正确的format方法，返回字典
-            formatted_result = self.formatter.format(content, theme_id)
-            
-            # 检查返回结果类型
-            if isinstance(formatted_result, dict):
-                title = formatted_result.get("title", "未命名文章")
-                html_content = formatted_result.get("content", "")
-                cover = formatted_result.get("cover", "")
-            else:
-                # 如果返回的不是字典，尝试使用format_markdown_for_wechat方法
-                logger.warning("format方法返回非字典类型，尝试使用format_markdown_for_wechat")
-                html_content = self.formatter.format_markdown_for_wechat(content)
-                title = "未命名文章"
-                
-                # 尝试从HTML内容中提取标题和封面
-                import re
-                title_match = re.search(r'<h1[^>]*>(.*?)</h1>', html_content, re.IGNORECASE | re.DOTALL)
-                if title_match:
-                    title = re.sub(r'<[^>]+>', '', title_match.group(1)).strip()
-                
-                img_match = re.search(r'<img[^>]*src=["\']([^"\']+)["\'][^>]*>', html_content, re.IGNORECASE)
-                if img_match:
-                    cover = img_match.group(1)
-            
-            logger.info(f"内容格式化完成，标题: {title}, 长度: {len(html_content)} 字符")
-            
-            # 验证格式化后的内容
-            if not html_content.strip():
-                logger.error("格式化后的内容为空")
-                raise ValueError("格式化后的内容为空")
-            
-            # 检查是否仍然包含 Unicode 转义序列
-            if '\\u' in html_content:
-                logger.warning("格式化后的内容仍包含 Unicode 转义序列，尝试再次修复")
-                html_content = enconding_utils.fix_encoding(html_content)
-            
-            logger.debug(f"格式化后的内容开头: {html_content[:300]}...")
-            
-            return title, html_content, cover
-            
-        except Exception as e:
-            logger.error(f"格式化内容时出错: {e}")
-            logger.exception("详细错误信息: ")
-            raise ValueError(f"格式化内容失败: {str(e)}")
-    
-    def _final_encoding_check(self, html_content: str, title: str, cover: str) -> str:
-        """Perform final encoding check on HTML content."""
-        # 再次确保HTML内容正确编码
-        if isinstance(html_content, bytes):
-            html_content = html_content.decode('utf-8')
-            logger.info("将HTML内容从字节解码为UTF-8")
-        
-        # 确保title和cover也是字符串
-        if isinstance(title, dict):
-            title = str(title)
-        if isinstance(cover, dict):
-            cover = str(cover)
-        
-        # 最终编码检查 - 更谨慎的策略
-        # 只有在确认有编码问题时才进行修复
-        if enconding_utils.needs_encoding_fix(html_content):
-            logger.warning("发现编码问题，尝试谨慎修复")
+        async def notify(message: str) -> None:
+            nonlocal completed
+            completed += 1
             try:
-                original_html = html_content
-                html_content = enconding_utils.fix_encoding(html_content)
-                if html_content != original_html:
-                    logger.info("成功修复编码问题")
+                await ctx.session.send_progress_notification(
+                    progress_token, completed, total, message=message
+                )
             except Exception as e:
-                logger.warning(f"修复编码问题时出错: {e}")
-        else:
-            logger.debug("HTML内容编码正常，无需额外修复")
+                logger.warning(f"发送进度通知失败: {e}")
         
-        return html_content
+        return notify
     
-    async def _publish_to_wechat_draft(self, title: str, html_content: str, cover: str, 
-                                     permanent_cover: bool, author: str, 
-                                     need_open_comment: int, only_fans_can_comment: int) -> dict:
-        """Publish content to WeChat draft box."""
-        logger.info(f"开始发布到微信公众号草稿箱，标题: {title}")
-        result = await self.publisher.publish_to_draft(
-            title, html_content, cover, permanent_cover, 
-            author, need_open_comment, only_fans_can_comment
-        )
-        logger.info(f"成功发布到草稿箱，结果: {result}")
-        return result
+    def _stage_progress_callback(self) -> Optional[StageCallback]:
+        """Build a pipeline stage callback that sends MCP progress notifications."""
+        notify = self._progress_notifier(len(PUBLISH_STAGES))
+        if notify is None:
+            return None
+        
+        async def on_stage(event: Dict[str, Any]) -> None:
+            # 进度值必须单调递增，只在阶段完成时通知
+            if event["status"] != "finished":
+                return
+            message = f"{event['stage']} 完成，耗时 {event['elapsed_ms']:.1f}ms"
+            if "bytes" in event:
+                message += f"，{event['bytes']} 字节"
+            await notify(message)
+        
+        return on_stage
     
     def _build_publish_response(self, result: dict, permanent_cover: bool) -> CallToolResult:
         """Build response for successful publish."""
@@ -625,7 +1028,15 @@ class XiayanMCPServer:
         cover_media_id = result.get('cover_media_id', '')
         media_id = result.get('media_id', 'unknown')
         
-        response_text = f"文章已成功发布到微信公众号草稿箱。媒体ID: {media_id}。"
+        if result.get('deduplicated'):
+            response_text = f"相同内容的文章已发布过，未重复创建草稿，返回已有草稿。媒体ID: {media_id}。"
+        elif result.get('updated'):
+            response_text = f"内容有变化，已更新之前发布的草稿。媒体ID: {media_id}。"
+        else:
+            response_text = f"文章已成功发布到微信公众号草稿箱。媒体ID: {media_id}。"
+        
+        if result.get('parts'):
+            response_text += f"文章超出微信内容限制，已拆分为{len(result['parts'])}篇：{'、'.join(result['parts'])}。"
         
         if cover_media_id:
             response_text += f"封面图片已作为{cover_type}素材上传，媒体ID: {cover_media_id}。"
@@ -662,19 +1073,146 @@ class XiayanMCPServer:
             ]
         )
 
+    async def _handle_publish_multi_article_draft(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle publish_multi_article_draft tool call."""
+        articles = arguments.get("articles") or []
+        
+        if not articles:
+            return CallToolResult(
+                content=[TextContent(type="text", text="Error: articles is required")]
+            )
+        
+        try:
+            result = await self.draft_builder.build(
+                articles,
+                theme_id=arguments.get("theme_id", "default"),
+                author=arguments.get("author", "Xiayan MCP"),
+                need_open_comment=arguments.get("need_open_comment", 0),
+                only_fans_can_comment=arguments.get("only_fans_can_comment", 0),
+            )
+            titles = "、".join(article["title"] for article in result["articles"])
+            return CallToolResult(
+                content=[
+                    TextContent(
+                        type="text",
+                        text=f"{len(result['articles'])}篇文章已作为一个多图文草稿发布到微信公众号草稿箱。媒体ID: {result['media_id']}。文章: {titles}"
+                    )
+                ]
+            )
+        except Exception as e:
+            return self._handle_publish_error(e)
+
+    async def _handle_publish_articles_batch(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle publish_articles_batch tool call."""
+        articles = arguments.get("articles") or []
+        
+        if not articles:
+            return CallToolResult(
+                content=[TextContent(type="text", text="Error: articles is required")]
+            )
+        
+        defaults = {
+            "theme_id": arguments.get("theme_id", "default"),
+            "author": arguments.get("author", "Xiayan MCP"),
+            "need_open_comment": arguments.get("need_open_comment", 0),
+            "only_fans_can_comment": arguments.get("only_fans_can_comment", 0),
+            "oversize": arguments.get("oversize", "reject"),
+        }
+        
+        try:
+            notify = self._progress_notifier(len(articles))
+            
+            async def on_item(report: Dict[str, Any]) -> None:
+                await notify(f"第{report['index'] + 1}篇 {report['status']}，耗时 {report['elapsed_ms']}ms")
+            
+            reports = await self.pipeline.run_batch(
+                articles, concurrency=arguments.get("concurrency", 4), defaults=defaults,
+                on_item=on_item if notify else None
+            )
+            succeeded = sum(1 for report in reports if report["status"] == "success")
+            summary = {
+                "total": len(reports),
+                "succeeded": succeeded,
+                "failed": len(reports) - succeeded,
+                "items": reports,
+            }
+            return CallToolResult(
+                content=[TextContent(type="text", text=json.dumps(summary, ensure_ascii=False, indent=2))]
+            )
+        except Exception as e:
+            return self._handle_publish_error(e)
+
+    async def _handle_submit_publish_job(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle submit_publish_job tool call."""
+        try:
+            job_id = await self.job_manager.submit(arguments)
+            return CallToolResult(
+                content=[
+                    TextContent(
+                        type="text",
+                        text=f"发布任务已提交，任务ID: {job_id}。使用get_job_status查询进度。"
+                    )
+                ]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"提交发布任务失败: {str(e)}")]
+            )
+
+    async def _handle_get_job_status(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle get_job_status tool call."""
+        job_id = arguments.get("job_id")
+        
+        try:
+            if job_id:
+                job = self.job_manager.get(job_id)
+                if not job:
+                    return CallToolResult(
+                        content=[TextContent(type="text", text=f"Error: job '{job_id}' not found")]
+                    )
+                result = self._job_summary(job)
+            else:
+                jobs = self.job_manager.list_jobs(arguments.get("status"), arguments.get("limit", 20))
+                result = [self._job_summary(job) for job in jobs]
+            return CallToolResult(
+                content=[TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"查询任务状态失败: {str(e)}")]
+            )
+
+    async def _handle_cancel_job(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle cancel_job tool call."""
+        job_id = arguments.get("job_id", "")
+        
+        if not job_id:
+            return CallToolResult(
+                content=[TextContent(type="text", text="Error: job_id is required")]
+            )
+        
+        try:
+            cancelled = await self.job_manager.cancel(job_id)
+            text = f"任务 {job_id} 已取消" if cancelled else f"任务 {job_id} 不存在或已结束，无法取消"
+            return CallToolResult(content=[TextContent(type="text", text=text)])
+        except Exception as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"取消任务失败: {str(e)}")]
+            )
+
+    @staticmethod
+    def _job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job status without the (possibly large) article content."""
+        return {key: value for key, value in job.items() if key != "params"}
+
     async def _handle_list_themes(self, arguments: Dict[str, Any]) -> CallToolResult:
         """Handle list_themes tool call."""
         detailed = arguments.get("detailed", False)
-        
-        if detailed:
-            themes = self.theme_manager.get_available_themes()
-        else:
-            # For backward compatibility, return simple theme list
-            themes = [{"id": theme.id, "name": theme.name, "description": theme.description} 
-                     for theme in self.theme_manager._themes.values()]
+        # 列表及其JSON只在主题变化后重新生成
+        listing = self.theme_manager.get_theme_listing(bool(detailed))
         
         return CallToolResult(
-            content=[TextContent(type="text", text=json.dumps(themes, ensure_ascii=False))]
+            content=[TextContent(type="text", text=listing.json)]
         )
     
     async def _handle_preview_theme(self, arguments: Dict[str, Any]) -> CallToolResult:
@@ -718,7 +1256,8 @@ class XiayanMCPServer:
                 id=theme_id,
                 name=name,
                 description=description,
-                template=template,
+                # 未提供模板时使用默认模板（主题目录中不保存template.html）
+                template=template or self.theme_manager._default_template,
                 css_styles=css_styles
             )
             
@@ -795,6 +1334,7 @@ class XiayanMCPServer:
         
         try:
             media_id = await self.publisher.upload_permanent_material(media_path, media_type, description)
+            self.material_store.invalidate(media_type)
             return CallToolResult(
                 content=[
                     TextContent(
@@ -868,9 +1408,19 @@ class XiayanMCPServer:
         permanent = arguments.get("permanent", True)
         offset = arguments.get("offset", 0)
         count = arguments.get("count", 20)
+        use_cache = arguments.get("use_cache", True)
+        refresh = arguments.get("refresh", False)
         
         try:
-            result = await self.publisher.get_media_list(media_type, permanent, offset, count)
+            if permanent and use_cache and media_type in MATERIAL_TYPES:
+                # 从本地素材镜像读取，首次使用或要求刷新时先同步
+                needs_sync = refresh or not self.material_store.is_synced(media_type)
+                metrics.record_cache('material_mirror', not needs_sync)
+                if needs_sync:
+                    await self.material_store.sync([media_type])
+                result = self.material_store.list_materials(media_type, offset, count)
+            else:
+                result = await self.publisher.get_media_list(media_type, permanent, offset, count)
             return CallToolResult(
                 content=[
                     TextContent(
@@ -886,6 +1436,73 @@ class XiayanMCPServer:
                 ]
             )
 
+    async def _handle_sync_materials(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle sync_materials tool call."""
+        media_types = arguments.get("media_types") or None
+        concurrency = arguments.get("concurrency", 4)
+        
+        try:
+            stats = await self.material_store.sync(media_types, concurrency=concurrency)
+            return CallToolResult(
+                content=[
+                    TextContent(
+                        type="text",
+                        text=f"Materials synced successfully:\n{json.dumps(stats, ensure_ascii=False, indent=2)}"
+                    )
+                ]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[
+                    TextContent(type="text", text=f"Error syncing materials: {str(e)}")
+                ]
+            )
+
+    async def _handle_search_materials(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle search_materials tool call."""
+        query = arguments.get("query", "")
+        media_type = arguments.get("media_type")
+        limit = arguments.get("limit", 20)
+        
+        if not query:
+            return CallToolResult(
+                content=[TextContent(type="text", text="Error: query is required")]
+            )
+        
+        try:
+            results = self.material_store.search(query, media_type, limit)
+            return CallToolResult(
+                content=[TextContent(type="text", text=json.dumps(results, ensure_ascii=False, indent=2))]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[
+                    TextContent(type="text", text=f"Error searching materials: {str(e)}")
+                ]
+            )
+
+    async def _handle_gc_materials(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle gc_materials tool call."""
+        try:
+            report = await self.material_gc.run(
+                mode=arguments.get("mode", "dry_run"),
+                include_orphans=arguments.get("include_orphans", True),
+                include_duplicates=arguments.get("include_duplicates", True),
+                min_age_days=arguments.get("min_age_days", 1),
+                max_deletions=arguments.get("max_deletions"),
+                concurrency=arguments.get("concurrency", 4),
+                rate_per_second=arguments.get("rate_per_second", 5),
+            )
+            return CallToolResult(
+                content=[TextContent(type="text", text=json.dumps(report, ensure_ascii=False, indent=2))]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[
+                    TextContent(type="text", text=f"Error collecting materials: {str(e)}")
+                ]
+            )
+
     async def _handle_delete_permanent_material(self, arguments: Dict[str, Any]) -> CallToolResult:
         """Handle delete_permanent_material tool call."""
         media_id = arguments.get("media_id", "")
@@ -898,6 +1515,7 @@ class XiayanMCPServer:
         try:
             success = await self.publisher.delete_permanent_material(media_id)
             if success:
+                self.material_store.remove(media_id)
                 return CallToolResult(
                     content=[
                         TextContent(
@@ -922,25 +1540,105 @@ class XiayanMCPServer:
                 ]
             )
 
+    async def _handle_get_metrics(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle get_metrics tool call."""
+        if arguments.get("format", "json") == "prometheus":
+            text = metrics.render_prometheus()
+        else:
+            text = json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2)
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    async def _handle_set_tracing(self, arguments: Dict[str, Any]) -> CallToolResult:
+        """Handle set_tracing tool call."""
+        enabled = arguments.get("enabled")
+        
+        try:
+            if enabled:
+                from .utils.paths import get_data_dir
+                fmt = arguments.get("format", "jsonl")
+                default_name = "traces.jsonl" if fmt == "jsonl" else "traces.otlp.json"
+                tracing.enable(arguments.get("path") or str(get_data_dir() / default_name), fmt)
+            elif enabled is not None:
+                tracing.disable()
+            return CallToolResult(
+                content=[TextContent(type="text", text=json.dumps(tracing.status(), ensure_ascii=False, indent=2))]
+            )
+        except Exception as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Error configuring tracing: {str(e)}")]
+            )
+
+    async def _warm_up(self) -> None:
+        """Preload heavy modules and resume unfinished publish jobs.
+        
+        Runs after the client's first list_tools (or a short delay), so that
+        preloading does not compete with the stdio handshake.
+        """
+        try:
+            await asyncio.wait_for(self._tools_listed.wait(), _WARM_UP_DELAY)
+        except asyncio.TimeoutError:
+            pass
+        
+        try:
+            await asyncio.to_thread(_import_heavy_modules)
+            # 监听主题目录，热加载修改过的主题
+            self.theme_manager.start_watching()
+            from .themes.theme_manager import PRERENDER_PREVIEWS
+            if PRERENDER_PREVIEWS:
+                await asyncio.to_thread(self.theme_manager.prerender_previews)
+            # 恢复服务器重启前未完成的发布任务
+            await self.job_manager.start()
+        except Exception as e:
+            logger.error(f"服务器预加载失败: {e}")
+
     async def run(self):
         """Run the MCP server."""
+        self._tools_listed = asyncio.Event()
         async with stdio_server() as (read_stream, write_stream):
             print("MCP服务器已就绪，正在等待请求...", file=sys.stderr)
             print("提示：使用Ctrl+C可以停止服务器", file=sys.stderr)
-            await self.server.run(
-                read_stream,
-                write_stream,
-                self.server.create_initialization_options()
-            )
+            warm_up = asyncio.create_task(self._warm_up())
+            try:
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    self.server.create_initialization_options()
+                )
+            finally:
+                warm_up.cancel()
+                if "job_manager" in self.__dict__:
+                    await self.job_manager.close()
+                if "theme_manager" in self.__dict__:
+                    self.theme_manager.stop_watching()
+                tracing.flush()
 
 
-async def main():
+def main():
     """Main entry point for the Xiayan MCP server."""
+    args = parse_args()
+    load_env_file()
+    
+    # Set up logging
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+        ]
+    )
+    
+    # 只有显式指定交互模式时才提示输入凭证，避免MCP客户端启动时阻塞在stdin上
+    if args.interactive or args.reconfigure:
+        _prompt_for_wechat_credentials(force=args.reconfigure)
+    elif not (os.getenv('WECHAT_APP_ID') and os.getenv('WECHAT_APP_SECRET')):
+        logger.warning("未设置微信公众号API凭证（WECHAT_APP_ID/WECHAT_APP_SECRET），"
+                       "发布相关工具将无法使用。可使用 --interactive 交互式配置。")
+    
     print("正在初始化xiayan-mcp服务器...", file=sys.stderr)
     server = XiayanMCPServer()
     try:
         print("服务器初始化完成，正在启动MCP服务...", file=sys.stderr)
-        await server.run()
+        asyncio.run(server.run())
     except KeyboardInterrupt:
         print("服务器已被用户停止", file=sys.stderr)
     except Exception as e:
@@ -949,4 +1647,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
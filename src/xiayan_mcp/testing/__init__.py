@@ -0,0 +1 @@
+"""Testing helpers for Xiayan (fake WeChat API)."""
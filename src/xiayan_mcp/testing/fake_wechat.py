@@ -0,0 +1,495 @@
+"""Local stand-in for the WeChat Official Account API.
+
+Serves the endpoints used by :class:`~xiayan_mcp.core.publisher.WeChatPublisher`
+with realistic payloads, so publishing can be tested and benchmarked without
+credentials or network access. Point the publisher at it with the
+``WECHAT_API_BASE_URL`` environment variable or ``publisher.base_url``.
+
+Run standalone:
+    python -m xiayan_mcp.testing.fake_wechat --port 8765 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+FAKE_APP_ID = "wxfake0000000000"
+FAKE_APP_SECRET = "fake-app-secret-0000"
+
+# 可注入的错误码及其错误信息
+INJECTABLE_ERRORS = {
+    -1: "system error",
+    40001: "invalid credential, access_token is invalid or not latest",
+    45009: "reach max api daily quota limit",
+}
+
+# 不需要access_token的接口
+_TOKEN_ENDPOINTS = ('/token', '/stable_token')
+
+
+class FakeWeChatServer:
+    """In-process fake of ``https://api.weixin.qq.com/cgi-bin``.
+
+    Drafts, materials and temporary media are kept in memory. Every request
+    goes through a middleware that applies latency, error injection and
+    per-endpoint daily quota accounting.
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 error_codes: Sequence[int] = (-1,), quotas: Optional[Dict[str, int]] = None,
+                 app_id: str = FAKE_APP_ID, app_secret: str = FAKE_APP_SECRET,
+                 host: str = '127.0.0.1', port: int = 0, seed: Optional[int] = None):
+        """
+        Initialize the fake server.
+
+        Args:
+            latency_ms: Fixed delay added to every request
+            jitter_ms: Random extra delay, uniformly distributed in [0, jitter_ms]
+            error_rate: Probability that a request fails with one of ``error_codes``
+            error_codes: Error codes used for random failures
+            quotas: Daily call limits per endpoint path, e.g. ``{"/draft/add": 100}``
+            app_id: Accepted AppID
+            app_secret: Accepted AppSecret
+            host: Host to bind
+            port: Port to bind (0 picks a free port)
+            seed: Random seed for reproducible latency and failures
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.quotas = dict(quotas or {})
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.host = host
+        self.port = port
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+        self.calls: Counter = Counter()
+        self.tokens: Dict[str, float] = {}
+        self.drafts: Dict[str, Dict] = {}
+        self.materials: Dict[str, Dict] = {}
+        self.media: Dict[str, Dict] = {}
+        self.images: Dict[str, bytes] = {}
+        self._injected: List[Dict] = []
+
+    # ========== Lifecycle ==========
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use as ``WeChatPublisher.base_url``."""
+        return f"http://{self.host}:{self.port}/cgi-bin"
+
+    def make_app(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware], client_max_size=20 * 1024 * 1024)
+        app.router.add_get('/cgi-bin/token', self._token)
+        app.router.add_post('/cgi-bin/stable_token', self._stable_token)
+        app.router.add_post('/cgi-bin/draft/add', self._draft_add)
+        app.router.add_post('/cgi-bin/draft/update', self._draft_update)
+        app.router.add_post('/cgi-bin/draft/batchget', self._draft_batchget)
+        app.router.add_post('/cgi-bin/freepublish/batchget', self._freepublish_batchget)
+        app.router.add_post('/cgi-bin/material/add_material', self._add_material)
+        app.router.add_post('/cgi-bin/material/add_news', self._add_news)
+        app.router.add_post('/cgi-bin/material/batchget_material', self._batchget_material)
+        app.router.add_get('/cgi-bin/material/get_materialcount', self._get_materialcount)
+        app.router.add_post('/cgi-bin/material/del_material', self._del_material)
+        app.router.add_post('/cgi-bin/media/upload', self._media_upload)
+        app.router.add_post('/cgi-bin/media/uploadimg', self._uploadimg)
+        app.router.add_get('/mmbiz/{name}', self._image)
+        return app
+
+    async def start(self) -> str:
+        """
+        Start serving.
+
+        Returns:
+            Base URL of the fake API
+        """
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"模拟微信API已启动: {self.base_url}")
+        return self.base_url
+
+    async def close(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'FakeWeChatServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    # ========== Fault injection and accounting ==========
+
+    def inject_error(self, errcode: int, endpoint: Optional[str] = None, count: int = 1) -> None:
+        """
+        Make the next ``count`` matching requests fail with ``errcode``.
+
+        Args:
+            errcode: WeChat error code, e.g. 40001, 45009 or -1
+            endpoint: Endpoint path such as ``/draft/add`` (default: any endpoint)
+            count: Number of requests to fail
+        """
+        self._injected.append({'errcode': errcode, 'endpoint': endpoint, 'count': count})
+
+    def host_image(self, data: bytes, filename: str = 'image.jpg') -> str:
+        """
+        Serve an image from the fake server, e.g. as an external inline image.
+
+        Args:
+            data: Image bytes
+            filename: File name used in the URL
+
+        Returns:
+            Image URL
+        """
+        return self._store_image(data, filename)
+
+    def reset_quota(self) -> None:
+        """Reset call counters, as WeChat does at midnight."""
+        self.calls.clear()
+
+    def stats(self) -> Dict:
+        """Call counts per endpoint and stored object counts."""
+        return {
+            'calls': dict(self.calls),
+            'quotas': {
+                path: {'limit': limit, 'used': self.calls[path]}
+                for path, limit in self.quotas.items()
+            },
+            'drafts': len(self.drafts),
+            'materials': len(self.materials),
+            'media': len(self.media),
+        }
+
+    def _pick_error(self, endpoint: str) -> Optional[int]:
+        """Return an error code for this request, if one should be injected."""
+        for injected in self._injected:
+            if injected['endpoint'] in (None, endpoint):
+                injected['count'] -= 1
+                if injected['count'] <= 0:
+                    self._injected.remove(injected)
+                return injected['errcode']
+
+        limit = self.quotas.get(endpoint)
+        if limit is not None and self.calls[endpoint] > limit:
+            return 45009
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._random.choice(self.error_codes)
+        return None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        endpoint = request.path[len('/cgi-bin'):] if request.path.startswith('/cgi-bin') else None
+        delay_ms = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        if endpoint is None:
+            return await handler(request)
+
+        self.calls[endpoint] += 1
+        errcode = self._pick_error(endpoint)
+        if errcode is not None:
+            if errcode == 40001:
+                # 与真实接口一致：令牌失效后需要重新获取
+                self.tokens.pop(request.query.get('access_token', ''), None)
+            return _error(errcode)
+
+        if endpoint not in _TOKEN_ENDPOINTS:
+            token = request.query.get('access_token')
+            if not token:
+                return _error(41001, "access_token missing")
+            if self.tokens.get(token, 0) < time.time():
+                return _error(40001)
+        return await handler(request)
+
+    # ========== Access token ==========
+
+    def _issue_token(self, appid: str, secret: str) -> web.Response:
+        if appid != self.app_id:
+            return _error(40013, "invalid appid")
+        if secret != self.app_secret:
+            return _error(40125, "invalid appsecret")
+        token = uuid.uuid4().hex
+        self.tokens[token] = time.time() + 7200
+        return web.json_response({'access_token': token, 'expires_in': 7200})
+
+    async def _token(self, request: web.Request) -> web.Response:
+        return self._issue_token(request.query.get('appid', ''), request.query.get('secret', ''))
+
+    async def _stable_token(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return self._issue_token(data.get('appid', ''), data.get('secret', ''))
+
+    # ========== Drafts ==========
+
+    async def _draft_add(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        articles = data.get('articles') or []
+        if not articles or len(articles) > 8:
+            return _error(45003 if articles else 44003, "invalid articles count")
+        for article in articles:
+            if article.get('thumb_media_id') not in self.materials:
+                return _error(40007, "invalid media_id")
+        media_id = _media_id()
+        self.drafts[media_id] = {
+            'media_id': media_id,
+            'content': {
+                'news_item': [self._news_item(article) for article in articles],
+                'create_time': int(time.time()),
+                'update_time': int(time.time()),
+            },
+            'update_time': int(time.time()),
+        }
+        return web.json_response({'media_id': media_id})
+
+    async def _draft_update(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        draft = self.drafts.get(data.get('media_id'))
+        if draft is None:
+            return _error(40007, "invalid media_id")
+        news_items = draft['content']['news_item']
+        index = int(data.get('index', 0))
+        if not 0 <= index < len(news_items):
+            return _error(40007, "invalid index")
+        article = data.get('articles') or {}
+        if article.get('thumb_media_id') not in self.materials:
+            return _error(40007, "invalid media_id")
+        news_items[index] = self._news_item(article)
+        draft['content']['update_time'] = draft['update_time'] = int(time.time())
+        return web.json_response({'errcode': 0, 'errmsg': 'ok'})
+
+    async def _draft_batchget(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return web.json_response(_page(list(self.drafts.values()), data, 'content'))
+
+    async def _freepublish_batchget(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return web.json_response(_page([], data, 'content'))
+
+    def _news_item(self, article: Dict) -> Dict:
+        thumb = self.materials.get(article.get('thumb_media_id'), {})
+        return {
+            'title': article.get('title', ''),
+            'author': article.get('author', ''),
+            'digest': article.get('digest', ''),
+            'content': article.get('content', ''),
+            'content_source_url': article.get('content_source_url', ''),
+            'thumb_media_id': article.get('thumb_media_id', ''),
+            'thumb_url': thumb.get('url', ''),
+            'need_open_comment': article.get('need_open_comment', 0),
+            'only_fans_can_comment': article.get('only_fans_can_comment', 0),
+            'url': f"http://mp.weixin.qq.com/s?__biz=fake&mid={uuid.uuid4().hex[:10]}",
+        }
+
+    # ========== Materials ==========
+
+    async def _read_upload(self, request: web.Request) -> Optional[Dict]:
+        """Read the ``media`` field of a multipart upload."""
+        form = await request.post()
+        media = form.get('media')
+        if media is None or not hasattr(media, 'file'):
+            return None
+        return {
+            'filename': media.filename,
+            'content_type': media.content_type,
+            'data': media.file.read(),
+            'description': form.get('description'),
+        }
+
+    def _store_image(self, data: bytes, filename: str) -> str:
+        name = f"{uuid.uuid4().hex}_{filename}"
+        self.images[name] = data
+        return f"http://{self.host}:{self.port}/mmbiz/{name}"
+
+    async def _add_material(self, request: web.Request) -> web.Response:
+        media_type = request.query.get('type', 'image')
+        upload = await self._read_upload(request)
+        if upload is None:
+            return _error(41005, "media data missing")
+        if media_type == 'thumb' and len(upload['data']) > 64 * 1024:
+            return _error(40009, "invalid image size")
+        if media_type == 'video' and not upload['description']:
+            return _error(40007, "description missing")
+
+        media_id = _media_id()
+        # 缩略图在素材库中按图片类型列出
+        listed_type = 'image' if media_type == 'thumb' else media_type
+        material = {
+            'media_id': media_id,
+            'type': listed_type,
+            'name': upload['filename'],
+            'size': len(upload['data']),
+            'update_time': int(time.time()),
+        }
+        response = {'media_id': media_id}
+        if listed_type == 'image':
+            material['url'] = response['url'] = self._store_image(upload['data'], upload['filename'])
+        self.materials[media_id] = material
+        return web.json_response(response)
+
+    async def _add_news(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        articles = data.get('articles') or []
+        if not articles:
+            return _error(44003, "empty news data")
+        media_id = _media_id()
+        self.materials[media_id] = {
+            'media_id': media_id,
+            'type': 'news',
+            'content': {
+                'news_item': [self._news_item(article) for article in articles],
+                'create_time': int(time.time()),
+                'update_time': int(time.time()),
+            },
+            'update_time': int(time.time()),
+        }
+        return web.json_response({'media_id': media_id})
+
+    async def _batchget_material(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        media_type = data.get('type')
+        if media_type not in ('image', 'video', 'voice', 'news'):
+            return _error(40004, "invalid media type")
+        if int(data.get('count', 20)) > 20:
+            return _error(45008, "count out of range")
+
+        items = []
+        for material in self.materials.values():
+            if material['type'] != media_type:
+                continue
+            if media_type == 'news':
+                items.append({key: material[key] for key in ('media_id', 'content', 'update_time')})
+            else:
+                item = {key: material[key] for key in ('media_id', 'name', 'update_time')}
+                if 'url' in material:
+                    item['url'] = material['url']
+                items.append(item)
+        items.sort(key=lambda item: item['update_time'], reverse=True)
+        return web.json_response(_page(items, data))
+
+    async def _get_materialcount(self, request: web.Request) -> web.Response:
+        counts = Counter(material['type'] for material in self.materials.values())
+        return web.json_response({
+            f"{media_type}_count": counts[media_type]
+            for media_type in ('voice', 'video', 'image', 'news')
+        })
+
+    async def _del_material(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if self.materials.pop(data.get('media_id'), None) is None:
+            return _error(40007, "invalid media_id")
+        return web.json_response({'errcode': 0, 'errmsg': 'ok'})
+
+    # ========== Temporary media ==========
+
+    async def _media_upload(self, request: web.Request) -> web.Response:
+        media_type = request.query.get('type', 'image')
+        upload = await self._read_upload(request)
+        if upload is None:
+            return _error(41005, "media data missing")
+        media_id = _media_id()
+        created_at = int(time.time())
+        self.media[media_id] = {'type': media_type, 'size': len(upload['data']), 'created_at': created_at}
+        return web.json_response({'type': media_type, 'media_id': media_id, 'created_at': created_at})
+
+    async def _uploadimg(self, request: web.Request) -> web.Response:
+        upload = await self._read_upload(request)
+        if upload is None:
+            return _error(41005, "media data missing")
+        if len(upload['data']) > 1024 * 1024:
+            return _error(40009, "invalid image size")
+        return web.json_response({'url': self._store_image(upload['data'], upload['filename'])})
+
+    async def _image(self, request: web.Request) -> web.Response:
+        data = self.images.get(request.match_info['name'])
+        if data is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=data, content_type='image/jpeg')
+
+
+def _media_id() -> str:
+    """Generate a media ID shaped like WeChat's."""
+    return uuid.uuid4().hex + uuid.uuid4().hex[:11]
+
+
+def _error(errcode: int, errmsg: Optional[str] = None) -> web.Response:
+    """WeChat style error response (HTTP 200 with errcode)."""
+    return web.json_response({
+        'errcode': errcode,
+        'errmsg': errmsg or INJECTABLE_ERRORS.get(errcode, 'error'),
+    })
+
+
+def _page(items: List[Dict], data: Dict, strip_key: Optional[str] = None) -> Dict:
+    """Paginate ``items`` the way batchget endpoints do."""
+    offset = int(data.get('offset', 0))
+    count = int(data.get('count', 20))
+    page = items[offset:offset + count]
+    if strip_key and data.get('no_content'):
+        page = [
+            {**item, strip_key: {
+                **item[strip_key],
+                'news_item': [{**news, 'content': ''} for news in item[strip_key]['news_item']],
+            }}
+            for item in page
+        ]
+    return {'total_count': len(items), 'item_count': len(page), 'item': page}
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    quotas = dict(item.split('=', 1) for item in args.quota)
+    server = FakeWeChatServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        error_codes=args.error_codes, quotas={path: int(limit) for path, limit in quotas.items()},
+        host=args.host, port=args.port, seed=args.seed,
+    )
+    async with server:
+        print(f"WECHAT_API_BASE_URL={server.base_url}")
+        print(f"WECHAT_APP_ID={server.app_id}")
+        print(f"WECHAT_APP_SECRET={server.app_secret}")
+        while True:
+            await asyncio.sleep(3600)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the fake API until interrupted."""
+    parser = argparse.ArgumentParser(description="Local fake WeChat Official Account API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-codes', type=int, nargs='+', default=[-1],
+                        help='Error codes for random failures, e.g. 40001 45009 -1')
+    parser.add_argument('--quota', action='append', default=[], metavar='PATH=LIMIT',
+                        help='Daily call limit for an endpoint, e.g. /draft/add=100')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
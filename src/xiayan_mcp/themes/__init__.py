@@ -2,5 +2,6 @@
 
 from .theme import Theme
 from .theme_manager import ThemeManager
+from .templates import TemplateRegistry, get_template_registry
 
-__all__ = ["Theme", "ThemeManager"]
\ No newline at end of file
+__all__ = ["Theme", "ThemeManager", "TemplateRegistry", "get_template_registry"]
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""Compiled Jinja template registry for themes.
+
+``jinja2.Template(source)`` compiles the source to Python bytecode every
+time it is called. The registry instead keeps one compiled template per
+theme version, keyed by theme id and a hash of the template source, so a
+theme is compiled once per version: updating a theme's template changes the
+hash and the old version ages out of the LRU.
+
+All templates share one ``Environment`` with a ``FileSystemBytecodeCache``
+under the data directory (``XIAYAN_TEMPLATE_CACHE_DIR`` overrides it, set it
+to ``off`` to keep the cache in memory only), so compiled code also
+survives restarts.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils import metrics
+from ..utils.paths import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# 内存中保留的已编译模板版本数
+MAX_COMPILED_TEMPLATES = 64
+
+
+def template_hash(source: str) -> str:
+    """Short content hash identifying a template version."""
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+
+
+def _default_cache_dir() -> Optional[Path]:
+    value = os.getenv('XIAYAN_TEMPLATE_CACHE_DIR', '')
+    if value.lower() == 'off':
+        return None
+    return Path(value) if value else get_data_dir() / 'template_cache'
+
+
+class TemplateRegistry:
+    """Compile theme templates once per (theme id, content hash)."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, use_disk_cache: bool = True):
+        """
+        Args:
+            cache_dir: Directory for the bytecode cache, defaults to the data directory
+            use_disk_cache: Whether to persist compiled bytecode to disk
+        """
+        if use_disk_cache and cache_dir is None:
+            cache_dir = _default_cache_dir()
+        self._cache_dir = cache_dir if use_disk_cache else None
+        self._environment = None
+        self._sources: Dict[str, str] = {}
+        self._compiled: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    @property
+    def environment(self):
+        """Shared Jinja environment, created on first use."""
+        if self._environment is None:
+            # 延迟导入jinja2，避免拖慢服务器启动
+            from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache
+
+            sources = self._sources
+
+            class _RegistryLoader(BaseLoader):
+                def get_source(self, environment, name):
+                    # 模板名包含内容哈希，同名模板内容不会变化
+                    return sources[name], None, lambda: True
+
+            bytecode_cache = None
+            if self._cache_dir is not None:
+                try:
+                    self._cache_dir.mkdir(parents=True, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(str(self._cache_dir), '%s.jinja.cache')
+                except OSError as e:
+                    logger.warning(f"模板字节码缓存目录不可用，仅使用内存缓存: {e}")
+            # 编译后的模板由注册表持有，不需要Environment自身的缓存
+            self._environment = Environment(loader=_RegistryLoader(), bytecode_cache=bytecode_cache,
+                                            cache_size=0, auto_reload=False)
+        return self._environment
+
+    def get(self, theme_id: str, source: str):
+        """
+        Get the compiled template for a theme's template source.
+
+        Args:
+            theme_id: Theme ID
+            source: Template source
+
+        Returns:
+            Compiled ``jinja2.Template``
+        """
+        key = (theme_id, template_hash(source))
+        with self._lock:
+            template = self._compiled.get(key)
+            if template is not None:
+                self._compiled.move_to_end(key)
+        metrics.record_cache('template', template is not None)
+        if template is not None:
+            return template
+        with self._lock:
+            template = self._compiled.get(key)
+            if template is not None:
+                return template
+            name = '@'.join(key)
+            self._sources[name] = source
+            try:
+                template = self.environment.get_template(name)
+            finally:
+                del self._sources[name]
+            self._compiled[key] = template
+            if len(self._compiled) > MAX_COMPILED_TEMPLATES:
+                self._compiled.popitem(last=False)
+            self.compilations += 1
+            return template
+
+    def render(self, theme, **context: Any) -> str:
+        """Render a theme's template with the given context."""
+        return self.get(theme.id, theme.template).render(**context)
+
+    def invalidate(self, theme_id: Optional[str] = None) -> None:
+        """Drop compiled templates for one theme, or all themes."""
+        with self._lock:
+            if theme_id is None:
+                self._compiled.clear()
+                return
+            for key in [key for key in self._compiled if key[0] == theme_id]:
+                del self._compiled[key]
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Process-wide template registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
@@ -13,6 +13,8 @@ class Theme:
     description: str
     template: str
     css_styles: Optional[str] = None
+    # 内容每次变化（更新或主题文件被修改）时递增
+    version: int = 1
     
     def __post_init__(self):
         """Post-initialization setup."""
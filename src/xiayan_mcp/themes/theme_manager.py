@@ -1,78 +1,98 @@
 """Theme manager for handling multiple themes."""
 
-from typing import Dict, List
-
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..utils import metrics
+from .templates import get_template_registry
 from .theme import Theme
+from .theme_store import ThemeStore
+
+logger = logging.getLogger(__name__)
+
+# 主题目录的轮询间隔（秒），0表示不监听
+DEFAULT_WATCH_INTERVAL = float(os.getenv('XIAYAN_THEME_WATCH_INTERVAL', '2') or 0)
+
+# 缓存的主题预览数量
+MAX_CACHED_PREVIEWS = 128
+
+# 启动时预先渲染所有主题的默认预览，设为0关闭
+PRERENDER_PREVIEWS = os.getenv('XIAYAN_PRERENDER_PREVIEWS', '1') != '0'
+
+
+@dataclass(frozen=True)
+class ThemeListing:
+    """Serialized theme list, computed once per set of theme versions."""
+
+    themes: List[Dict]
+    json: str
+    etag: str
+
+
+@dataclass(frozen=True)
+class ThemePreview:
+    """Rendered theme preview with its strong ETag."""
+
+    html: str
+    etag: str
+
+
+def theme_fingerprint(theme: Theme) -> str:
+    """Content hash of everything that affects a theme's listing and rendering."""
+    digest = hashlib.sha1()
+    for part in (theme.id, theme.name, theme.description, theme.template, theme.css_styles or ""):
+        digest.update((part or "").encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
 
 
 class ThemeManager:
-    """Manager for available themes."""
-
-    def __init__(self):
-        """Initialize theme manager with built-in themes."""
-        self._themes = self._load_builtin_themes()
-
-    def _load_builtin_themes(self) -> Dict[str, Theme]:
-        """Load built-in themes."""
-        themes = {
-            "default": Theme(
-                id="default",
-                name="默认主题",
-                description="简洁大方的默认主题",
-                template=self._get_default_template(),
-                css_styles=self._get_default_css()
-            ),
-            "orangeheart": Theme(
-                id="orangeheart", 
-                name="Orange Heart",
-                description="温暖橙心主题，基于Typora的Orange Heart主题",
-                template=self._get_default_template(),
-                css_styles=self._get_orangeheart_css()
-            ),
-            "rainbow": Theme(
-                id="rainbow",
-                name="Rainbow", 
-                description="彩虹主题，基于Typora的Rainbow主题",
-                template=self._get_default_template(),
-                css_styles=self._get_rainbow_css()
-            ),
-            "lapis": Theme(
-                id="lapis",
-                name="Lapis",
-                description="青金石主题，基于Typora的Lapis主题", 
-                template=self._get_default_template(),
-                css_styles=self._get_lapis_css()
-            ),
-            "pie": Theme(
-                id="pie",
-                name="Pie",
-                description="派主题，基于Typora的Pie主题",
-                template=self._get_default_template(),
-                css_styles=self._get_pie_css()
-            ),
-            "maize": Theme(
-                id="maize", 
-                name="Maize",
-                description="玉米主题，基于Typora的Maize主题",
-                template=self._get_default_template(),
-                css_styles=self._get_maize_css()
-            ),
-            "purple": Theme(
-                id="purple",
-                name="Purple",
-                description="紫色主题，基于Typora的Purple主题",
-                template=self._get_default_template(),
-                css_styles=self._get_purple_css()
-            ),
-            "phycat": Theme(
-                id="phycat",
-                name="物理猫薄荷",
-                description="物理猫薄荷主题，清新自然",
-                template=self._get_default_template(),
-                css_styles=self._get_phycat_css()
-            )
-        }
-        return themes
+    """Manager for available themes.
+
+    Themes are loaded from the built-in theme directory and the user theme
+    directory (see ``theme_store``); added and updated themes are written
+    back to the user directory. Every change bumps the theme's version and
+    notifies the listeners registered with ``add_change_listener`` with the
+    theme ID, so caches only drop entries for that theme.
+    """
+
+    def __init__(self, themes_dir: Optional[Path] = None):
+        """
+        Initialize theme manager with built-in and stored themes.
+
+        Args:
+            themes_dir: User theme directory, defaults to ``XIAYAN_THEMES_DIR`` or the data directory
+        """
+        self.store = ThemeStore(themes_dir)
+        self._default_template = self.store.default_template
+        self._default_css = self.store.default_css
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[str], None]] = []
+        # 主题元数据和列表在主题变化时才重新计算
+        self._fingerprints: Dict[str, str] = {}
+        self._listings: Dict[bool, ThemeListing] = {}
+        # (主题ID, 版本, 示例内容哈希) -> 渲染好的预览
+        self._previews: 'OrderedDict[Tuple[str, int, str], ThemePreview]' = OrderedDict()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+        self._themes = self.store.load_all()
+        index_changed = False
+        for theme in self._themes.values():
+            theme.version, changed = self.store.resolve_version(theme.id, self.get_theme_fingerprint(theme.id))
+            if changed:
+                self.store.record_version(theme.id, theme.version, self._fingerprints[theme.id])
+                index_changed = True
+        if index_changed:
+            self.store.save_index()
+        self._signatures = self.store.signatures()
 
     def get_theme(self, theme_id: str) -> Theme:
         """Get theme by ID."""
@@ -83,14 +103,41 @@ class ThemeManager:
 
     def get_available_themes(self) -> List[Dict]:
         """Get list of all available themes with detailed information."""
-        return [{
-            'id': theme.id,
-            'name': theme.name,
-            'description': theme.description,
-            'has_custom_template': theme.template != self._get_default_template(),
-            'has_custom_css': bool(theme.css_styles and theme.css_styles != self._get_default_css())
-        } for theme in self._themes.values()]
-    
+        return self.get_theme_listing(detailed=True).themes
+
+    def get_theme_listing(self, detailed: bool = False) -> ThemeListing:
+        """
+        Get the cached theme list together with its JSON and ETag.
+
+        Args:
+            detailed: Include ``has_custom_template``/``has_custom_css``
+
+        Returns:
+            ThemeListing; recomputed only after a theme is added or updated
+        """
+        listing = self._listings.get(detailed)
+        if listing is None:
+            themes = [self._theme_metadata(theme, detailed) for theme in self._themes.values()]
+            text = json.dumps(themes, ensure_ascii=False)
+            etag = '"' + hashlib.sha1(text.encode('utf-8')).hexdigest()[:16] + '"'
+            listing = self._listings[detailed] = ThemeListing(themes, text, etag)
+        return listing
+
+    def get_theme_fingerprint(self, theme_id: str) -> str:
+        """Fingerprint of the theme that ``get_theme`` returns for this ID."""
+        theme = self.get_theme(theme_id)
+        fingerprint = self._fingerprints.get(theme.id)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[theme.id] = theme_fingerprint(theme)
+        return fingerprint
+
+    def _theme_metadata(self, theme: Theme, detailed: bool) -> Dict:
+        metadata = {'id': theme.id, 'name': theme.name, 'description': theme.description}
+        if detailed:
+            metadata['has_custom_template'] = theme.template != self._default_template
+            metadata['has_custom_css'] = bool(theme.css_styles and theme.css_styles != self._default_css)
+        return metadata
+
     def get_theme_preview(self, theme_id: str, sample_content: str = "") -> str:
         """
         Get HTML preview of a theme with sample content.
@@ -102,28 +149,96 @@ class ThemeManager:
         Returns:
             HTML preview of the theme
         """
+        return self.get_cached_preview(theme_id, sample_content).html
+
+    def get_cached_preview(self, theme_id: str, sample_content: str = "") -> ThemePreview:
+        """
+        Get a theme preview, rendering it only once per theme version and sample content.
+
+        Args:
+            theme_id: ID of the theme to preview
+            sample_content: Optional sample content to use for preview
+
+        Returns:
+            ThemePreview with the HTML and a strong ETag
+        """
         theme = self.get_theme(theme_id)
         
         if not sample_content:
             sample_content = self._get_default_sample_content()
         
-        # Render theme template with sample content
-        from jinja2 import Template
-        template = Template(theme.template)
+        key = (theme.id, theme.version, hashlib.sha1(sample_content.encode('utf-8')).hexdigest())
+        with self._lock:
+            preview = self._previews.get(key)
+            if preview is not None:
+                self._previews.move_to_end(key)
+        metrics.record_cache('theme_preview', preview is not None)
+        if preview is not None:
+            return preview
         
-        return template.render(
+        # Render theme template with sample content (compiled once per theme version)
+        html = get_template_registry().render(
+            theme,
             content=sample_content,
             css_styles=self._combine_styles(theme.css_styles or "")
         )
-    
+        preview = ThemePreview(html, '"' + hashlib.sha1(html.encode('utf-8')).hexdigest()[:20] + '"')
+        with self._lock:
+            self._previews[key] = preview
+            if len(self._previews) > MAX_CACHED_PREVIEWS:
+                self._previews.popitem(last=False)
+        return preview
+
+    def prerender_previews(self) -> int:
+        """Render the default preview of every theme, so the theme gallery costs no renders."""
+        themes = list(self._themes)
+        for theme_id in themes:
+            self.get_cached_preview(theme_id)
+        return len(themes)
+
+    def _invalidate_theme(self, theme_id: str) -> None:
+        """Drop the listings and the cached data of one theme (caller holds the lock)."""
+        self._listings.clear()
+        self._fingerprints.pop(theme_id, None)
+        for key in [key for key in self._previews if key[0] == theme_id]:
+            del self._previews[key]
+
+    def add_change_listener(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(theme_id)`` whenever a theme is added, updated or reloaded."""
+        self._listeners.append(listener)
+
+    def _theme_changed(self, theme: Theme, persist: bool = True) -> None:
+        """Bump the version of a changed theme and invalidate what depends on it."""
+        with self._lock:
+            previous = self._themes.get(theme.id)
+            if previous is not None:
+                previous_version = previous.version
+            else:
+                # 删除后重新添加的主题版本号继续递增
+                previous_version = self.store.index.get(theme.id, {}).get('version', 0)
+            theme.version = max(theme.version, previous_version + 1)
+            if persist:
+                self.store.save(theme)
+                self._signatures[theme.id] = self.store.signature(theme.id)
+            self._themes[theme.id] = theme
+            self._invalidate_theme(theme.id)
+            self.store.record_version(theme.id, theme.version, self.get_theme_fingerprint(theme.id))
+            self.store.save_index()
+        get_template_registry().invalidate(theme.id)
+        for listener in list(self._listeners):
+            try:
+                listener(theme.id)
+            except Exception as e:
+                logger.warning(f"主题变更回调失败: {e}")
+
     def add_custom_theme(self, theme: Theme) -> None:
         """
-        Add a custom theme to the theme manager.
+        Add a custom theme to the theme manager and save it to the theme directory.
         
         Args:
             theme: Theme object to add
         """
-        self._themes[theme.id] = theme
+        self._theme_changed(theme)
     
     def update_theme(self, theme_id: str, **kwargs) -> Theme:
         """
@@ -131,25 +246,104 @@ class ThemeManager:
         
         Args:
             theme_id: ID of the theme to update
-            **kwargs: Theme properties to update
+            **kwargs: Theme properties to update; None values are left unchanged
             
         Returns:
             Updated Theme object
         """
         theme = self.get_theme(theme_id)
         
+        def value(key: str):
+            new_value = kwargs.get(key)
+            return getattr(theme, key) if new_value is None else new_value
+        
         # Create a new theme with updated properties
         updated_theme = Theme(
             id=theme.id,
-            name=kwargs.get('name', theme.name),
-            description=kwargs.get('description', theme.description),
-            template=kwargs.get('template', theme.template),
-            css_styles=kwargs.get('css_styles', theme.css_styles)
+            name=value('name'),
+            description=value('description'),
+            template=value('template'),
+            css_styles=value('css_styles'),
+            version=theme.version
         )
         
-        self._themes[theme_id] = updated_theme
+        self._theme_changed(updated_theme)
         return updated_theme
-    
+
+    # ========== Theme directory watching ==========
+
+    def reload_changed(self) -> List[str]:
+        """
+        Reload themes whose files changed in the user theme directory.
+
+        Returns:
+            IDs of the reloaded (or removed) themes
+        """
+        with self._lock:
+            signatures = self.store.signatures()
+            changed = [theme_id for theme_id in set(signatures) | set(self._signatures)
+                       if signatures.get(theme_id) != self._signatures.get(theme_id)]
+            reloaded = []
+            for theme_id in sorted(changed):
+                self._signatures[theme_id] = signatures.get(theme_id)
+                theme = self.store.load(theme_id)
+                if theme is None:
+                    # 目录被删除：自定义主题移除（内置主题会重新加载为内置版本）
+                    self._remove_theme(theme_id)
+                else:
+                    current = self._themes.get(theme_id)
+                    if current is not None and theme_fingerprint(current) == theme_fingerprint(theme):
+                        continue
+                    logger.info(f"主题文件已变化，重新加载: {theme_id}")
+                    self._theme_changed(theme, persist=False)
+                reloaded.append(theme_id)
+            return reloaded
+
+    def _remove_theme(self, theme_id: str) -> None:
+        if theme_id not in self._themes or theme_id == 'default':
+            return
+        logger.info(f"主题目录已删除，移除主题: {theme_id}")
+        with self._lock:
+            del self._themes[theme_id]
+            self._invalidate_theme(theme_id)
+        get_template_registry().invalidate(theme_id)
+        for listener in list(self._listeners):
+            listener(theme_id)
+
+    def start_watching(self, interval: float = DEFAULT_WATCH_INTERVAL) -> bool:
+        """
+        Poll the user theme directory and hot-reload changed themes.
+
+        Args:
+            interval: Polling interval in seconds; 0 disables watching
+
+        Returns:
+            Whether a watcher is running
+        """
+        if interval <= 0:
+            return False
+        if self._watcher is not None and self._watcher.is_alive():
+            return True
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.reload_changed()
+                except Exception as e:
+                    logger.warning(f"检查主题目录失败: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='xiayan-theme-watcher', daemon=True)
+        self._watcher.start()
+        return True
+
+    def stop_watching(self) -> None:
+        """Stop the theme directory watcher."""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
     def _get_default_sample_content(self) -> str:
         """Get default sample content for theme preview."""
         return """
@@ -188,223 +382,7 @@ print("Hello, World!")
     
     def _combine_styles(self, theme_css: str) -> str:
         """Combine default styles with theme-specific styles."""
-        default_css = self._get_default_css()
+        default_css = self._default_css
         if theme_css:
             return f"{default_css}\n\n{theme_css}"
         return default_css
-
-    def _get_default_template(self) -> str:
-        """Get default HTML template."""
-        return """
-<section class="article-content" style="font-family: -apple-system, BlinkMacSystemFont, 'PingFang SC', 'Microsoft YaHei', 'Segoe UI', Roboto, sans-serif; line-height: 1.6; color: #333; max-width: 100%; margin: 0; padding: 20px; text-align: justify;">
-    {{ content|safe }}
-</section>
-        """
-
-    def _get_default_css(self) -> str:
-        """Get default CSS styles."""
-        return """
-/* 优化微信公众号显示样式 */
-.article-content {
-    font-family: -apple-system, BlinkMacSystemFont, 'PingFang SC', 'Microsoft YaHei', 'Segoe UI', Roboto, sans-serif;
-    line-height: 1.8;
-    color: #333;
-    text-align: justify;
-    font-size: 16px;
-}
-
-.article-content h1, .article-content h2, .article-content h3, 
-.article-content h4, .article-content h5, .article-content h6 {
-    margin: 1.5em 0 0.8em 0;
-    font-weight: bold;
-    line-height: 1.4;
-    color: #222;
-}
-
-.article-content h1 { font-size: 24px; text-align: center; border-bottom: 1px solid #eee; padding-bottom: 10px; }
-.article-content h2 { font-size: 20px; }
-.article-content h3 { font-size: 18px; }
-
-.article-content p {
-    margin-bottom: 1.2em;
-    text-indent: 2em;
-    line-height: 1.8;
-}
-
-.article-content ul, .article-content ol {
-    margin: 1em 0;
-    padding-left: 2.5em;
-}
-
-.article-content li {
-    margin-bottom: 0.6em;
-    line-height: 1.8;
-}
-
-.article-content img {
-    max-width: 100%;
-    height: auto;
-    display: block;
-    margin: 1.5em auto;
-    border-radius: 4px;
-}
-
-.article-content blockquote {
-    margin: 1.5em 0;
-    padding: 15px 20px;
-    border-left: 4px solid #ddd;
-    background-color: #f9f9f9;
-    color: #666;
-    font-style: italic;
-}
-
-.article-content code {
-    background-color: #f4f4f4;
-    padding: 3px 6px;
-    border-radius: 3px;
-    font-family: "Monaco", "Consolas", monospace;
-    font-size: 14px;
-}
-
-.article-content pre {
-    background-color: #f4f4f4;
-    padding: 1em;
-    border-radius: 5px;
-    overflow-x: auto;
-    margin: 1em 0;
-}
-
-.article-content strong {
-    font-weight: bold;
-    color: #333;
-}
-
-.article-content em {
-    font-style: italic;
-    color: #555;
-}
-        """
-
-    def _get_orangeheart_css(self) -> str:
-        """Get Orange Heart theme CSS."""
-        return """
-.article-content {
-    font-family: "PingFang SC", "Microsoft YaHei", sans-serif;
-    color: #2c3e50;
-    line-height: 1.8;
-}
-
-.article-content h1 { color: #e67e22; border-bottom: 2px solid #e67e22; }
-.article-content h2 { color: #d35400; }
-.article-content h3 { color: #e67e22; }
-.article-content blockquote {
-    background: linear-gradient(90deg, #fff5f0 0%, #fff 100%);
-    border-left: 4px solid #e67e22;
-}
-        """
-
-    def _get_rainbow_css(self) -> str:
-        """Get Rainbow theme CSS."""
-        return """
-.article-content {
-    font-family: "Helvetica Neue", Arial, sans-serif;
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 30px;
-    border-radius: 10px;
-}
-
-.article-content h1 { color: #ffd89b; }
-.article-content h2 { color: #f9ca24; }
-.article-content h3 { color: #f0932b; }
-        """
-
-    def _get_lapis_css(self) -> str:
-        """Get Lapis theme CSS."""
-        return """
-.article-content {
-    font-family: "SF Pro Display", -apple-system, sans-serif;
-    color: #2c3e50;
-}
-
-.article-content h1 { color: #3498db; }
-.article-content h2 { color: #2980b9; }
-.article-content blockquote {
-    background-color: #ecf0f1;
-    border-left: 4px solid #3498db;
-    padding: 15px;
-}
-        """
-
-    def _get_pie_css(self) -> str:
-        """Get Pie theme CSS."""
-        return """
-.article-content {
-    font-family: "Georgia", serif;
-    color: #34495e;
-}
-
-.article-content h1 { color: #8e44ad; }
-.article-content h2 { color: #9b59b6; }
-.article-content blockquote {
-    font-style: italic;
-    background: #f8f9fa;
-    border-left: 3px solid #8e44ad;
-}
-        """
-
-    def _get_maize_css(self) -> str:
-        """Get Maize theme CSS."""
-        return """
-.article-content {
-    font-family: "Ubuntu", sans-serif;
-    color: #2c3e50;
-}
-
-.article-content h1 { color: #f39c12; }
-.article-content h2 { color: #e67e22; }
-.article-content blockquote {
-    background-color: #fef9e7;
-    border-left: 4px solid #f39c12;
-}
-        """
-
-    def _get_purple_css(self) -> str:
-        """Get Purple theme CSS."""
-        return """
-.article-content {
-    font-family: "Avenir", "Helvetica Neue", sans-serif;
-    color: #2c3e50;
-}
-
-.article-content h1 { color: #8e44ad; }
-.article-content h2 { color: #9b59b6; }
-.article-content h3 { color: #a569bd; }
-.article-content blockquote {
-    background: linear-gradient(90deg, #f4f3ff 0%, #fff 100%);
-    border-left: 4px solid #8e44ad;
-}
-        """
-
-    def _get_phycat_css(self) -> str:
-        """Get PhyCat theme CSS."""
-        return """
-.article-content {
-    font-family: "PingFang SC", "Microsoft YaHei", sans-serif;
-    color: #27ae60;
-    line-height: 1.7;
-}
-
-.article-content h1 { color: #16a085; }
-.article-content h2 { color: #1abc9c; }
-.article-content blockquote {
-    background-color: #e8f5e8;
-    border-left: 4px solid #27ae60;
-    padding: 12px 20px;
-}
-
-.article-content code {
-    background-color: #f0fff0;
-    border: 1px solid #d5f4e6;
-}
-        """
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""Themes stored as directories of CSS and template files.
+
+Each theme is a directory named after its ID::
+
+    <themes_dir>/
+        index.json          # {theme_id: {"version": n, "fingerprint": "..."}}
+        <theme_id>/
+            theme.json      # {"name": "...", "description": "..."}
+            style.css
+            template.html   # optional, the default template is used when missing
+
+Built-in themes ship in the same layout inside the package (``builtin/``,
+read-only). Custom themes, and built-in themes that were updated, are
+written to the user directory (``XIAYAN_THEMES_DIR``, default ``themes/``
+under the data directory), which takes precedence. ``index.json`` keeps
+each theme's version so versions keep increasing across restarts and
+file edits made while the server was stopped.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.paths import get_data_dir
+from .theme import Theme
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_DIR = Path(__file__).parent / 'builtin'
+
+INDEX_FILE = 'index.json'
+META_FILE = 'theme.json'
+CSS_FILE = 'style.css'
+TEMPLATE_FILE = 'template.html'
+
+_THEME_FILES = (META_FILE, CSS_FILE, TEMPLATE_FILE)
+
+# 主题ID同时是目录名，只允许安全字符
+THEME_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+
+def get_themes_dir() -> Path:
+    """User theme directory (not created until a theme is saved)."""
+    return Path(os.getenv('XIAYAN_THEMES_DIR', '') or get_data_dir() / 'themes')
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_text(path: Path, text: str) -> None:
+    """Write atomically so the watcher never sees a half-written file."""
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_theme_dir(directory: Path, default_template: str) -> Optional[Theme]:
+    """
+    Read one theme directory.
+
+    Args:
+        directory: Theme directory; its name is the theme ID
+        default_template: Template used when the theme has no template.html
+
+    Returns:
+        Theme, or None if the directory is not a valid theme
+    """
+    meta_text = _read_text(directory / META_FILE)
+    if meta_text is None:
+        return None
+    try:
+        meta = json.loads(meta_text)
+    except ValueError as e:
+        logger.warning(f"主题 {directory.name} 的{META_FILE}无效: {e}")
+        return None
+    return Theme(
+        id=directory.name,
+        name=meta.get('name', directory.name),
+        description=meta.get('description', ''),
+        template=_read_text(directory / TEMPLATE_FILE) or default_template,
+        css_styles=_read_text(directory / CSS_FILE) or '',
+    )
+
+
+def dir_signature(directory: Path) -> Tuple:
+    """Modification times and sizes of a theme's files, used to detect changes."""
+    signature = []
+    for name in _THEME_FILES:
+        try:
+            stat = (directory / name).stat()
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class ThemeStore:
+    """Load and persist themes in the built-in and user theme directories."""
+
+    def __init__(self, directory: Optional[Path] = None, builtin_dir: Path = BUILTIN_DIR):
+        self.directory = Path(directory) if directory is not None else get_themes_dir()
+        self.builtin_dir = builtin_dir
+        self.default_template = _read_text(builtin_dir / 'default' / TEMPLATE_FILE) or ''
+        self.default_css = _read_text(builtin_dir / 'default' / CSS_FILE) or ''
+        self._index: Optional[Dict[str, Dict]] = None
+
+    # ========== Loading ==========
+
+    def builtin_ids(self) -> List[str]:
+        """Built-in theme IDs in display order."""
+        with open(self.builtin_dir / INDEX_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)['themes']
+
+    def user_ids(self) -> List[str]:
+        """IDs of the themes in the user directory."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.name for path in self.directory.iterdir()
+                      if path.is_dir() and not path.name.startswith('.'))
+
+    def load_builtin(self, theme_id: str) -> Optional[Theme]:
+        return read_theme_dir(self.builtin_dir / theme_id, self.default_template)
+
+    def load(self, theme_id: str) -> Optional[Theme]:
+        """Load a theme, preferring the user directory over the built-in one."""
+        theme = read_theme_dir(self.directory / theme_id, self.default_template)
+        if theme is None:
+            theme = self.load_builtin(theme_id)
+        return theme
+
+    def load_all(self) -> Dict[str, Theme]:
+        """Load all themes: built-in ones first, then user themes."""
+        themes: Dict[str, Theme] = {}
+        for theme_id in self.builtin_ids() + self.user_ids():
+            if theme_id not in themes:
+                theme = self.load(theme_id)
+                if theme is not None:
+                    themes[theme_id] = theme
+        return themes
+
+    def signature(self, theme_id: str) -> Tuple:
+        return dir_signature(self.directory / theme_id)
+
+    def signatures(self) -> Dict[str, Tuple]:
+        """Signatures of all user theme directories."""
+        return {theme_id: self.signature(theme_id) for theme_id in self.user_ids()}
+
+    # ========== Saving ==========
+
+    def save(self, theme: Theme) -> None:
+        """Write a theme to the user directory."""
+        if not THEME_ID_PATTERN.match(theme.id or ''):
+            raise ValueError(f"无效的主题ID: {theme.id}，只能包含字母、数字、下划线和连字符")
+        directory = self.directory / theme.id
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_text(directory / META_FILE, json.dumps(
+            {'name': theme.name, 'description': theme.description}, ensure_ascii=False, indent=2) + '\n')
+        _write_text(directory / CSS_FILE, theme.css_styles or '')
+        template_path = directory / TEMPLATE_FILE
+        if theme.template and theme.template != self.default_template:
+            _write_text(template_path, theme.template)
+        elif template_path.exists():
+            template_path.unlink()
+
+    # ========== Version index ==========
+
+    @property
+    def index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            text = _read_text(self.directory / INDEX_FILE)
+            try:
+                self._index = json.loads(text) if text else {}
+            except ValueError as e:
+                logger.warning(f"主题索引{INDEX_FILE}无效，将重新生成: {e}")
+                self._index = {}
+        return self._index
+
+    def resolve_version(self, theme_id: str, fingerprint: str) -> Tuple[int, bool]:
+        """
+        Version for a theme with the given content fingerprint.
+
+        Returns:
+            (version, changed): the stored version if the content is unchanged,
+            otherwise the next version
+        """
+        entry = self.index.get(theme_id)
+        if entry is None:
+            return 1, True
+        if entry.get('fingerprint') == fingerprint:
+            return entry.get('version', 1), False
+        return entry.get('version', 1) + 1, True
+
+    def record_version(self, theme_id: str, version: int, fingerprint: str) -> None:
+        self.index[theme_id] = {'version': version, 'fingerprint': fingerprint}
+
+    def save_index(self) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _write_text(self.directory / INDEX_FILE,
+                        json.dumps(self.index, ensure_ascii=False, indent=2, sort_keys=True) + '\n')
+        except OSError as e:
+            logger.warning(f"保存主题索引失败: {e}")
@@ -0,0 +1,85 @@
+"""Concurrency helpers shared by the publishing pipeline."""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+async def gather_bounded(aws: Iterable[Awaitable[T]], limit: int,
+                         return_exceptions: bool = False) -> List[T]:
+    """
+    Await coroutines concurrently with at most ``limit`` in flight.
+
+    Args:
+        aws: Coroutines to run
+        limit: Maximum number of coroutines running at the same time
+        return_exceptions: Return exceptions as results instead of raising
+
+    Returns:
+        Results in the same order as ``aws``
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(_run(aw) for aw in aws),
+                                return_exceptions=return_exceptions)
+
+
+class RateLimiter:
+    """Async rate limiter spacing calls at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate_per_second: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate_per_second: Maximum number of calls per second (<= 0 disables limiting)
+        """
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """Wait until the next call slot is available."""
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Get the shared executor used for CPU-bound work such as formatting."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        workers = int(os.getenv('XIAYAN_CPU_WORKERS', '0')) or min(8, (os.cpu_count() or 1) + 1)
+        _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='xiayan-cpu')
+    return _cpu_executor
+
+
+async def run_in_cpu_pool(func: Callable[..., T], *args) -> T:
+    """Run a blocking function on the shared CPU executor.
+
+    Context variables (such as the current tracing span) are propagated to
+    the worker thread, as with ``asyncio.to_thread``.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(context.run, func, *args))
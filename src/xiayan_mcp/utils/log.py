@@ -0,0 +1,99 @@
+"""Structured, lazily evaluated log events.
+
+``log_event`` writes one ``event key=value ...`` line per event. Nothing is
+formatted unless the logger is enabled for the level: field values that are
+callables are only called after that check, so request bodies and result
+dicts are never stringified on the hot path. Every value is truncated to
+``XIAYAN_LOG_MAX_FIELD`` characters (default 200), and DEBUG/INFO events
+can be sampled with ``XIAYAN_LOG_SAMPLE_RATE`` (0-1, default 1); warnings
+and errors are always written.
+
+The event name and raw fields are also attached to the record as
+``event``/``fields`` for handlers that emit JSON.
+"""
+
+import logging
+import os
+import random
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_MAX_FIELD = 200
+
+# 正文、HTML等大字段在日志中只记录长度
+CONTENT_KEYS = ('content', 'html', 'html_content', 'final_content', 'body')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, '') or default)
+    except ValueError:
+        return default
+
+
+_sample_rate = min(max(_env_float('XIAYAN_LOG_SAMPLE_RATE', 1.0), 0.0), 1.0)
+_max_field = max(int(_env_float('XIAYAN_LOG_MAX_FIELD', DEFAULT_MAX_FIELD)), 16)
+
+
+def configure(sample_rate: Optional[float] = None, max_field: Optional[int] = None) -> None:
+    """Override the sampling rate and field length limit at runtime."""
+    global _sample_rate, _max_field
+    if sample_rate is not None:
+        _sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+    if max_field is not None:
+        _max_field = max(int(max_field), 16)
+
+
+def truncate(value: Any, limit: Optional[int] = None) -> str:
+    """String form of ``value`` cut to ``limit`` characters."""
+    limit = limit or _max_field
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(共{len(text)}字符)"
+
+
+def summarize(mapping: Dict[str, Any], content_keys: Iterable[str] = CONTENT_KEYS) -> Dict[str, Any]:
+    """
+    Copy of a request/kwargs dict with large text fields replaced by their length.
+
+    Args:
+        mapping: Request fields
+        content_keys: Keys whose string values are replaced by ``<N字符>``
+
+    Returns:
+        Dictionary safe to log
+    """
+    keys = set(content_keys)
+    return {
+        key: f"<{len(value)}字符>" if key in keys and isinstance(value, str) else value
+        for key, value in mapping.items()
+    }
+
+
+def _format_value(value: Any) -> str:
+    text = truncate(value)
+    if not text or any(ch in text for ch in ' ="\n'):
+        text = '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return text
+
+
+def log_event(logger: logging.Logger, level: int, event: str,
+              exc_info: bool = False, **fields: Any) -> None:
+    """
+    Log a structured event if ``logger`` is enabled for ``level``.
+
+    Args:
+        logger: Target logger
+        level: Logging level, e.g. ``logging.INFO``
+        event: Event name, e.g. ``publish.start``
+        exc_info: Attach the current exception's traceback
+        **fields: Event fields; callables are evaluated only when the event is written
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    values = {key: value() if callable(value) else value for key, value in fields.items()}
+    message = ' '.join([event] + [f"{key}={_format_value(value)}" for key, value in values.items()])
+    logger.log(level, message, exc_info=exc_info, extra={'event': event, 'fields': values})
+
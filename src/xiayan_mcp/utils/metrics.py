@@ -0,0 +1,237 @@
+"""In-process metrics for the publish pipeline and WeChat API calls.
+
+Counters and histograms are plain dictionaries guarded by a lock, so
+recording a sample costs a dictionary update and is cheap enough for the
+hot path. ``render_prometheus`` produces the Prometheus text exposition
+format and ``snapshot`` a JSON-friendly summary.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 默认直方图分桶（秒），覆盖从毫秒级格式化到数十秒的图片上传
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        """Increase the counter for the given label values."""
+        key = tuple(str(value) for value in labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        """Current value for the given label values."""
+        return self._values.get(tuple(str(value) for value in labelvalues), 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in items]
+
+
+class Histogram:
+    """Histogram with fixed upper bounds and optional labels."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各分桶计数..., 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """Record one observation for the given label values."""
+        key = tuple(str(v) for v in labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, *labelvalues) -> int:
+        """Number of observations for the given label values."""
+        state = self._values.get(tuple(str(v) for v in labelvalues))
+        return int(state[-1]) if state else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], List[float]]]:
+        with self._lock:
+            return [(key, list(state)) for key, state in sorted(self._values.items())]
+
+    def collect(self) -> List[str]:
+        lines = []
+        for key, state in self._items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key, ('le', '+Inf'))
+            lines.append(f"{self.name}_bucket{labels} {_format_value(state[-1])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        result = []
+        for key, state in self._items():
+            count = int(state[-1])
+            result.append({
+                'labels': dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': round(state[-2], 6),
+                'avg': round(state[-2] / count, 6) if count else 0.0,
+            })
+        return result
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已存在: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Return ``{metric name: samples}`` for JSON output."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def reset(self) -> None:
+        """Clear all recorded samples (used by tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+FORMAT_SECONDS = REGISTRY.histogram(
+    'xiayan_format_duration_seconds', 'Markdown格式化耗时', ('method',))
+PUBLISH_STAGE_SECONDS = REGISTRY.histogram(
+    'xiayan_publish_stage_duration_seconds', '发布流程各阶段耗时', ('stage',))
+WECHAT_API_SECONDS = REGISTRY.histogram(
+    'xiayan_wechat_api_request_duration_seconds', '微信API请求耗时（到收到响应头）', ('endpoint',))
+WECHAT_API_REQUESTS = REGISTRY.counter(
+    'xiayan_wechat_api_requests_total', '微信API请求数', ('endpoint', 'status'))
+WECHAT_API_ERRORS = REGISTRY.counter(
+    'xiayan_wechat_api_errors_total', '微信API返回的错误码', ('errcode',))
+TOKEN_REFRESHES = REGISTRY.counter(
+    'xiayan_token_refreshes_total', '访问令牌刷新次数', ('api',))
+CACHE_LOOKUPS = REGISTRY.counter(
+    'xiayan_cache_lookups_total', '缓存查询次数', ('cache', 'result'))
+UPLOAD_BYTES = REGISTRY.counter(
+    'xiayan_upload_bytes_total', '上传到微信的字节数', ('kind',))
+MINIFY_BYTES = REGISTRY.counter(
+    'xiayan_html_minify_bytes_total', '草稿HTML压缩前后的字节数', ('stage',))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup."""
+    CACHE_LOOKUPS.inc(cache, 'hit' if hit else 'miss')
+
+
+def record_wechat_error(errcode, known_codes) -> None:
+    """Count a WeChat error code; codes outside ``known_codes`` share the ``other`` label."""
+    WECHAT_API_ERRORS.inc(errcode if errcode in known_codes else 'other')
+
+
+def cache_hit_rates() -> Dict[str, Dict]:
+    """Hit/miss counts and hit rate per cache."""
+    rates: Dict[str, Dict] = {}
+    for sample in CACHE_LOOKUPS.snapshot():
+        entry = rates.setdefault(sample['labels']['cache'], {'hit': 0, 'miss': 0})
+        entry[sample['labels']['result']] = int(sample['value'])
+    for entry in rates.values():
+        total = entry['hit'] + entry['miss']
+        entry['hit_rate'] = round(entry['hit'] / total, 4) if total else 0.0
+    return rates
+
+
+def render_prometheus() -> str:
+    """Render the default registry in the Prometheus text format."""
+    return REGISTRY.render_prometheus()
+
+
+def snapshot() -> Dict:
+    """JSON-friendly summary of the default registry, including cache hit rates."""
+    data = REGISTRY.snapshot()
+    data['cache_hit_rates'] = cache_hit_rates()
+    return data
@@ -0,0 +1,139 @@
+"""WeChat-safe HTML minification for draft payloads.
+
+Formatted articles are full HTML documents with indentation and a
+``<style>`` block, none of which survives in the WeChat editor; only the
+body and its inline styles matter. ``minify_html`` keeps the body,
+collapses whitespace outside ``<pre>``/``<textarea>`` and rewrites inline
+styles in their shortest equivalent form.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+from . import metrics
+
+# 设置XIAYAN_MINIFY_HTML=0可关闭压缩，便于排查样式问题
+MINIFY_HTML = os.getenv('XIAYAN_MINIFY_HTML', '1') != '0'
+
+_BODY_PATTERN = re.compile(r'<body\b[^>]*>(.*)</body\s*>', re.IGNORECASE | re.DOTALL)
+_DROPPED_PATTERN = re.compile(
+    r'<!--.*?-->|<(style|script|head|title)\b[^>]*>.*?</\1\s*>|<!DOCTYPE[^>]*>|</?(?:html|body|meta|link)\b[^>]*>',
+    re.IGNORECASE | re.DOTALL)
+_TOKEN_PATTERN = re.compile(r'(<[^>]*>)')
+_TAG_NAME_PATTERN = re.compile(r'<\s*(/?)\s*([a-zA-Z][a-zA-Z0-9]*)')
+_STYLE_ATTR_PATTERN = re.compile(r'\sstyle\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_ZERO_UNIT_PATTERN = re.compile(r'(?<![\w.#-])0(?:px|em|rem|pt|%)(?![\w%])')
+_HEX_COLOR_PATTERN = re.compile(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3(?![0-9a-fA-F])')
+
+# 内容保留原样空白的标签
+_PREFORMATTED_TAGS = {'pre', 'textarea'}
+
+# 块级标签前后的空白不影响显示，可以删除
+_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'ol', 'p',
+    'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+
+
+@lru_cache(maxsize=2048)
+def minify_style(style: str) -> str:
+    """
+    Shorten an inline style declaration list.
+
+    Removes whitespace, empty and duplicate declarations (keeping the one
+    that takes effect), and shortens ``0px`` to ``0`` and ``#ffffff`` to
+    ``#fff``.
+
+    Args:
+        style: Value of a ``style`` attribute
+
+    Returns:
+        Equivalent, shorter style value
+    """
+    if 'url(' in style.lower() or '/*' in style or '\\' in style:
+        # 值中可能包含分号，只压缩空白
+        return _WHITESPACE_PATTERN.sub(' ', style).strip().rstrip(';')
+
+    declarations = {}
+    for declaration in style.split(';'):
+        prop, sep, value = declaration.partition(':')
+        prop = prop.strip().lower()
+        value = _WHITESPACE_PATTERN.sub(' ', value).strip()
+        if not sep or not prop or not value:
+            continue
+        important = value.lower().endswith('!important')
+        previous = declarations.get(prop)
+        if previous is not None and previous[1] and not important:
+            # 前面的!important声明优先
+            continue
+        value = _ZERO_UNIT_PATTERN.sub('0', value)
+        value = _HEX_COLOR_PATTERN.sub(r'#\1\2\3', value)
+        # 重复的属性移到最后，保持与原顺序相同的层叠结果
+        declarations.pop(prop, None)
+        declarations[prop] = (value, important)
+
+    return ';'.join(f"{prop}:{value}" for prop, (value, _) in declarations.items())
+
+
+def _minify_tag(tag: str) -> str:
+    return _STYLE_ATTR_PATTERN.sub(
+        lambda m: f" style={m.group(1)}{minify_style(m.group(2))}{m.group(1)}", tag)
+
+
+def _tag_name(token: str):
+    """(name, closing) of a tag token, or (None, False) for text."""
+    match = _TAG_NAME_PATTERN.match(token)
+    if not match:
+        return None, False
+    return match.group(2).lower(), bool(match.group(1))
+
+
+def minify_html(html: str) -> str:
+    """
+    Minify formatted article HTML for the WeChat draft API.
+
+    Args:
+        html: Formatted HTML, either a full document or a fragment
+
+    Returns:
+        Minified body HTML
+    """
+    body = _BODY_PATTERN.search(html)
+    fragment = body.group(1) if body else html
+    fragment = _DROPPED_PATTERN.sub('', fragment)
+
+    tokens = _TOKEN_PATTERN.split(fragment)
+    names = [_tag_name(token)[0] if token.startswith('<') else None for token in tokens]
+    preformatted = 0
+    result = []
+    for i, token in enumerate(tokens):
+        if not token:
+            continue
+        if token.startswith('<'):
+            name, closing = _tag_name(token)
+            if name in _PREFORMATTED_TAGS:
+                preformatted += -1 if closing else 1
+            result.append(_minify_tag(token) if 'style' in token.lower() else token)
+            continue
+        if preformatted > 0:
+            result.append(token)
+            continue
+
+        text = _WHITESPACE_PATTERN.sub(' ', token)
+        # 紧邻块级标签的空白不会显示
+        if i > 0 and names[i - 1] in _BLOCK_TAGS:
+            text = text.lstrip(' ')
+        if i + 1 < len(tokens) and names[i + 1] in _BLOCK_TAGS:
+            text = text.rstrip(' ')
+        if text:
+            result.append(text)
+
+    minified = ''.join(result).strip()
+    if not minified and html.strip():
+        return html
+    metrics.MINIFY_BYTES.inc('input', amount=len(html.encode('utf-8')))
+    metrics.MINIFY_BYTES.inc('output', amount=len(minified.encode('utf-8')))
+    return minified
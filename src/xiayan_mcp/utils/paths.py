@@ -0,0 +1,19 @@
+"""Local data directory helpers for Xiayan MCP."""
+
+import os
+from pathlib import Path
+
+
+def get_data_dir() -> Path:
+    """
+    Get the directory used for local state (SQLite stores, caches).
+
+    The location can be overridden with the ``XIAYAN_DATA_DIR`` environment
+    variable and defaults to ``~/.xiayan-mcp``.
+
+    Returns:
+        Path to the data directory, created if missing
+    """
+    data_dir = Path(os.getenv('XIAYAN_DATA_DIR', '') or Path.home() / '.xiayan-mcp')
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
@@ -0,0 +1,293 @@
+"""On-demand profiling of a single tool call or HTTP request.
+
+Two modes are available:
+
+- ``cprofile``: deterministic profiling with cProfile. It only sees the
+  thread it runs on (the event loop), so work handed to the CPU pool shows
+  up as time spent awaiting it.
+- ``sample``: a background thread samples the stacks of all threads every
+  few milliseconds, so formatting in the CPU pool is included. Idle frames
+  (selector waits, idle pool workers) are skipped.
+
+Results are written to the ``profiles`` directory under the data directory
+(``XIAYAN_PROFILE_DIR`` overrides it) as a ``.prof`` file (readable with
+``pstats`` or snakeviz) or a ``.collapsed`` flame graph file (flamegraph.pl,
+speedscope), and summarised as the top functions.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .paths import get_data_dir
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+# Web后端通过该请求头开启单次请求的性能分析
+PROFILE_HEADER = 'X-Xiayan-Profile'
+
+DEFAULT_TOP = 20
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# 采样时忽略的空闲栈顶（文件名, 函数名）
+_IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('thread.py', '_worker'),
+    ('queue.py', 'get'),
+    ('_thread.py', 'run'),
+}
+
+# 同一时间只允许一个分析会话，cProfile无法嵌套启用
+_active_lock = threading.Lock()
+
+
+def resolve_mode(value: Any) -> Optional[str]:
+    """
+    Normalise a profile switch from a tool argument, header or env var.
+
+    Args:
+        value: ``None``/``False``/``""``/``"0"`` to disable, ``True``/``"1"`` for
+            cProfile, or a mode name
+
+    Returns:
+        Mode name or None
+
+    Raises:
+        ValueError: If the value is not a known mode
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return 'cprofile'
+    text = str(value).strip().lower()
+    if text in ('', '0', 'false', 'off', 'no'):
+        return None
+    if text in ('1', 'true', 'on', 'yes'):
+        return 'cprofile'
+    if text not in PROFILE_MODES:
+        raise ValueError(f"不支持的性能分析模式: {value}，可选: {', '.join(PROFILE_MODES)}")
+    return text
+
+
+def env_mode() -> Optional[str]:
+    """Profile mode configured with ``XIAYAN_PROFILE`` (applies to every call)."""
+    try:
+        return resolve_mode(os.getenv('XIAYAN_PROFILE'))
+    except ValueError:
+        return None
+
+
+def get_profile_dir() -> Path:
+    """Directory profile files are written to."""
+    directory = Path(os.getenv('XIAYAN_PROFILE_DIR', '') or get_data_dir() / 'profiles')
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _function_label(filename: str, lineno: int, name: str) -> str:
+    if filename == '~':
+        return name  # 内置函数，如 <built-in method time.sleep>
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+class _StackSampler:
+    """Periodically record the stacks of all other threads."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='xiayan-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+class Profiler:
+    """Profile one unit of work and summarise the result."""
+
+    def __init__(self, mode: str, name: str, top: int = DEFAULT_TOP,
+                 interval: float = DEFAULT_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的性能分析模式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.name = name
+        self.top = top
+        self.interval = interval
+        self.report: Dict[str, Any] = {}
+        self._profile = None
+        self._sampler: Optional[_StackSampler] = None
+        self._start = 0.0
+        self._owns_lock = False
+
+    def start(self) -> None:
+        self._owns_lock = _active_lock.acquire(blocking=False)
+        self._start = time.perf_counter()
+        if not self._owns_lock:
+            return
+        if self.mode == 'cprofile':
+            # 延迟导入，避免拖慢服务器启动
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = _StackSampler(self.interval)
+            self._sampler.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop profiling, write the profile file and return the report."""
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self.report = {'mode': self.mode, 'name': self.name, 'elapsed_ms': round(elapsed_ms, 1)}
+        if not self._owns_lock:
+            self.report['skipped'] = "已有其他性能分析正在进行"
+            return self.report
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self.report.update(self._cprofile_report())
+            else:
+                self._sampler.stop()
+                self.report.update(self._sample_report())
+        finally:
+            _active_lock.release()
+            self._owns_lock = False
+        return self.report
+
+    def _path(self, suffix: str) -> Path:
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.name).strip('_') or 'profile'
+        return get_profile_dir() / f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{self.mode}{suffix}"
+
+    def _cprofile_report(self) -> Dict[str, Any]:
+        import pstats
+
+        path = self._path('.prof')
+        self._profile.dump_stats(str(path))
+        stats = pstats.Stats(self._profile).stats
+        rows = [
+            {
+                'function': _function_label(*key),
+                'calls': nc,
+                'self_ms': round(tt * 1000, 3),
+                'total_ms': round(ct * 1000, 3),
+            }
+            for key, (cc, nc, tt, ct, callers) in stats.items()
+        ]
+        return {
+            'file': str(path),
+            'top_self': sorted(rows, key=lambda row: row['self_ms'], reverse=True)[:self.top],
+            'top_total': sorted(rows, key=lambda row: row['total_ms'], reverse=True)[:self.top],
+        }
+
+    def _sample_report(self) -> Dict[str, Any]:
+        path = self._path('.collapsed')
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        lines = []
+        for stack, count in self._sampler.stacks.items():
+            labels = [_function_label(*frame) for frame in stack]
+            lines.append(f"{';'.join(labels)} {count}")
+            self_counts[labels[-1]] += count
+            for label in set(labels):
+                total_counts[label] += count
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + ('\n' if lines else ''))
+
+        interval_ms = self.interval * 1000
+
+        def rows(counts: Counter) -> List[Dict[str, Any]]:
+            return [
+                {'function': label, 'samples': count, 'approx_ms': round(count * interval_ms, 1)}
+                for label, count in counts.most_common(self.top)
+            ]
+
+        return {
+            'file': str(path),
+            'samples': self._sampler.samples,
+            'interval_ms': interval_ms,
+            'top_self': rows(self_counts),
+            'top_total': rows(total_counts),
+        }
+
+
+@asynccontextmanager
+async def profile(mode: str, name: str, top: int = DEFAULT_TOP):
+    """
+    Profile the body of an ``async with`` block.
+
+    Args:
+        mode: ``cprofile`` or ``sample``
+        name: Label used in the profile file name
+        top: Number of functions in the summary
+
+    Yields:
+        The Profiler; its ``report`` is filled in when the block exits
+    """
+    profiler = Profiler(mode, name, top)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def _row_cost(row: Dict[str, Any], key: str) -> str:
+    if 'samples' in row:
+        return f"{row['approx_ms']:.1f}ms ({row['samples']} samples)"
+    return f"{row[key]:.1f}ms ({row['calls']} calls)"
+
+
+def format_summary(report: Dict[str, Any], limit: int = 15) -> str:
+    """Human readable summary of a profile report."""
+    if report.get('skipped'):
+        return f"性能分析已跳过: {report['skipped']}"
+    lines = [
+        f"性能分析（{report['mode']}）{report['name']}，耗时 {report['elapsed_ms']}ms",
+        f"分析文件: {report['file']}",
+        "",
+        "自身耗时最高的函数:",
+    ]
+    lines += [f"  {_row_cost(row, 'self_ms'):>28s}  {row['function']}" for row in report['top_self'][:limit]]
+    lines += ["", "累计耗时最高的函数:"]
+    lines += [f"  {_row_cost(row, 'total_ms'):>28s}  {row['function']}" for row in report['top_total'][:limit]]
+    return '\n'.join(lines)
+
+
+def format_header(report: Dict[str, Any], limit: int = 5) -> str:
+    """Compact one-line summary of the top self-time functions, for HTTP headers."""
+    if report.get('skipped'):
+        return 'skipped'
+    key = 'approx_ms' if report['mode'] == 'sample' else 'self_ms'
+    parts: List[Tuple[str, float]] = [(row['function'], row[key]) for row in report['top_self'][:limit]]
+    text = '; '.join(f"{function} {ms:.1f}ms" for function, ms in parts)
+    # 响应头只允许latin-1字符
+    return text.encode('latin-1', errors='replace').decode('latin-1')
@@ -0,0 +1,259 @@
+"""Lightweight tracing spans for the publish pipeline.
+
+Spans form parent/child trees through a context variable, so they follow
+the work across asyncio tasks and the CPU thread pool. Finished spans are
+written to a local file, either one JSON object per span (``jsonl``) or
+in the OTLP/JSON file format (``otlp``) understood by the OpenTelemetry
+collector's file receiver.
+
+Tracing is off by default and can be switched at runtime with
+``enable``/``disable``; while it is off, ``span`` returns a shared no-op
+object and records nothing. Set ``XIAYAN_TRACE_FILE`` (and optionally
+``XIAYAN_TRACE_FORMAT``) to enable it at startup.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMATS = ('jsonl', 'otlp')
+
+SERVICE_NAME = 'xiayan-mcp'
+
+# 缓冲的span数量达到该值，或根span结束时写入文件
+_FLUSH_THRESHOLD = 256
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar(
+    'xiayan_current_span', default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'start_ns', 'end_ns', 'error', '_start', '_token')
+
+    def __init__(self, name: str, parent: Optional['Span'] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish the span and hand it to the exporter."""
+        self.end_ns = self.start_ns + int((time.perf_counter() - self._start) * 1e9)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time_ns': self.start_ns,
+            'end_time_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned by ``span`` while tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,  # SPAN_KIND_INTERNAL
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in span.attributes.items()],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    return data
+
+
+class FileExporter:
+    """Buffer finished spans and append them to a file."""
+
+    def __init__(self, path: str, fmt: str = 'jsonl'):
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"不支持的追踪格式: {fmt}，可选: {', '.join(TRACE_FORMATS)}")
+        self.path = path
+        self.format = fmt
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            if span.parent_id is not None and len(self._buffer) < _FLUSH_THRESHOLD:
+                return
+            spans, self._buffer = self._buffer, []
+            self._write(spans)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            self._write(spans)
+
+    def _write(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        if self.format == 'otlp':
+            lines = [json.dumps({
+                'resourceSpans': [{
+                    'resource': {'attributes': [
+                        {'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+                    'scopeSpans': [{
+                        'scope': {'name': 'xiayan_mcp'},
+                        'spans': [_otlp_span(span) for span in spans],
+                    }],
+                }]
+            }, ensure_ascii=False)]
+        else:
+            lines = [json.dumps(span.to_dict(), ensure_ascii=False) for span in spans]
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            logger.warning(f"写入追踪文件失败: {e}")
+
+
+_exporter: Optional[FileExporter] = None
+
+
+def is_enabled() -> bool:
+    """Whether spans are currently being recorded."""
+    return _exporter is not None
+
+
+def enable(path: str, fmt: str = 'jsonl') -> None:
+    """Start recording spans to ``path`` in the given format."""
+    global _exporter
+    exporter = FileExporter(os.path.expanduser(path), fmt)
+    previous, _exporter = _exporter, exporter
+    if previous is not None:
+        previous.flush()
+    logger.info(f"已启用追踪，输出到 {exporter.path}（{fmt}）")
+
+
+def disable() -> None:
+    """Stop recording spans and flush buffered ones."""
+    global _exporter
+    previous, _exporter = _exporter, None
+    if previous is not None:
+        previous.flush()
+        logger.info("已关闭追踪")
+
+
+def flush() -> None:
+    """Write buffered spans to the trace file."""
+    exporter = _exporter
+    if exporter is not None:
+        exporter.flush()
+
+
+def status() -> Dict[str, Any]:
+    """Current tracing configuration."""
+    exporter = _exporter
+    if exporter is None:
+        return {'enabled': False}
+    return {'enabled': True, 'path': exporter.path, 'format': exporter.format}
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager recording a span as a child of the current span.
+
+    Args:
+        name: Span name, e.g. ``md.convert``
+        **attributes: Span attributes
+
+    Returns:
+        The span (or a no-op stand-in while tracing is disabled)
+    """
+    if _exporter is None:
+        return _NOOP_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def start_span(name: str, **attributes: Any):
+    """Start a span that is ended explicitly with ``end()`` and does not become the current span."""
+    if _exporter is None:
+        return _NOOP_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def _configure_from_env() -> None:
+    path = os.getenv('XIAYAN_TRACE_FILE')
+    if path:
+        try:
+            enable(path, os.getenv('XIAYAN_TRACE_FORMAT', 'jsonl'))
+        except ValueError as e:
+            logger.warning(f"追踪配置无效: {e}")
+
+
+_configure_from_env()
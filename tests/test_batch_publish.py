@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for PublishPipeline batch publishing
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.pipeline import PUBLISH_STAGES, PublishPipeline
+from xiayan_mcp.core.publisher import WeChatPublisher
+
+
+class OfflinePublisher(WeChatPublisher):
+    """WeChatPublisher with all network calls replaced by in-memory fakes."""
+
+    def __init__(self, fail_titles=()):
+        super().__init__()
+        self.fail_titles = set(fail_titles)
+        self.drafts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def upload_image_for_news(self, image_path):
+        return "https://mmbiz.qpic.cn/inline"
+
+    async def upload_permanent_material(self, media_path, media_type='image', description=None):
+        return "thumb"
+
+    async def _create_default_cover(self):
+        return "default-thumb"
+
+    async def _post_draft(self, articles):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if articles[0]["title"] in self.fail_titles:
+                raise Exception("发布失败: 模拟错误")
+            self.drafts.append(articles)
+            return f"draft-{len(self.drafts)}"
+        finally:
+            self.in_flight -= 1
+
+
+def test_batch_continues_past_failures():
+    """Test per-item reports in input order with one failing item"""
+    publisher = OfflinePublisher(fail_titles={"第二篇"})
+    pipeline = PublishPipeline(MarkdownFormatter(), publisher)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.md', encoding='utf-8', delete=False) as f:
+        f.write("# 文件文章\n\n正文")
+        file_path = f.name
+
+    try:
+        items = [
+            {"content": "# 第一篇\n\n正文一"},
+            {"content": "# 第二篇\n\n正文二"},
+            {"file_path": file_path},
+            {"content": ""},
+        ]
+        reports = asyncio.run(pipeline.run_batch(items, concurrency=2))
+    finally:
+        os.remove(file_path)
+
+    assert [r["index"] for r in reports] == [0, 1, 2, 3]
+    assert [r["status"] for r in reports] == ["success", "error", "success", "error"]
+    assert reports[0]["title"] == "第一篇"
+    assert "模拟错误" in reports[1]["error"]
+    assert reports[2]["title"] == "文件文章"
+    assert reports[2]["source"] == file_path
+    assert len(publisher.drafts) == 2
+
+    print("✅ test_batch_continues_past_failures passed")
+
+
+def test_concurrency_cap():
+    """Test that no more than concurrency items upload at once"""
+    publisher = OfflinePublisher()
+    pipeline = PublishPipeline(MarkdownFormatter(), publisher)
+    items = [{"content": f"# 文章{i}\n\n正文"} for i in range(8)]
+
+    reports = asyncio.run(pipeline.run_batch(items, concurrency=3))
+
+    assert all(r["status"] == "success" for r in reports)
+    assert publisher.max_in_flight <= 3
+
+    print("✅ test_concurrency_cap passed")
+
+
+def test_stage_events():
+    """Test that a single run reports every stage"""
+    publisher = OfflinePublisher()
+    pipeline = PublishPipeline(MarkdownFormatter(), publisher)
+    events = []
+
+    async def on_stage(event):
+        events.append(event)
+
+    result = asyncio.run(pipeline.run("# 标题\n\n正文", on_stage=on_stage))
+
+    assert result["media_id"] == "draft-1"
+    finished = {e["stage"] for e in events if e["status"] == "finished"}
+    assert finished == set(PUBLISH_STAGES)
+    assert all("elapsed_ms" in e for e in events if e["status"] == "finished")
+
+    print("✅ test_stage_events passed")
+
+
+def run_all_tests():
+    """Run all batch publish tests"""
+    print("Running PublishPipeline tests...")
+
+    test_batch_continues_past_failures()
+    test_concurrency_cap()
+    test_stage_events()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
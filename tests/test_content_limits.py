@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the WeChat content size checks and article splitting
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core import content_limits
+from xiayan_mcp.core.content_limits import ContentTooLargeError
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.pipeline import PublishPipeline, format_article
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.themes import ThemeManager
+
+
+class OfflinePublisher(WeChatPublisher):
+    """WeChatPublisher with all network calls replaced by in-memory fakes."""
+
+    def __init__(self):
+        super().__init__()
+        self.drafts = []
+        self.covers = 0
+
+    async def upload_image_for_news(self, image_path):
+        return "https://mmbiz.qpic.cn/inline"
+
+    async def _create_default_cover(self):
+        self.covers += 1
+        return "default-thumb"
+
+    async def _post_draft(self, articles):
+        self.drafts.append(articles)
+        return f"draft-{len(self.drafts)}"
+
+
+def _formatter():
+    return MarkdownFormatter(ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-')))
+
+
+def _long_article(sections=4, paragraphs=5):
+    lines = ["# 长文章", ""]
+    for i in range(1, sections + 1):
+        lines += [f"## 第{i}章", ""]
+        lines += [f"第{i}章第{j}段，" + "内容" * 40 for j in range(1, paragraphs + 1)]
+        lines.append("")
+    return "\n\n".join(lines)
+
+
+class _Limits:
+    """Temporarily lower the content limits."""
+
+    def __init__(self, max_bytes, max_chars):
+        self.limits = (max_bytes, max_chars)
+
+    def __enter__(self):
+        self.saved = (content_limits.MAX_CONTENT_BYTES, content_limits.MAX_CONTENT_CHARS)
+        content_limits.MAX_CONTENT_BYTES, content_limits.MAX_CONTENT_CHARS = self.limits
+
+    def __exit__(self, *exc):
+        content_limits.MAX_CONTENT_BYTES, content_limits.MAX_CONTENT_CHARS = self.saved
+        return False
+
+
+def test_format_reports_stats():
+    """Test that formatting measures bytes, visible characters and images"""
+    formatted = _formatter().format("# 标题\n\n你好  世界\n\n![图](https://example.com/a.png)\n")
+    stats = formatted["stats"]
+
+    assert stats.html_bytes == len(formatted["content"].encode('utf-8'))
+    assert stats.text_chars == len("标题 你好 世界")
+    assert stats.image_count == 1
+    assert stats.violations() == []
+    assert stats.violations(max_chars=3) == [f"正文{stats.text_chars}字，超过3字"]
+
+    print("✅ test_format_reports_stats passed")
+
+
+def test_oversized_article_rejected():
+    """Test that oversized articles are rejected before anything is uploaded"""
+    publisher = OfflinePublisher()
+    pipeline = PublishPipeline(_formatter(), publisher)
+
+    with _Limits(10 ** 6, 1000):
+        try:
+            asyncio.run(pipeline.run(_long_article()))
+            assert False, "oversized article should be rejected"
+        except ContentTooLargeError as e:
+            assert "超过1000字" in str(e)
+    assert publisher.drafts == [] and publisher.covers == 0
+
+    print("✅ test_oversized_article_rejected passed")
+
+
+def test_split_at_headings():
+    """Test that oversized articles are split at headings into a series"""
+    formatter = _formatter()
+
+    with _Limits(10 ** 6, 500):
+        prepared = format_article(formatter, _long_article(), oversize="split")
+    parts = prepared["parts"]
+
+    assert [part["title"] for part in parts] == ["长文章（1/4）", "长文章（2/4）", "长文章（3/4）", "长文章（4/4）"]
+    for part in parts:
+        assert part["stats"].text_chars <= 500
+        assert part["content"].count("<h2") == 1
+        assert part["content"].startswith('<div class="article-content">')
+    assert "<h1" in parts[0]["content"] and "第4章第5段" in parts[3]["content"]
+
+    # 单个章节超出限制时在段落之间拆分
+    with _Limits(10 ** 6, 200):
+        parts = format_article(formatter, _long_article(sections=1), oversize="split")["parts"]
+    assert len(parts) > 1 and all(part["stats"].text_chars <= 200 for part in parts)
+
+    # 单个段落超出限制时无法拆分
+    with _Limits(10 ** 6, 50):
+        try:
+            format_article(formatter, _long_article(sections=1), oversize="split")
+            assert False, "paragraph over the limit should not be split"
+        except ContentTooLargeError as e:
+            assert "无法拆分" in str(e)
+
+    print("✅ test_split_at_headings passed")
+
+
+def test_split_series_published_as_one_draft():
+    """Test that a split article is published as one multi-article draft with a shared cover"""
+    publisher = OfflinePublisher()
+    pipeline = PublishPipeline(_formatter(), publisher)
+
+    with _Limits(10 ** 6, 500):
+        result = asyncio.run(pipeline.run(_long_article(), oversize="split"))
+
+    assert result["media_id"] == "draft-1"
+    assert result["parts"] == ["长文章（1/4）", "长文章（2/4）", "长文章（3/4）", "长文章（4/4）"]
+    assert len(publisher.drafts) == 1 and len(publisher.drafts[0]) == 4
+    assert {article["thumb_media_id"] for article in publisher.drafts[0]} == {"default-thumb"}
+    assert publisher.covers == 1
+
+    print("✅ test_split_series_published_as_one_draft passed")
+
+
+def run_all_tests():
+    """Run all content limit tests"""
+    print("Running content limit tests...")
+
+    test_format_reports_stats()
+    test_oversized_article_rejected()
+    test_split_at_headings()
+    test_split_series_published_as_one_draft()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
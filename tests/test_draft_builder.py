@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for MultiArticleDraftBuilder (multi-article drafts)
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.draft_builder import MultiArticleDraftBuilder
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.publisher import WeChatPublisher
+
+
+class OfflinePublisher(WeChatPublisher):
+    """WeChatPublisher with all network calls replaced by in-memory fakes."""
+
+    def __init__(self):
+        super().__init__()
+        self.drafts = []
+        self.uploaded_images = []
+        self.uploaded_covers = []
+        self.default_covers = 0
+
+    async def upload_image_for_news(self, image_path):
+        self.uploaded_images.append(image_path)
+        return f"https://mmbiz.qpic.cn/{len(self.uploaded_images)}"
+
+    async def upload_permanent_material(self, media_path, media_type='image', description=None):
+        self.uploaded_covers.append(media_path)
+        return f"thumb-{len(self.uploaded_covers)}"
+
+    async def _create_default_cover(self):
+        self.default_covers += 1
+        return "default-thumb"
+
+    async def _post_draft(self, articles):
+        self.drafts.append(articles)
+        return f"draft-{len(self.drafts)}"
+
+
+def test_build_multi_article_draft():
+    """Test that several documents become one draft/add call"""
+    publisher = OfflinePublisher()
+    builder = MultiArticleDraftBuilder(MarkdownFormatter(), publisher)
+    documents = [
+        {"content": "---\ntitle: 第一篇\n---\n\n正文一\n\n![图](http://example.com/a.png)"},
+        {"content": "# 第二篇\n\n正文二", "author": "作者二"},
+        {"content": "---\ntitle: 第三篇\n---\n\n正文三"},
+    ]
+
+    result = asyncio.run(builder.build(documents, theme_id="lapis"))
+
+    assert result["media_id"] == "draft-1"
+    assert len(publisher.drafts) == 1
+    articles = publisher.drafts[0]
+    assert [a["title"] for a in articles] == ["第一篇", "第二篇", "第三篇"]
+    assert articles[1]["author"] == "作者二"
+    assert "https://mmbiz.qpic.cn/1" in articles[0]["content"]
+    assert publisher.uploaded_images == ["http://example.com/a.png"]
+    assert publisher.uploaded_covers == ["http://example.com/a.png"]
+    # 没有图片的文章共用同一个默认封面
+    assert publisher.default_covers == 1
+    assert [a["thumb_media_id"] for a in articles] == ["thumb-1", "default-thumb", "default-thumb"]
+
+    print("✅ test_build_multi_article_draft passed")
+
+
+def test_article_limit():
+    """Test that more than 8 articles are rejected before any upload"""
+    publisher = OfflinePublisher()
+    builder = MultiArticleDraftBuilder(MarkdownFormatter(), publisher)
+
+    try:
+        asyncio.run(builder.build([{"content": "# 标题"}] * 9))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert publisher.drafts == []
+
+    print("✅ test_article_limit passed")
+
+
+def run_all_tests():
+    """Run all draft builder tests"""
+    print("Running MultiArticleDraftBuilder tests...")
+
+    test_build_multi_article_draft()
+    test_article_limit()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the fake WeChat API (offline end-to-end publishing)
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.testing.fake_wechat import FakeWeChatServer
+
+
+def _publisher(fake):
+    """WeChatPublisher pointed at the fake API."""
+    publisher = WeChatPublisher()
+    publisher.base_url = fake.base_url
+    publisher.app_id = fake.app_id
+    publisher.app_secret = fake.app_secret
+    return publisher
+
+
+def test_publish_end_to_end():
+    """Test publishing a draft with a default cover against the fake API"""
+    async def scenario():
+        async with FakeWeChatServer() as fake:
+            publisher = _publisher(fake)
+            try:
+                result = await publisher.publish_to_draft("标题", "<p>正文</p>")
+                drafts = await publisher.get_draft_list()
+                materials = await publisher.get_media_list('image', permanent=True)
+            finally:
+                await publisher.close()
+            return fake.stats(), result, drafts, materials
+
+    stats, result, drafts, materials = asyncio.run(scenario())
+
+    assert result["status"] == "success"
+    assert drafts["total_count"] == 1
+    assert drafts["item"][0]["media_id"] == result["media_id"]
+    assert drafts["item"][0]["content"]["news_item"][0]["title"] == "标题"
+    assert materials["item"][0]["media_id"] == result["cover_media_id"]
+    assert stats["calls"]["/token"] == 1
+
+    print("✅ test_publish_end_to_end passed")
+
+
+def test_error_injection():
+    """Test injected error codes surface as publisher errors"""
+    async def scenario():
+        async with FakeWeChatServer() as fake:
+            publisher = _publisher(fake)
+            errors = []
+            try:
+                for errcode in (45009, -1):
+                    fake.inject_error(errcode, endpoint='/draft/add')
+                    try:
+                        await publisher.publish_to_draft("标题", "<p>正文</p>")
+                    except Exception as e:
+                        errors.append(str(e))
+                # 注入的错误用完后恢复正常
+                await publisher.publish_to_draft("标题", "<p>正文</p>")
+                drafts = await publisher.get_draft_list()
+            finally:
+                await publisher.close()
+            return errors, drafts
+
+    errors, drafts = asyncio.run(scenario())
+
+    assert len(errors) == 2
+    assert "45009" in errors[0]
+    assert "-1" in errors[1]
+    assert drafts["total_count"] == 1
+
+    print("✅ test_error_injection passed")
+
+
+def test_quota_and_invalid_token():
+    """Test daily quota accounting and token invalidation (40001)"""
+    async def scenario():
+        async with FakeWeChatServer(quotas={'/draft/add': 2}) as fake:
+            publisher = _publisher(fake)
+            try:
+                await publisher.publish_to_draft("标题", "<p>正文</p>")
+                await publisher.publish_to_draft("标题", "<p>正文</p>")
+                try:
+                    await publisher.publish_to_draft("标题", "<p>正文</p>")
+                    quota_error = None
+                except Exception as e:
+                    quota_error = str(e)
+
+                fake.reset_quota()
+                fake.tokens.clear()
+                try:
+                    await publisher.publish_to_draft("标题", "<p>正文</p>")
+                    token_error = None
+                except Exception as e:
+                    token_error = str(e)
+            finally:
+                await publisher.close()
+            return fake.stats(), quota_error, token_error
+
+    stats, quota_error, token_error = asyncio.run(scenario())
+
+    assert quota_error and "45009" in quota_error
+    assert token_error and "40001" in token_error
+    assert stats["quotas"]["/draft/add"] == {"limit": 2, "used": 1}
+
+    print("✅ test_quota_and_invalid_token passed")
+
+
+def run_all_tests():
+    """Run all fake WeChat API tests"""
+    print("Running fake WeChat API tests...")
+
+    test_publish_end_to_end()
+    test_error_injection()
+    test_quota_and_invalid_token()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the precompiled element styles of the formatter
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bs4 import BeautifulSoup
+
+from xiayan_mcp.core.formatter import MarkdownFormatter, merge_style, parse_style
+from xiayan_mcp.themes import ThemeManager
+
+
+def _formatter():
+    return MarkdownFormatter(ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-')))
+
+
+def test_merge_style():
+    """Test parsing and merging of style attributes"""
+    assert parse_style('color: red; margin:0;;bad') == (('color', 'red'), ('margin', '0'))
+    assert merge_style('color: red; margin: 0', 'margin: 1em; padding: 2px') == \
+        'color: red; margin: 1em; padding: 2px'
+
+    parse_style.cache_clear()
+    for _ in range(3):
+        merge_style('color: blue', 'margin: 1em')
+    assert parse_style.cache_info().misses <= 2
+
+    print("✅ test_merge_style passed")
+
+
+def test_enhanced_styles():
+    """Test that tags get the precompiled style, merged with any existing style"""
+    formatter = _formatter()
+    soup = BeautifulSoup('<h2>标题</h2><p>一</p><p style="color: red; text-indent: 0">二</p><span>三</span>',
+                         'html.parser')
+    formatter._apply_enhanced_styles(soup)
+
+    paragraphs = soup.find_all('p')
+    assert soup.h2['style'] == formatter.compiled_element_styles['h2']
+    assert paragraphs[0]['style'] == 'margin-bottom: 1.2em; line-height: 1.8; text-indent: 2em'
+    assert paragraphs[1]['style'] == 'color: red; text-indent: 2em; margin-bottom: 1.2em; line-height: 1.8'
+    assert 'style' not in soup.span.attrs
+
+    print("✅ test_enhanced_styles passed")
+
+
+def test_images_and_code_are_styled():
+    """Test that articles with images and code blocks are wrapped with string styles"""
+    formatter = _formatter()
+    content = "# 标题\n\n![图片](https://example.com/a.png)\n\n```python\nprint('hi')\n```\n"
+    html_content = formatter.format(content)['content']
+
+    assert '<!DOCTYPE html>' in html_content
+    assert f'style="{formatter.compiled_element_styles["img"]}"' in html_content
+    assert "{'" not in html_content
+
+    print("✅ test_images_and_code_are_styled passed")
+
+
+def run_all_tests():
+    """Run all formatter style tests"""
+    print("Running formatter style tests...")
+
+    test_merge_style()
+    test_enhanced_styles()
+    test_images_and_code_are_styled()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
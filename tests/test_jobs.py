@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for JobManager (background publish jobs)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.jobs import JobManager
+from xiayan_mcp.core.pipeline import PUBLISH_STAGES, PublishPipeline
+from xiayan_mcp.core.publisher import WeChatPublisher
+
+
+class OfflinePublisher(WeChatPublisher):
+    """WeChatPublisher with all network calls replaced by in-memory fakes."""
+
+    def __init__(self, draft_delay=0.0):
+        super().__init__()
+        self.draft_delay = draft_delay
+        self.drafts = []
+
+    async def upload_image_for_news(self, image_path):
+        return "https://mmbiz.qpic.cn/inline"
+
+    async def upload_permanent_material(self, media_path, media_type='image', description=None):
+        return "thumb"
+
+    async def _create_default_cover(self):
+        return "default-thumb"
+
+    async def _post_draft(self, articles):
+        await asyncio.sleep(self.draft_delay)
+        self.drafts.append(articles)
+        return f"draft-{len(self.drafts)}"
+
+
+def _manager(db_path, publisher):
+    return JobManager(PublishPipeline(MarkdownFormatter(), publisher), db_path=db_path)
+
+
+def test_job_lifecycle():
+    """Test that a submitted job runs through all stages"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _manager(os.path.join(tmp, 'jobs.db'), OfflinePublisher())
+
+        async def scenario():
+            job_id = await manager.submit({"content": "# 标题\n\n正文"})
+            job = await manager.wait(job_id)
+            await manager.close()
+            return job
+
+        job = asyncio.run(scenario())
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["media_id"] == "draft-1"
+    assert set(job["stages"]) == set(PUBLISH_STAGES)
+    assert all(stage["status"] == "done" for stage in job["stages"].values())
+
+    print("✅ test_job_lifecycle passed")
+
+
+def test_cancel_running_job():
+    """Test that a running job can be cancelled"""
+    with tempfile.TemporaryDirectory() as tmp:
+        publisher = OfflinePublisher(draft_delay=5)
+        manager = _manager(os.path.join(tmp, 'jobs.db'), publisher)
+
+        async def scenario():
+            job_id = await manager.submit({"content": "# 标题\n\n正文"})
+            while manager.get(job_id)["stages"]["draft"]["status"] != "running":
+                await asyncio.sleep(0.01)
+            assert await manager.cancel(job_id)
+            job = await manager.wait(job_id)
+            # 已结束的任务不能再取消
+            assert not await manager.cancel(job_id)
+            await manager.close()
+            return job
+
+        job = asyncio.run(scenario())
+
+    assert job["status"] == "cancelled"
+    assert publisher.drafts == []
+
+    print("✅ test_cancel_running_job passed")
+
+
+def test_requeue_after_restart():
+    """Test that unfinished jobs are executed again after a restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'jobs.db')
+
+        async def first_run():
+            manager = _manager(db_path, OfflinePublisher(draft_delay=5))
+            job_id = await manager.submit({"content": "# 标题\n\n正文"})
+            while manager.get(job_id)["status"] != "running":
+                await asyncio.sleep(0.01)
+            await manager.close()
+            return job_id
+
+        async def second_run(job_id):
+            manager = _manager(db_path, OfflinePublisher())
+            requeued = await manager.start()
+            job = await manager.wait(job_id)
+            await manager.close()
+            return requeued, job
+
+        job_id = asyncio.run(first_run())
+        requeued, job = asyncio.run(second_run(job_id))
+
+    assert requeued == 1
+    assert job["status"] == "succeeded"
+
+    print("✅ test_requeue_after_restart passed")
+
+
+def run_all_tests():
+    """Run all job manager tests"""
+    print("Running JobManager tests...")
+
+    test_job_lifecycle()
+    test_cancel_running_job()
+    test_requeue_after_restart()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
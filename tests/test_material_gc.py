@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for MaterialGC (orphaned/duplicate permanent material collector)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.material_gc import MaterialGC
+from xiayan_mcp.core.material_store import MaterialStore
+
+OLD = 1000
+
+
+class FakePublisher:
+    """Minimal stand-in for WeChatPublisher with drafts and published articles."""
+
+    def __init__(self):
+        self.images = [
+            # 被草稿用作封面
+            {'media_id': 'cover1', 'name': 'cover1.jpg', 'update_time': OLD + 1, 'url': 'http://mmbiz/a'},
+            # 与cover1内容相同的重复封面
+            {'media_id': 'cover1_copy', 'name': 'cover1.jpg', 'update_time': OLD + 2, 'url': 'http://mmbiz/a'},
+            # 在已发布文章正文中使用
+            {'media_id': 'inline', 'name': 'inline.png', 'update_time': OLD + 3, 'url': 'http://mmbiz/b'},
+            # 未被引用
+            {'media_id': 'orphan', 'name': 'orphan.jpg', 'update_time': OLD + 4, 'url': 'http://mmbiz/c'},
+        ]
+        self.deleted = []
+
+    async def get_media_list(self, media_type, permanent=False, offset=0, count=20):
+        items = self.images if media_type == 'image' else []
+        return {'total_count': len(items), 'item_count': len(items), 'item': items[offset:offset + count]}
+
+    async def _download_media(self, url):
+        return url.encode('utf-8'), 'media.jpg'
+
+    async def get_draft_list(self, offset=0, count=20, no_content=0):
+        news = [{'title': '草稿', 'thumb_media_id': 'cover1', 'content': '<p>正文</p>'}]
+        return {'total_count': 1, 'item': [{'media_id': 'draft1', 'content': {'news_item': news}}]}
+
+    async def get_published_list(self, offset=0, count=20, no_content=0):
+        news = [{'title': '已发布', 'content': '<p><img src="http://mmbiz/b"></p>'}]
+        return {'total_count': 1, 'item': [{'article_id': 'a1', 'content': {'news_item': news}}]}
+
+    async def delete_permanent_material(self, media_id):
+        self.deleted.append(media_id)
+        return True
+
+
+def _make_gc():
+    publisher = FakePublisher()
+    store = MaterialStore(publisher, db_path=os.path.join(tempfile.mkdtemp(), 'materials.db'))
+    return publisher, store, MaterialGC(publisher, store)
+
+
+def test_report_and_dry_run():
+    """Test that report/dry_run modes find candidates without deleting"""
+    publisher, store, gc = _make_gc()
+
+    report = asyncio.run(gc.run(mode='report'))
+    assert report['total_materials'] == 4
+    assert report['referenced'] == 2
+    assert report['duplicate_groups'] == 1
+    assert 'candidates' not in report
+
+    report = asyncio.run(gc.run(mode='dry_run'))
+    reasons = {c['media_id']: c['reason'] for c in report['candidates']}
+    assert reasons == {'cover1_copy': 'duplicate', 'orphan': 'orphan'}
+    assert publisher.deleted == []
+
+    print("✅ test_report_and_dry_run passed")
+
+
+def test_duplicates_only_and_age_guard():
+    """Test duplicate-only collection and the minimum age guard"""
+    _, _, gc = _make_gc()
+
+    report = asyncio.run(gc.run(mode='dry_run', include_orphans=False))
+    assert [c['media_id'] for c in report['candidates']] == ['cover1_copy']
+
+    report = asyncio.run(gc.run(mode='dry_run', min_age_days=1e6))
+    assert report['candidate_count'] == 0
+
+    print("✅ test_duplicates_only_and_age_guard passed")
+
+
+def test_delete():
+    """Test deletion with rate limiting and mirror cleanup"""
+    publisher, store, gc = _make_gc()
+
+    report = asyncio.run(gc.run(mode='delete', rate_per_second=100, max_deletions=5))
+    assert sorted(report['deleted']) == ['cover1_copy', 'orphan']
+    assert report['failed'] == []
+    assert sorted(publisher.deleted) == ['cover1_copy', 'orphan']
+    remaining = {m['media_id'] for m in store.all_materials('image')}
+    assert remaining == {'cover1', 'inline'}
+
+    print("✅ test_delete passed")
+
+
+def run_all_tests():
+    """Run all material GC tests"""
+    print("Running MaterialGC tests...")
+
+    test_report_and_dry_run()
+    test_duplicates_only_and_age_guard()
+    test_delete()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for MaterialStore (local permanent material mirror)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.material_store import MaterialStore
+
+
+class FakePublisher:
+    """Minimal stand-in for WeChatPublisher serving an in-memory material list."""
+
+    def __init__(self, images):
+        self.images = images
+        self.page_requests = 0
+        self.downloads = 0
+
+    async def get_media_list(self, media_type, permanent=False, offset=0, count=20):
+        self.page_requests += 1
+        items = self.images if media_type == 'image' else []
+        return {
+            'total_count': len(items),
+            'item_count': len(items[offset:offset + count]),
+            'item': items[offset:offset + count],
+        }
+
+    async def _download_media(self, url):
+        self.downloads += 1
+        return url.encode('utf-8'), 'media.jpg'
+
+
+def _make_images(count):
+    return [
+        {
+            'media_id': f'mid{i}',
+            'name': f'封面图片{i}.jpg',
+            'update_time': 1000 + i,
+            'url': f'http://mmbiz.example/{i % 5}',
+        }
+        for i in range(count)
+    ]
+
+
+def _make_store(publisher):
+    db_path = os.path.join(tempfile.mkdtemp(), 'materials.db')
+    return MaterialStore(publisher, db_path=db_path)
+
+
+def test_sync_and_list():
+    """Test full sync across several pages and local listing"""
+    publisher = FakePublisher(_make_images(45))
+    store = _make_store(publisher)
+
+    stats = asyncio.run(store.sync(['image']))
+    assert stats['image'] == {'total': 45, 'added': 45, 'updated': 0, 'removed': 0}
+    assert publisher.page_requests == 3
+    assert store.is_synced('image')
+
+    page = store.list_materials('image', offset=0, count=20)
+    assert page['total_count'] == 45
+    assert page['item_count'] == 20
+    assert page['item'][0]['media_id'] == 'mid44'
+
+    print("✅ test_sync_and_list passed")
+
+
+def test_incremental_sync():
+    """Test that unchanged materials are not re-hashed and removals are detected"""
+    images = _make_images(10)
+    publisher = FakePublisher(images)
+    store = _make_store(publisher)
+    asyncio.run(store.sync(['image']))
+    assert publisher.downloads == 10
+
+    images[0]['update_time'] = 5000
+    del images[9]
+    stats = asyncio.run(store.sync(['image']))
+    assert stats['image'] == {'total': 9, 'added': 0, 'updated': 1, 'removed': 1}
+    assert publisher.downloads == 11
+
+    print("✅ test_incremental_sync passed")
+
+
+def test_search_and_hash():
+    """Test full-text search and content hash lookup"""
+    store = _make_store(FakePublisher(_make_images(10)))
+    asyncio.run(store.sync(['image']))
+
+    names = {item['name'] for item in store.search('封面图片3')}
+    assert names == {'封面图片3.jpg'}
+    assert len(store.search('封面')) == 10
+    assert store.search('不存在的素材') == []
+
+    content_hash = store.search('封面图片0')[0]['content_hash']
+    duplicates = {item['media_id'] for item in store.find_by_hash(content_hash)}
+    assert duplicates == {'mid0', 'mid5'}
+
+    store.remove('mid0')
+    assert store.search('封面图片0') == []
+
+    print("✅ test_search_and_hash passed")
+
+
+def run_all_tests():
+    """Run all material store tests"""
+    print("Running MaterialStore tests...")
+
+    test_sync_and_list()
+    test_incremental_sync()
+    test_search_and_hash()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
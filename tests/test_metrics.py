@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process metrics (counters, histograms, Prometheus output)
+"""
+
+import asyncio
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.testing.fake_wechat import FakeWeChatServer
+from xiayan_mcp.utils import metrics
+from xiayan_mcp.utils.metrics import MetricsRegistry
+
+
+def test_prometheus_rendering():
+    """Test counter and histogram text exposition"""
+    registry = MetricsRegistry()
+    counter = registry.counter('demo_total', 'Demo counter', ('kind',))
+    histogram = registry.histogram('demo_seconds', 'Demo histogram', ('op',), buckets=(0.1, 1.0))
+
+    counter.inc('a')
+    counter.inc('a', amount=2)
+    histogram.observe(0.05, 'x')
+    histogram.observe(0.5, 'x')
+    histogram.observe(5, 'x')
+
+    text = registry.render_prometheus()
+    assert '# TYPE demo_total counter' in text
+    assert 'demo_total{kind="a"} 3' in text
+    assert 'demo_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{op="x",le="1"} 2' in text
+    assert 'demo_seconds_bucket{op="x",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{op="x"} 3' in text
+    assert 'demo_seconds_sum{op="x"} 5.55' in text
+
+    print("✅ test_prometheus_rendering passed")
+
+
+def test_publish_metrics():
+    """Test that publishing against the fake API records API, token, error and upload metrics"""
+    metrics.REGISTRY.reset()
+
+    async def scenario():
+        async with FakeWeChatServer() as fake:
+            publisher = WeChatPublisher()
+            publisher.base_url = fake.base_url
+            publisher.app_id = fake.app_id
+            publisher.app_secret = fake.app_secret
+            try:
+                await publisher.publish_to_draft("标题", "<p>正文</p>")
+                await publisher.publish_to_draft("标题", "<p>正文</p>")
+                fake.inject_error(45009, endpoint='/draft/add')
+                try:
+                    await publisher.publish_to_draft("标题", "<p>正文</p>")
+                except Exception:
+                    pass
+            finally:
+                await publisher.close()
+
+    asyncio.run(scenario())
+
+    assert metrics.WECHAT_API_SECONDS.count('draft/add') == 3
+    assert metrics.WECHAT_API_REQUESTS.value('token', 200) == 1
+    assert metrics.TOKEN_REFRESHES.value('token') == 1
+    assert metrics.WECHAT_API_ERRORS.value(45009) == 1
+    assert metrics.UPLOAD_BYTES.value('thumb') > 0
+
+    rates = metrics.cache_hit_rates()
+    assert rates['access_token']['miss'] == 1
+    assert rates['access_token']['hit'] >= 2
+    assert rates['default_cover'] == {'hit': 2, 'miss': 1, 'hit_rate': 0.6667}
+
+    text = metrics.render_prometheus()
+    assert 'xiayan_wechat_api_request_duration_seconds_count{endpoint="draft/add"} 3' in text
+    assert 'access_token=' not in text
+
+    print("✅ test_publish_metrics passed")
+
+
+def test_unknown_error_code():
+    """Test that error codes outside WECHAT_ERROR_CODES share one label"""
+    metrics.REGISTRY.reset()
+    publisher = WeChatPublisher()
+    try:
+        publisher._handle_wechat_api_error({'errcode': 987654321, 'errmsg': 'x'}, "测试")
+    except Exception:
+        pass
+
+    assert metrics.WECHAT_API_ERRORS.value('other') == 1
+
+    print("✅ test_unknown_error_code passed")
+
+
+def run_all_tests():
+    """Run all metrics tests"""
+    print("Running metrics tests...")
+
+    test_prometheus_rendering()
+    test_publish_metrics()
+    test_unknown_error_code()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the WeChat HTML minifier
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bs4 import BeautifulSoup
+
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.pipeline import format_article
+from xiayan_mcp.themes import ThemeManager
+from xiayan_mcp.utils.minify import minify_html, minify_style
+
+
+def test_minify_style():
+    """Test that styles are shortened without changing which declaration applies"""
+    assert minify_style(' color : #FFFFFF ; margin: 0px ;; ') == 'color:#FFF;margin:0'
+    assert minify_style('margin: 0; margin-top: 5px; margin: 10px 0px') == 'margin-top:5px;margin:10px 0'
+    assert minify_style('color: red !important; color: blue') == 'color:red !important'
+    assert minify_style('padding: 10px; width: 100%; opacity: 0.5') == 'padding:10px;width:100%;opacity:0.5'
+    assert minify_style("background: url('a;b.png')  no-repeat;") == "background: url('a;b.png') no-repeat"
+
+    print("✅ test_minify_style passed")
+
+
+def test_minify_html():
+    """Test that the document wrapper and whitespace are removed outside <pre>"""
+    html_content = """<!DOCTYPE html>
+<html>
+<head>
+    <title>文章</title>
+    <style>p { color: red; }</style>
+</head>
+<body>
+    <!-- 注释 -->
+    <div class="article-content">
+        <p style="color: #333333;  margin: 0px">第一段
+            <strong>粗体</strong>   <em>斜体</em>
+        </p>
+        <pre><code>def f():
+    return  1
+</code></pre>
+    </div>
+</body>
+</html>
+"""
+    assert minify_html(html_content) == (
+        '<div class="article-content"><p style="color:#333;margin:0">第一段 <strong>粗体</strong> <em>斜体</em></p>'
+        '<pre><code>def f():\n    return  1\n</code></pre></div>'
+    )
+    assert minify_html('<p>已经压缩</p>') == '<p>已经压缩</p>'
+
+    print("✅ test_minify_html passed")
+
+
+def test_prepared_article_is_minified():
+    """Test that prepared articles are minified and measured after minification"""
+    formatter = MarkdownFormatter(ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-')))
+    content = "# 标题\n\n第一段\n\n```python\nif True:\n    print('hi')\n```\n"
+    formatted = formatter.format(content)
+    prepared = format_article(formatter, content)
+
+    assert prepared["content"].startswith('<div class="article-content">')
+    assert '<style>' not in prepared["content"]
+    pre = BeautifulSoup(prepared["content"], 'html.parser').pre
+    assert "if True:\n    print('hi')" in pre.get_text()
+    assert prepared["stats"].html_bytes == len(prepared["content"].encode('utf-8'))
+    assert prepared["stats"].html_bytes < formatted["stats"].html_bytes / 2
+
+    print("✅ test_prepared_article_is_minified passed")
+
+
+def run_all_tests():
+    """Run all minifier tests"""
+    print("Running minifier tests...")
+
+    test_minify_style()
+    test_minify_html()
+    test_prepared_article_is_minified()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
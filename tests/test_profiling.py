@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for on-demand profiling (cProfile and sampling modes, tool argument)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# 分析文件写入临时目录，不污染用户数据目录
+os.environ.setdefault('XIAYAN_PROFILE_DIR', tempfile.mkdtemp(prefix='xiayan-profiles-'))
+
+from xiayan_mcp.utils import profiling
+
+
+def _busy(seconds):
+    """Burn CPU for the given number of seconds."""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def test_resolve_mode():
+    """Test parsing of tool arguments, headers and env values"""
+    assert profiling.resolve_mode(None) is None
+    assert profiling.resolve_mode("") is None
+    assert profiling.resolve_mode("0") is None
+    assert profiling.resolve_mode(True) == 'cprofile'
+    assert profiling.resolve_mode("1") == 'cprofile'
+    assert profiling.resolve_mode("SAMPLE") == 'sample'
+    try:
+        profiling.resolve_mode("perf")
+        assert False, "invalid mode should raise"
+    except ValueError:
+        pass
+
+    print("✅ test_resolve_mode passed")
+
+
+def test_cprofile_mode():
+    """Test that cProfile mode writes a .prof file and reports the hot function"""
+    async def scenario():
+        async with profiling.profile('cprofile', 'unit test') as profiler:
+            _busy(0.05)
+        return profiler.report
+
+    report = asyncio.run(scenario())
+
+    assert report['file'].endswith('-unit_test-cprofile.prof')
+    assert os.path.exists(report['file'])
+    assert any('_busy' in row['function'] for row in report['top_total'])
+    assert '自身耗时最高的函数' in profiling.format_summary(report)
+
+    print("✅ test_cprofile_mode passed")
+
+
+def test_sample_mode_sees_worker_threads():
+    """Test that sampling mode captures work running on other threads"""
+    async def scenario():
+        async with profiling.profile('sample', 'threads') as profiler:
+            await asyncio.to_thread(_busy, 0.2)
+        return profiler.report
+
+    report = asyncio.run(scenario())
+
+    assert report['file'].endswith('.collapsed')
+    assert report['samples'] > 0
+    assert any('_busy' in row['function'] for row in report['top_total'])
+    with open(report['file'], 'r', encoding='utf-8') as f:
+        assert any('_busy' in line for line in f)
+
+    print("✅ test_sample_mode_sees_worker_threads passed")
+
+
+def test_concurrent_profiles_are_skipped():
+    """Test that a second profile while one is active is skipped instead of failing"""
+    async def scenario():
+        async with profiling.profile('cprofile', 'outer') as outer:
+            async with profiling.profile('cprofile', 'inner') as inner:
+                pass
+        return outer.report, inner.report
+
+    outer, inner = asyncio.run(scenario())
+
+    assert 'file' in outer
+    assert inner['skipped']
+    assert profiling.format_header(inner) == 'skipped'
+
+    print("✅ test_concurrent_profiles_are_skipped passed")
+
+
+def test_tool_profile_argument():
+    """Test the profile argument on an MCP tool call"""
+    from mcp import types
+    from xiayan_mcp.server import XiayanMCPServer
+
+    async def scenario():
+        server = XiayanMCPServer()
+        handler = server.server.request_handlers[types.CallToolRequest]
+        request = types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(name="list_themes", arguments={"profile": "cprofile"}),
+        )
+        return await handler(request)
+
+    result = asyncio.run(scenario()).root
+
+    assert not result.isError
+    assert len(result.content) == 2
+    assert "性能分析（cprofile）tool-list_themes" in result.content[-1].text
+
+    print("✅ test_tool_profile_argument passed")
+
+
+def run_all_tests():
+    """Run all profiling tests"""
+    print("Running profiling tests...")
+
+    test_resolve_mode()
+    test_cprofile_mode()
+    test_sample_mode_sees_worker_threads()
+    test_concurrent_profiles_are_skipped()
+    test_tool_profile_argument()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for server startup (lazy imports, no import-time side effects)
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# 这些模块应在首次使用工具时才加载
+HEAVY_MODULES = ['markdown', 'bs4', 'jinja2', 'aiohttp', 'frontmatter']
+
+
+def _run_python(code, *argv):
+    """Run code in a fresh interpreter with an empty stdin."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, WECHAT_APP_ID='', WECHAT_APP_SECRET='')
+    return subprocess.run(
+        [sys.executable, '-c', code, *argv],
+        env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=60
+    )
+
+
+def test_import_has_no_side_effects():
+    """Test that importing the server neither parses argv nor prompts for credentials"""
+    result = _run_python(
+        "import xiayan_mcp.server; print('imported')",
+        '--unknown-option'
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'imported'
+
+    print("✅ test_import_has_no_side_effects passed")
+
+
+def test_heavy_modules_load_lazily():
+    """Test that heavy modules are loaded on first use only"""
+    code = (
+        "import sys, json\n"
+        "from xiayan_mcp.server import XiayanMCPServer\n"
+        "server = XiayanMCPServer()\n"
+        f"before = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "server.formatter\n"
+        f"after = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([before, after]))\n"
+    )
+    result = _run_python(code)
+
+    assert result.returncode == 0, result.stderr
+    before, after = json.loads(result.stdout.strip().splitlines()[-1])
+    assert before == [], f"loaded at startup: {before}"
+    assert 'markdown' in after
+
+    print("✅ test_heavy_modules_load_lazily passed")
+
+
+def run_all_tests():
+    """Run all startup tests"""
+    print("Running startup tests...")
+
+    test_import_has_no_side_effects()
+    test_heavy_modules_load_lazily()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
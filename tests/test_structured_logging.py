@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for structured logging (lazy fields, truncation, sampling, publish logs)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.testing.fake_wechat import FakeWeChatServer
+from xiayan_mcp.utils import log
+
+
+class _ListHandler(logging.Handler):
+    """Collect log records in memory."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _capture(name, level):
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = _ListHandler()
+    logger.handlers = [handler]
+    return logger, handler
+
+
+def test_disabled_level_is_lazy():
+    """Test that callable fields are not evaluated when the level is disabled"""
+    logger, handler = _capture('xiayan_test.lazy', logging.INFO)
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return 'x' * 100000
+
+    log.log_event(logger, logging.DEBUG, 'debug.event', body=expensive)
+    assert calls == [] and handler.records == []
+
+    log.log_event(logger, logging.INFO, 'info.event', body=expensive, count=3)
+    assert calls == [1]
+    record = handler.records[0]
+    assert record.event == 'info.event'
+    assert record.fields['count'] == 3
+    assert record.getMessage().startswith('info.event body=')
+    assert '(共100000字符)' in record.getMessage()
+    assert len(record.getMessage()) < 300
+
+    print("✅ test_disabled_level_is_lazy passed")
+
+
+def test_truncate_and_summarize():
+    """Test value truncation, quoting and request summaries"""
+    assert log.truncate('short') == 'short'
+    assert log.truncate('a' * 50, 20) == 'a' * 20 + '...(共50字符)'
+
+    summary = log.summarize({'title': '标题', 'content': '正文' * 1000, 'theme_id': 'default'})
+    assert summary == {'title': '标题', 'content': '<2000字符>', 'theme_id': 'default'}
+
+    logger, handler = _capture('xiayan_test.quote', logging.INFO)
+    log.log_event(logger, logging.INFO, 'quoted', title='a "b" c')
+    assert handler.records[0].getMessage() == 'quoted title="a \\"b\\" c"'
+
+    print("✅ test_truncate_and_summarize passed")
+
+
+def test_sampling_keeps_errors():
+    """Test that sampling drops INFO events but never warnings or errors"""
+    logger, handler = _capture('xiayan_test.sample', logging.DEBUG)
+    log.configure(sample_rate=0.0)
+    try:
+        for _ in range(10):
+            log.log_event(logger, logging.INFO, 'sampled')
+        log.log_event(logger, logging.ERROR, 'kept')
+    finally:
+        log.configure(sample_rate=1.0)
+
+    assert [record.event for record in handler.records] == ['kept']
+
+    print("✅ test_sampling_keeps_errors passed")
+
+
+def test_publish_logs_no_content():
+    """Test that publish_to_draft logs a summary instead of the article body"""
+    logger, handler = _capture('xiayan_mcp.core.publisher', logging.INFO)
+    content = '<p>' + '正文内容' * 30000 + '</p>'
+
+    async def scenario():
+        async with FakeWeChatServer() as fake:
+            publisher = WeChatPublisher()
+            publisher.base_url = fake.base_url
+            publisher.app_id = fake.app_id
+            publisher.app_secret = fake.app_secret
+            try:
+                return await publisher.publish_to_draft('日志测试', content)
+            finally:
+                await publisher.close()
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        logger.handlers = []
+        logger.propagate = True
+
+    events = {record.event: record for record in handler.records if hasattr(record, 'event')}
+    assert events['publish.start'].fields['content_chars'] == len(content)
+    assert events['publish.done'].fields['media_id'] == result['media_id']
+    assert all(len(record.getMessage()) < 1000 for record in handler.records)
+
+    print("✅ test_publish_logs_no_content passed")
+
+
+def run_all_tests():
+    """Run all structured logging tests"""
+    print("Running structured logging tests...")
+
+    test_disabled_level_is_lazy()
+    test_truncate_and_summarize()
+    test_sampling_keeps_errors()
+    test_publish_logs_no_content()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
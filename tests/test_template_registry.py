@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled theme template registry and its bytecode cache
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# 共享注册表的字节码缓存写入临时目录
+os.environ.setdefault('XIAYAN_TEMPLATE_CACHE_DIR', tempfile.mkdtemp(prefix='xiayan-templates-'))
+
+from xiayan_mcp.themes import Theme, ThemeManager
+from xiayan_mcp.themes.templates import TemplateRegistry
+
+
+def _theme(template):
+    return Theme(id="registry", name="注册表", description="测试", template=template)
+
+
+def test_compiles_once_per_version():
+    """Test that a theme template is compiled once and recompiled only when it changes"""
+    registry = TemplateRegistry(use_disk_cache=False)
+    theme = _theme("<section>{{ content|safe }}</section>")
+
+    for _ in range(5):
+        assert registry.render(theme, content="<p>正文</p>") == "<section><p>正文</p></section>"
+    assert registry.compilations == 1
+
+    theme.template = "<div>{{ content|safe }}</div>"
+    assert registry.render(theme, content="x") == "<div>x</div>"
+    assert registry.compilations == 2
+
+    # 旧版本仍在缓存中，切换回来不需要重新编译
+    theme.template = "<section>{{ content|safe }}</section>"
+    registry.render(theme, content="x")
+    assert registry.compilations == 2
+
+    registry.invalidate("registry")
+    registry.render(theme, content="x")
+    assert registry.compilations == 3
+
+    print("✅ test_compiles_once_per_version passed")
+
+
+def test_bytecode_cache_survives_restart():
+    """Test that a new registry loads compiled bytecode from disk instead of compiling"""
+    theme = _theme("<p>{{ content }}</p>{% if css_styles %}<style>{{ css_styles }}</style>{% endif %}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first = TemplateRegistry(Path(tmp))
+        assert first.render(theme, content="a", css_styles="") == "<p>a</p>"
+        assert list(Path(tmp).glob("*.jinja.cache"))
+
+        second = TemplateRegistry(Path(tmp))
+
+        def fail_compile(*args, **kwargs):
+            raise AssertionError("template should be loaded from the bytecode cache")
+
+        second.environment.compile = fail_compile
+        assert second.render(theme, content="b", css_styles="p{}") == "<p>b</p><style>p{}</style>"
+
+    print("✅ test_bytecode_cache_survives_restart passed")
+
+
+def test_theme_preview_uses_registry():
+    """Test that theme previews render through the shared registry"""
+    manager = ThemeManager()
+    preview = manager.get_theme_preview("default", "<p>预览</p>")
+
+    assert "<p>预览</p>" in preview
+    assert 'class="article-content"' in preview
+
+    print("✅ test_theme_preview_uses_registry passed")
+
+
+def run_all_tests():
+    """Run all template registry tests"""
+    print("Running template registry tests...")
+
+    test_compiles_once_per_version()
+    test_bytecode_cache_survives_restart()
+    test_theme_preview_uses_registry()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
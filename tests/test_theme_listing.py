@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached theme listing (metadata, fingerprints, ETag)
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.themes import Theme, ThemeManager
+
+
+def test_listing_is_cached():
+    """Test that repeated listings reuse the same precomputed result"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+    first = manager.get_theme_listing(detailed=True)
+
+    assert manager.get_theme_listing(detailed=True) is first
+    assert manager.get_available_themes() is first.themes
+    assert json.loads(first.json) == first.themes
+    assert first.etag.startswith('"') and first.etag.endswith('"')
+
+    summary = manager.get_theme_listing()
+    assert set(summary.themes[0]) == {'id', 'name', 'description'}
+    assert summary.etag != first.etag
+
+    default = next(theme for theme in first.themes if theme['id'] == 'default')
+    assert default == {'id': 'default', 'name': '默认主题', 'description': '简洁大方的默认主题',
+                       'has_custom_template': False, 'has_custom_css': False}
+
+    print("✅ test_listing_is_cached passed")
+
+
+def test_changes_invalidate_listing():
+    """Test that adding or updating a theme refreshes the listing, ETag and fingerprint"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+    listing = manager.get_theme_listing(detailed=True)
+    fingerprint = manager.get_theme_fingerprint('lapis')
+
+    manager.add_custom_theme(Theme(id='custom', name='自定义', description='测试',
+                                   template='<div>{{ content|safe }}</div>', css_styles='p{}'))
+    added = manager.get_theme_listing(detailed=True)
+    assert added is not listing and added.etag != listing.etag
+    custom = next(theme for theme in added.themes if theme['id'] == 'custom')
+    assert custom['has_custom_template'] and custom['has_custom_css']
+
+    manager.update_theme('lapis', css_styles='h1{color:red}')
+    updated = manager.get_theme_listing(detailed=True)
+    assert updated.etag == added.etag  # 列表字段没有变化
+    assert manager.get_theme_fingerprint('lapis') != fingerprint
+
+    manager.update_theme('lapis', name='青金石')
+    assert manager.get_theme_listing(detailed=True).etag != updated.etag
+
+    print("✅ test_changes_invalidate_listing passed")
+
+
+def run_all_tests():
+    """Run all theme listing tests"""
+    print("Running theme listing tests...")
+
+    test_listing_is_cached()
+    test_changes_invalidate_listing()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the rendered theme preview cache
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.themes import ThemeManager
+from xiayan_mcp.themes.templates import get_template_registry
+
+
+class _RenderCounter:
+    """Count renders through the shared template registry."""
+
+    def __init__(self):
+        self.registry = get_template_registry()
+        self.count = 0
+        self._render = self.registry.render
+
+    def __enter__(self):
+        def render(theme, **context):
+            self.count += 1
+            return self._render(theme, **context)
+        self.registry.render = render
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.render = self._render
+        return False
+
+
+def test_preview_rendered_once():
+    """Test that a preview is rendered once per theme version and sample content"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+
+    with _RenderCounter() as renders:
+        first = manager.get_cached_preview('lapis', '<p>示例</p>')
+        again = manager.get_cached_preview('lapis', '<p>示例</p>')
+        other = manager.get_cached_preview('lapis', '<p>其他示例</p>')
+        assert renders.count == 2
+
+    assert again is first
+    assert first.etag != other.etag
+    assert '<p>示例</p>' in manager.get_theme_preview('lapis', '<p>示例</p>')
+
+    print("✅ test_preview_rendered_once passed")
+
+
+def test_update_invalidates_only_that_theme():
+    """Test that updating a theme re-renders its previews and keeps the others"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+    lapis = manager.get_cached_preview('lapis')
+    pie = manager.get_cached_preview('pie')
+
+    manager.update_theme('lapis', template='<style>{{ css_styles }}</style>{{ content|safe }}',
+                         css_styles='h1 { color: #123456; }')
+
+    with _RenderCounter() as renders:
+        updated = manager.get_cached_preview('lapis')
+        assert manager.get_cached_preview('pie') is pie
+        assert renders.count == 1
+    assert updated is not lapis and updated.etag != lapis.etag
+    assert '#123456' in updated.html
+
+    print("✅ test_update_invalidates_only_that_theme passed")
+
+
+def test_prerendered_gallery_costs_no_renders():
+    """Test that after pre-rendering, opening all previews renders nothing"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+    assert manager.prerender_previews() == 8
+
+    with _RenderCounter() as renders:
+        for theme in manager.get_available_themes():
+            manager.get_theme_preview(theme['id'])
+        assert renders.count == 0
+
+    print("✅ test_prerendered_gallery_costs_no_renders passed")
+
+
+def run_all_tests():
+    """Run all preview cache tests"""
+    print("Running theme preview cache tests...")
+
+    test_preview_rendered_once()
+    test_update_invalidates_only_that_theme()
+    test_prerendered_gallery_costs_no_renders()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
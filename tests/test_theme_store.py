@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for the theme directory store (persistence, versions, hot reload)
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.themes import Theme, ThemeManager
+from xiayan_mcp.themes.templates import get_template_registry
+
+
+def _custom_theme():
+    return Theme(id='ocean', name='海洋', description='蓝色主题',
+                 template='<section>{{ content|safe }}</section>', css_styles='h1 { color: blue; }')
+
+
+def test_builtin_themes_from_files():
+    """Test that built-in themes are loaded from the packaged theme files"""
+    manager = ThemeManager(tempfile.mkdtemp(prefix='xiayan-themes-'))
+    ids = [theme['id'] for theme in manager.get_available_themes()]
+
+    assert ids == ['default', 'orangeheart', 'rainbow', 'lapis', 'pie', 'maize', 'purple', 'phycat']
+    assert '#e67e22' in manager.get_theme('orangeheart').css_styles
+    assert manager.get_theme('lapis').template == manager._default_template
+    assert all(manager.get_theme(theme_id).version == 1 for theme_id in ids)
+
+    print("✅ test_builtin_themes_from_files passed")
+
+
+def test_themes_persist_across_restarts():
+    """Test that added and updated themes are saved and keep their version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ThemeManager(tmp)
+        manager.add_custom_theme(_custom_theme())
+        manager.update_theme('ocean', css_styles='h1 { color: navy; }')
+        manager.update_theme('lapis', name='青金石')
+
+        assert (Path(tmp) / 'ocean' / 'template.html').exists()
+        assert not (Path(tmp) / 'lapis' / 'template.html').exists()
+        with open(Path(tmp) / 'index.json', 'r', encoding='utf-8') as f:
+            assert json.load(f)['ocean']['version'] == 2
+
+        restarted = ThemeManager(tmp)
+        ocean = restarted.get_theme('ocean')
+        assert (ocean.name, ocean.css_styles, ocean.version) == ('海洋', 'h1 { color: navy; }', 2)
+        assert ocean.template == '<section>{{ content|safe }}</section>'
+        assert restarted.get_theme('lapis').name == '青金石'
+        assert restarted.get_theme('lapis').version == 2
+
+        # 服务停止期间修改的文件，下次启动时版本号递增
+        with open(Path(tmp) / 'ocean' / 'style.css', 'w', encoding='utf-8') as f:
+            f.write('h1 { color: teal; }')
+        assert ThemeManager(tmp).get_theme('ocean').version == 3
+
+        try:
+            restarted.add_custom_theme(Theme(id='../escape', name='x', description='x', template=''))
+            assert False, "invalid theme id should be rejected"
+        except ValueError:
+            pass
+
+    print("✅ test_themes_persist_across_restarts passed")
+
+
+def test_hot_reload_changed_theme_only():
+    """Test that editing one theme's files reloads only that theme and notifies listeners"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ThemeManager(tmp)
+        manager.add_custom_theme(_custom_theme())
+        manager.update_theme('lapis', css_styles='h1 { color: #000; }')
+        notified = []
+        manager.add_change_listener(notified.append)
+
+        registry = get_template_registry()
+        registry.render(manager.get_theme('ocean'), content='x')
+        registry.render(manager.get_theme('lapis'), content='x')
+        lapis_fingerprint = manager.get_theme_fingerprint('lapis')
+
+        assert manager.reload_changed() == []
+
+        with open(Path(tmp) / 'ocean' / 'style.css', 'w', encoding='utf-8') as f:
+            f.write('h1 { color: green; font-weight: bold; }')
+        assert manager.reload_changed() == ['ocean']
+        assert notified == ['ocean']
+        assert manager.get_theme('ocean').css_styles == 'h1 { color: green; font-weight: bold; }'
+        assert manager.get_theme('ocean').version == 2
+        assert manager.get_theme_fingerprint('lapis') == lapis_fingerprint
+        cached_ids = {theme_id for theme_id, _ in registry._compiled}
+        assert 'ocean' not in cached_ids and 'lapis' in cached_ids
+
+        # 删除覆盖内置主题的目录，恢复为内置版本；删除自定义主题目录，主题被移除
+        shutil.rmtree(Path(tmp) / 'lapis')
+        shutil.rmtree(Path(tmp) / 'ocean')
+        assert manager.reload_changed() == ['lapis', 'ocean']
+        assert manager.get_theme('lapis').css_styles == ThemeManager(tmp).store.load_builtin('lapis').css_styles
+        assert 'ocean' not in [theme['id'] for theme in manager.get_available_themes()]
+
+    print("✅ test_hot_reload_changed_theme_only passed")
+
+
+def test_watcher_thread():
+    """Test that the polling watcher picks up new theme directories"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ThemeManager(tmp)
+        assert manager.start_watching(0.02)
+        try:
+            directory = Path(tmp) / 'forest'
+            directory.mkdir()
+            (directory / 'style.css').write_text('h1 { color: green; }', encoding='utf-8')
+            (directory / 'theme.json').write_text('{"name": "森林", "description": "绿色"}', encoding='utf-8')
+
+            deadline = time.time() + 5
+            while manager.get_theme('forest').id != 'forest' and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            manager.stop_watching()
+
+        assert manager.get_theme('forest').name == '森林'
+        assert not manager.start_watching(0)
+
+    print("✅ test_watcher_thread passed")
+
+
+def run_all_tests():
+    """Run all theme store tests"""
+    print("Running theme store tests...")
+
+    test_builtin_themes_from_files()
+    test_themes_persist_across_restarts()
+    test_hot_reload_changed_theme_only()
+    test_watcher_thread()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
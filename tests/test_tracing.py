@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for tracing spans (parent/child relationships, JSONL and OTLP export)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from xiayan_mcp.core.formatter import MarkdownFormatter
+from xiayan_mcp.core.pipeline import PublishPipeline
+from xiayan_mcp.core.publisher import WeChatPublisher
+from xiayan_mcp.testing.fake_wechat import FakeWeChatServer
+from xiayan_mcp.utils import tracing
+
+ARTICLE = """---
+title: 追踪测试
+---
+
+# 追踪测试
+
+正文内容
+
+```python
+print("hello")
+```
+"""
+
+
+def _read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_disabled_is_noop():
+    """Test that spans are no-ops while tracing is disabled"""
+    tracing.disable()
+    with tracing.span('noop', key='value') as span:
+        span.set_attribute('other', 1)
+
+    assert not tracing.is_enabled()
+    assert span is tracing.span('another')
+    assert tracing.status() == {'enabled': False}
+
+    print("✅ test_disabled_is_noop passed")
+
+
+def test_publish_span_tree():
+    """Test that a publish produces one trace with formatter, thread pool and HTTP child spans"""
+    async def scenario():
+        async with FakeWeChatServer() as fake:
+            publisher = WeChatPublisher()
+            publisher.base_url = fake.base_url
+            publisher.app_id = fake.app_id
+            publisher.app_secret = fake.app_secret
+            pipeline = PublishPipeline(MarkdownFormatter(), publisher)
+            try:
+                with tracing.span('publish'):
+                    await pipeline.run(ARTICLE)
+            finally:
+                await publisher.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'traces.jsonl')
+        tracing.enable(path)
+        try:
+            asyncio.run(scenario())
+        finally:
+            tracing.disable()
+        spans = _read_jsonl(path)
+
+    by_id = {span['span_id']: span for span in spans}
+    names = {span['name'] for span in spans}
+
+    def parent_name(span):
+        return by_id[span['parent_id']]['name']
+
+    assert len({span['trace_id'] for span in spans}) == 1
+    assert {'stage.format', 'formatter.format', 'frontmatter.loads', 'md.convert',
+            '_apply_theme', 'stage.draft', 'http draft/add'} <= names
+    for span in spans:
+        if span['name'] == 'formatter.format':
+            # 格式化在CPU线程池中执行，仍应挂在阶段span下
+            assert parent_name(span) == 'stage.format'
+        elif span['name'] in ('md.convert', '_apply_theme', 'frontmatter.loads'):
+            assert parent_name(span) == 'formatter.format'
+        elif span['name'] == 'http draft/add':
+            assert parent_name(span) == 'stage.draft'
+            assert span['attributes']['status'] == 200
+        elif span['name'] == 'publish':
+            assert span['parent_id'] is None
+    assert 'access_token' not in json.dumps(spans)
+
+    print("✅ test_publish_span_tree passed")
+
+
+def test_otlp_export():
+    """Test OTLP/JSON file output"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'traces.otlp.json')
+        tracing.enable(path, 'otlp')
+        try:
+            with tracing.span('root', article='a'):
+                with tracing.span('child', size=3):
+                    pass
+        finally:
+            tracing.disable()
+        with open(path, 'r', encoding='utf-8') as f:
+            request = json.loads(f.readline())
+
+    resource_spans = request['resourceSpans'][0]
+    assert resource_spans['resource']['attributes'][0]['value']['stringValue'] == 'xiayan-mcp'
+    child, root = resource_spans['scopeSpans'][0]['spans']
+    assert child['parentSpanId'] == root['spanId']
+    assert child['traceId'] == root['traceId'] and len(root['traceId']) == 32
+    assert child['attributes'] == [{'key': 'size', 'value': {'intValue': '3'}}]
+    assert 'parentSpanId' not in root
+
+    print("✅ test_otlp_export passed")
+
+
+def run_all_tests():
+    """Run all tracing tests"""
+    print("Running tracing tests...")
+
+    test_disabled_is_noop()
+    test_publish_span_tree()
+    test_otlp_export()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the web backend's shared service (lifespan, dependency injection)
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src and web_backend directories to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web_backend'))
+
+# 素材镜像数据库写入临时目录
+os.environ.setdefault('XIAYAN_DATA_DIR', tempfile.mkdtemp(prefix='xiayan-web-'))
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_single_shared_instance():
+    """Test that all routes receive the one instance created by the lifespan"""
+    with TestClient(app) as client:
+        service = app.state.xiayan_mcp
+        assert service.theme_manager is service.formatter.theme_manager
+
+        response = client.post("/api/themes/", json={
+            "id": "web_shared",
+            "name": "共享主题",
+            "description": "在其他路由中可见",
+            "css_styles": "",
+        })
+        assert response.status_code == 201, response.text
+
+        # 新主题在主题列表和发布用的格式化器中都可见
+        themes = client.get("/api/themes/").json()
+        assert "web_shared" in [theme["id"] for theme in themes]
+        assert service.formatter.theme_manager.get_theme("web_shared").name == "共享主题"
+
+        saved = {key: os.environ.get(key) for key in ('WECHAT_APP_ID', 'WECHAT_APP_SECRET')}
+        try:
+            response = client.post("/api/credentials/", json={
+                "app_id": "wxshared", "app_secret": "secret", "save_to_env": False,
+            })
+            assert response.status_code == 200, response.text
+            assert service.publisher.app_id == "wxshared"
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    print("✅ test_single_shared_instance passed")
+
+
+def test_lifespan_closes_resources():
+    """Test that shutting the app down closes the HTTP session and the material database"""
+    closed = []
+    with TestClient(app):
+        service = app.state.xiayan_mcp
+        original_close = service.material_store.close
+
+        def close():
+            closed.append('material_store')
+            original_close()
+
+        service.material_store.close = close
+    assert closed == ['material_store']
+    assert service.publisher._session is None
+
+    print("✅ test_lifespan_closes_resources passed")
+
+
+def test_theme_listing_etag():
+    """Test that the theme list is served with an ETag and answers conditional GETs with 304"""
+    with TestClient(app) as client:
+        response = client.get("/api/themes/")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "default" in [theme["id"] for theme in response.json()]
+
+        response = client.get("/api/themes/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        client.put("/api/themes/default", json={"name": "新名称"})
+        response = client.get("/api/themes/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    print("✅ test_theme_listing_etag passed")
+
+
+def test_theme_preview_etag():
+    """Test cached previews with ETags over GET and POST"""
+    with TestClient(app) as client:
+        response = client.get("/api/themes/lapis/preview")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        etag = response.headers["etag"]
+        assert 'class="article-content"' in response.json()["html_content"]
+
+        response = client.get("/api/themes/lapis/preview", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        response = client.post("/api/themes/lapis/preview", json={"sample_content": "<p>编辑中</p>"})
+        assert response.status_code == 200
+        assert "<p>编辑中</p>" in response.json()["html_content"]
+        assert response.headers["etag"] != etag
+
+    print("✅ test_theme_preview_etag passed")
+
+
+def run_all_tests():
+    """Run all web service tests"""
+    print("Running web service tests...")
+
+    test_single_shared_instance()
+    test_lifespan_closes_resources()
+    test_theme_listing_etag()
+    test_theme_preview_etag()
+
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    run_all_tests()
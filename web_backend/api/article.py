@@ -3,6 +3,7 @@
 文章相关API路由
 """
 
+import logging
 import sys
 import os
 
@@ -15,17 +16,18 @@ src_path = os.path.join(project_root, 'src')
 sys.path.insert(0, src_path)
 sys.path.insert(1, project_root)
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Union
 from core.xiayan_mcp import XiayanMCP
+from core.services import get_xiayan_mcp
+from xiayan_mcp.utils import log
+
+logger = logging.getLogger(__name__)
 
 # 创建路由器
 router = APIRouter()
 
-# 创建XiayanMCP实例
-xiayan_mcp = XiayanMCP()
-
 # 文章请求模型
 class ArticleRequest(BaseModel):
     content: str
@@ -35,20 +37,47 @@ class ArticleRequest(BaseModel):
     author: Optional[str] = "Xiayan MCP"
     need_open_comment: Optional[Union[int, bool]] = 0
     only_fans_can_comment: Optional[Union[int, bool]] = 0
+    # 重试时使用相同的键，不会重复创建草稿
+    idempotency_key: Optional[str] = None
 
 # 文章响应模型
 class ArticleResponse(BaseModel):
     message: str
     media_id: Optional[str] = None
     cover_media_id: Optional[str] = None
+    deduplicated: bool = False
+    updated: bool = False
+
+# 多图文草稿中的单篇文章
+class DraftArticleItem(BaseModel):
+    content: str
+    theme_id: Optional[str] = None
+    cover: Optional[str] = None
+    author: Optional[str] = None
+    digest: Optional[str] = ""
+
+# 多图文草稿请求模型
+class MultiArticleRequest(BaseModel):
+    articles: List[DraftArticleItem]
+    theme_id: Optional[str] = "default"
+    author: Optional[str] = "Xiayan MCP"
+    need_open_comment: Optional[Union[int, bool]] = 0
+    only_fans_can_comment: Optional[Union[int, bool]] = 0
+
+# 多图文草稿响应模型
+class MultiArticleResponse(BaseModel):
+    message: str
+    media_id: str
+    articles: List[Dict]
 
 @router.post("/publish", response_model=ArticleResponse, status_code=status.HTTP_201_CREATED)
-async def publish_article(article: ArticleRequest):
-    """发布文章到微信公众号草稿箱"""
-    print("=== 收到文章发布请求 ===")
-    print(f"请求内容: {article}")
+async def publish_article(article: ArticleRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp),
+                          idempotency_key: Optional[str] = Header(None)):
+    """发布文章到微信公众号草稿箱，可通过Idempotency-Key请求头或idempotency_key字段安全重试"""
+    # 请求体可能有数百KB，只记录摘要
+    log.log_event(logger, logging.INFO, 'api.publish.request', title=article.title,
+                  theme=article.theme_id, content_chars=len(article.content))
     try:
-        print("调用xiayan_mcp.publish_article方法...")
         # 转换布尔值为整数（微信API期望整数）
         need_open_comment = int(article.need_open_comment) if isinstance(article.need_open_comment, bool) else article.need_open_comment
         only_fans_can_comment = int(article.only_fans_can_comment) if isinstance(article.only_fans_can_comment, bool) else article.only_fans_can_comment
@@ -60,26 +89,44 @@ async def publish_article(article: ArticleRequest):
             permanent_cover=article.permanent_cover,
             author=article.author,
             need_open_comment=need_open_comment,
-            only_fans_can_comment=only_fans_can_comment
+            only_fans_can_comment=only_fans_can_comment,
+            idempotency_key=article.idempotency_key or idempotency_key
         )
-        print(f"publish_article方法返回结果: {result}")
         response = ArticleResponse(
             message=result["message"],
             media_id=result.get("media_id"),
-            cover_media_id=result.get("cover_media_id")
+            cover_media_id=result.get("cover_media_id"),
+            deduplicated=result.get("deduplicated", False),
+            updated=result.get("updated", False)
         )
-        print(f"返回响应: {response}")
+        log.log_event(logger, logging.INFO, 'api.publish.done', media_id=response.media_id)
         return response
     except Exception as e:
-        print(f"发布文章失败: {str(e)}")
-        import traceback
-        print(f"错误堆栈: {traceback.format_exc()}")
+        # 堆栈已由XiayanMCP.publish_article记录
+        log.log_event(logger, logging.WARNING, 'api.publish.failed', error=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"发布文章失败: {str(e)}"
         )
 
 
+@router.post("/publish_multi", response_model=MultiArticleResponse, status_code=status.HTTP_201_CREATED)
+async def publish_multi_article_draft(request: MultiArticleRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """将多篇文章（最多8篇）作为一个多图文草稿发布"""
+    try:
+        result = await xiayan_mcp.publish_multi_article_draft(
+            articles=[article.model_dump() for article in request.articles],
+            theme_id=request.theme_id,
+            author=request.author,
+            need_open_comment=int(request.need_open_comment),
+            only_fans_can_comment=int(request.only_fans_can_comment)
+        )
+        return MultiArticleResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"发布多图文草稿失败: {str(e)}"
+        )
 
 @router.get("/test")
 async def test_article_api():
@@ -15,17 +15,15 @@ src_path = os.path.join(project_root, 'src')
 sys.path.insert(0, src_path)
 sys.path.insert(1, project_root)
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional
 from core.xiayan_mcp import XiayanMCP
+from core.services import get_xiayan_mcp
 
 # 创建路由器
 router = APIRouter()
 
-# 创建XiayanMCP实例
-xiayan_mcp = XiayanMCP()
-
 # 凭证请求模型
 class CredentialRequest(BaseModel):
     app_id: str
@@ -40,7 +38,7 @@ class CredentialResponse(BaseModel):
     message: str
 
 @router.get("/", response_model=CredentialResponse)
-async def get_credentials():
+async def get_credentials(xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """获取当前微信凭证信息"""
     try:
         result = await xiayan_mcp.get_credentials()
@@ -57,7 +55,7 @@ async def get_credentials():
         )
 
 @router.post("/", response_model=CredentialResponse)
-async def update_credentials(credential: CredentialRequest):
+async def update_credentials(credential: CredentialRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """更新微信凭证信息"""
     try:
         result = await xiayan_mcp.update_credentials(
@@ -15,17 +15,15 @@ src_path = os.path.join(project_root, 'src')
 sys.path.insert(0, src_path)
 sys.path.insert(1, project_root)
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from pydantic import BaseModel
 from typing import List, Optional
 from core.xiayan_mcp import XiayanMCP
+from core.services import get_xiayan_mcp
 
 # 创建路由器
 router = APIRouter()
 
-# 创建XiayanMCP实例
-xiayan_mcp = XiayanMCP()
-
 # 媒体上传请求模型
 class MediaUploadRequest(BaseModel):
     media_path: str
@@ -40,8 +38,21 @@ class MediaListResponse(BaseModel):
     media_list: List[dict]
     total_count: int
 
+class MaterialSyncRequest(BaseModel):
+    media_types: Optional[List[str]] = None
+    concurrency: Optional[int] = 4
+
+class MaterialGCRequest(BaseModel):
+    mode: Optional[str] = "dry_run"
+    include_orphans: Optional[bool] = True
+    include_duplicates: Optional[bool] = True
+    min_age_days: Optional[float] = 1
+    max_deletions: Optional[int] = None
+    concurrency: Optional[int] = 4
+    rate_per_second: Optional[float] = 5
+
 @router.post("/upload/temp", response_model=MediaResponse)
-async def upload_temp_media(media_path: str, media_type: Optional[str] = "image"):
+async def upload_temp_media(media_path: str, media_type: Optional[str] = "image", xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """上传临时媒体文件（有效期3天）"""
     try:
         media_id = await xiayan_mcp.upload_temp_media(
@@ -59,7 +70,7 @@ async def upload_temp_media(media_path: str, media_type: Optional[str] = "image"
         )
 
 @router.post("/upload/permanent", response_model=MediaResponse)
-async def upload_permanent_material(media_path: str, media_type: Optional[str] = "image"):
+async def upload_permanent_material(media_path: str, media_type: Optional[str] = "image", xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """上传永久媒体素材"""
     try:
         media_id = await xiayan_mcp.upload_permanent_material(
@@ -77,7 +88,7 @@ async def upload_permanent_material(media_path: str, media_type: Optional[str] =
         )
 
 @router.post("/upload/image_for_news")
-async def upload_image_for_news(media_path: str):
+async def upload_image_for_news(media_path: str, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """上传新闻图片，返回可直接使用的URL"""
     try:
         image_url = await xiayan_mcp.upload_image_for_news(
@@ -95,18 +106,21 @@ async def get_media_list(
     media_type: Optional[str] = "image",
     permanent: Optional[bool] = True,
     offset: Optional[int] = 0,
-    count: Optional[int] = 20
+    count: Optional[int] = 20,
+    refresh: Optional[bool] = False,
+    xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)
 ):
-    """获取媒体素材列表"""
+    """获取媒体素材列表（永久素材从本地镜像读取）"""
     try:
         result = await xiayan_mcp.get_media_list(
             media_type=media_type,
             permanent=permanent,
             offset=offset,
-            count=count
+            count=count,
+            refresh=refresh
         )
         return MediaListResponse(
-            media_list=result.get("items", []),
+            media_list=result.get("item", []),
             total_count=result.get("total_count", 0)
         )
     except Exception as e:
@@ -115,8 +129,50 @@ async def get_media_list(
             detail=f"获取媒体列表失败: {str(e)}"
         )
 
+@router.post("/sync")
+async def sync_materials(request: MaterialSyncRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """增量同步永久素材到本地镜像"""
+    try:
+        stats = await xiayan_mcp.sync_materials(
+            media_types=request.media_types,
+            concurrency=request.concurrency
+        )
+        return {"stats": stats, "message": "素材同步成功"}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"同步素材失败: {str(e)}"
+        )
+
+@router.get("/search")
+async def search_materials(query: str, media_type: Optional[str] = None, limit: Optional[int] = 20, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """在本地镜像中搜索永久素材"""
+    try:
+        results = await xiayan_mcp.search_materials(
+            query=query,
+            media_type=media_type,
+            limit=limit
+        )
+        return {"results": results, "count": len(results)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"搜索素材失败: {str(e)}"
+        )
+
+@router.post("/gc")
+async def gc_materials(request: MaterialGCRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """清理未被引用或重复的永久素材（mode: report / dry_run / delete）"""
+    try:
+        return await xiayan_mcp.gc_materials(**request.model_dump())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"清理素材失败: {str(e)}"
+        )
+
 @router.post("/upload/cover", response_model=MediaResponse)
-async def upload_cover_image(media_path: str):
+async def upload_cover_image(media_path: str, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """上传封面图片"""
     try:
         media_id = await xiayan_mcp.upload_cover_image(
@@ -133,7 +189,7 @@ async def upload_cover_image(media_path: str):
         )
 
 @router.delete("/{media_id}")
-async def delete_permanent_material(media_id: str):
+async def delete_permanent_material(media_id: str, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """删除永久媒体素材"""
     try:
         result = await xiayan_mcp.delete_permanent_material(
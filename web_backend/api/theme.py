@@ -15,17 +15,16 @@ src_path = os.path.join(project_root, 'src')
 sys.path.insert(0, src_path)
 sys.path.insert(1, project_root)
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from core.xiayan_mcp import XiayanMCP
+from core.services import get_xiayan_mcp
 
 # 创建路由器
 router = APIRouter()
 
-# 创建XiayanMCP实例
-xiayan_mcp = XiayanMCP()
-
 # 主题响应模型
 class ThemeResponse(BaseModel):
     id: str
@@ -48,50 +47,62 @@ class ThemeUpdateRequest(BaseModel):
     template: Optional[str] = None
     css_styles: Optional[str] = None
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """请求头If-None-Match是否包含给定ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in [value[2:] if value.startswith("W/") else value for value in candidates]
+
 @router.get("/", response_model=List[ThemeResponse])
-async def get_themes(detailed: Optional[bool] = False):
-    """获取所有可用主题"""
+async def get_themes(request: Request, detailed: Optional[bool] = False,
+                     xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """获取所有可用主题（返回缓存的JSON，支持ETag条件请求）"""
     try:
-        # 直接创建ThemeManager实例，绕过xiayan_mcp实例
-        from xiayan_mcp.themes.theme_manager import ThemeManager
-        theme_manager = ThemeManager()
-        
-        if detailed:
-            themes = theme_manager.get_available_themes()
-        else:
-            # 简化主题信息
-            themes = [
-                {"id": theme.id, "name": theme.name, "description": theme.description}
-                for theme in theme_manager._themes.values()
-            ]
-        
-        return [
-            ThemeResponse(
-                id=theme["id"],
-                name=theme["name"],
-                description=theme["description"]
-            ) for theme in themes
-        ]
+        listing = await xiayan_mcp.get_theme_listing(bool(detailed))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取主题列表失败: {str(e)}"
         )
+    headers = {"ETag": listing.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, listing.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=listing.json, media_type="application/json", headers=headers)
 
-@router.get("/{theme_id}/preview", response_model=ThemePreviewResponse)
-async def preview_theme(theme_id: str, sample_content: Optional[str] = None):
-    """预览主题效果"""
+class ThemePreviewRequest(BaseModel):
+    sample_content: Optional[str] = None
+
+async def _preview_response(request: Request, xiayan_mcp: XiayanMCP, theme_id: str,
+                            sample_content: Optional[str]) -> Response:
+    """返回缓存的主题预览，If-None-Match匹配时返回304"""
     try:
-        preview = await xiayan_mcp.preview_theme(theme_id, sample_content)
-        return ThemePreviewResponse(html_content=preview)
+        preview = await xiayan_mcp.get_theme_preview(theme_id, sample_content)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"预览主题失败: {str(e)}"
         )
+    headers = {"ETag": preview.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, preview.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(ThemePreviewResponse(html_content=preview.html).model_dump(), headers=headers)
+
+@router.get("/{theme_id}/preview", response_model=ThemePreviewResponse)
+async def preview_theme(request: Request, theme_id: str, sample_content: Optional[str] = None,
+                        xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """预览主题效果（按主题版本和示例内容缓存，支持ETag条件请求）"""
+    return await _preview_response(request, xiayan_mcp, theme_id, sample_content)
+
+@router.post("/{theme_id}/preview", response_model=ThemePreviewResponse)
+async def preview_theme_with_content(request: Request, theme_id: str, body: ThemePreviewRequest,
+                                     xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
+    """使用请求体中的示例内容预览主题（文章编辑页使用）"""
+    return await _preview_response(request, xiayan_mcp, theme_id, body.sample_content)
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def add_theme(theme: ThemeCreateRequest):
+async def add_theme(theme: ThemeCreateRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """添加自定义主题"""
     try:
         result = await xiayan_mcp.add_custom_theme(
@@ -109,7 +120,7 @@ async def add_theme(theme: ThemeCreateRequest):
         )
 
 @router.put("/{theme_id}")
-async def update_theme(theme_id: str, theme: ThemeUpdateRequest):
+async def update_theme(theme_id: str, theme: ThemeUpdateRequest, xiayan_mcp: XiayanMCP = Depends(get_xiayan_mcp)):
     """更新现有主题"""
     try:
         result = await xiayan_mcp.update_theme(
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Web后端共享服务
+
+整个应用只创建一个XiayanMCP实例，由FastAPI的lifespan创建和关闭，
+路由通过Depends(get_xiayan_mcp)获取。这样所有路由共用同一个HTTP连接池、
+access_token缓存、素材镜像和主题注册表。
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+
+from core.xiayan_mcp import XiayanMCP
+from xiayan_mcp.themes.theme_manager import PRERENDER_PREVIEWS
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """创建共享的XiayanMCP实例，应用关闭时释放连接和数据库"""
+    app.state.xiayan_mcp = XiayanMCP()
+    # 监听主题目录，热加载修改过的主题
+    app.state.xiayan_mcp.theme_manager.start_watching()
+    if PRERENDER_PREVIEWS:
+        # 预先渲染主题画廊用到的默认预览
+        await asyncio.to_thread(app.state.xiayan_mcp.theme_manager.prerender_previews)
+    try:
+        yield
+    finally:
+        await app.state.xiayan_mcp.aclose()
+        logger.info("Web后端服务已关闭")
+
+
+def get_xiayan_mcp(request: Request) -> XiayanMCP:
+    """FastAPI依赖：返回应用共享的XiayanMCP实例"""
+    service = getattr(request.app.state, 'xiayan_mcp', None)
+    if service is None:
+        raise RuntimeError("XiayanMCP服务未初始化，应用需要通过lifespan启动")
+    return service
@@ -3,8 +3,10 @@
 xiayan-mcp核心功能集成
 """
 
+import logging
 import os
 import sys
+from dataclasses import replace
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -18,26 +20,44 @@ sys.path.insert(0, src_path)
 sys.path.insert(1, project_root)
 
 # 从src目录下的xiayan_mcp包导入
+from xiayan_mcp.core.content_limits import ContentTooLargeError
 from xiayan_mcp.core.formatter import MarkdownFormatter
 from xiayan_mcp.core.publisher import WeChatPublisher
-from xiayan_mcp.themes.theme_manager import ThemeManager
+from xiayan_mcp.core.material_store import MATERIAL_TYPES, MaterialStore
+from xiayan_mcp.core.material_gc import MaterialGC
+from xiayan_mcp.core.draft_builder import MultiArticleDraftBuilder
+from xiayan_mcp.themes.templates import get_template_registry
+from xiayan_mcp.themes.theme_manager import ThemeListing, ThemePreview
 from xiayan_mcp.utils.encoding import enconding_utils
+from xiayan_mcp.utils import log
+
+logger = logging.getLogger(__name__)
 
 class XiayanMCP:
     """xiayan-mcp核心功能集成类"""
 
     def __init__(self):
         """初始化xiayan-mcp实例"""
-        self.theme_manager = ThemeManager()
         self.formatter = MarkdownFormatter()
+        # 与格式化器共用主题注册表，添加的自定义主题发布时立即可用
+        self.theme_manager = self.formatter.theme_manager
         self.publisher = WeChatPublisher()
+        self.material_store = MaterialStore(self.publisher)
+        self.material_gc = MaterialGC(self.publisher, self.material_store)
+        self.draft_builder = MultiArticleDraftBuilder(self.formatter, self.publisher)
         self.env_path = Path(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))) / '.env'
 
+    async def aclose(self) -> None:
+        """关闭共享的HTTP会话、素材镜像数据库和主题目录监听"""
+        self.theme_manager.stop_watching()
+        await self.publisher.close()
+        self.material_store.close()
+
     async def publish_article(self, **kwargs) -> Dict:
         """发布文章到微信公众号草稿箱"""
         try:
-            print("=== 开始处理文章发布 ===")
-            print(f"接收的参数: {kwargs}")
+            # 正文只记录长度，完整参数仅在DEBUG级别输出
+            log.log_event(logger, logging.DEBUG, 'web.publish.params', params=lambda: log.summarize(kwargs))
             
             # 获取必要参数
             content = kwargs.get("content", "")
@@ -49,7 +69,6 @@ class XiayanMCP:
             only_fans_can_comment = kwargs.get("only_fans_can_comment", 0)
             
             # 从Markdown内容中提取标题
-            print("提取标题...")
             title = kwargs.get("title", "")
             if not title:
                 # 从Markdown内容中提取第一个H1标题
@@ -57,42 +76,36 @@ class XiayanMCP:
                 title_match = re.match(r'^#\s+(.+)', content, re.MULTILINE)
                 if title_match:
                     title = title_match.group(1).strip()
-                    print(f"从Markdown中提取到标题: {title}")
                 else:
                     title = "未命名文章"
-                    print("未提取到标题，使用默认标题")
-            
-            print(f"标题: {title}")
-            print(f"主题ID: {theme_id}")
-            print(f"内容长度: {len(content)} 字符")
             
             # 1. 格式化Markdown内容为HTML
-            print("1. 将Markdown转换为HTML...")
             formatted_result = self.formatter.format(content, theme_id)
-            print(f"格式化结果: {list(formatted_result.keys())}")
             
             # 提取格式化后的HTML内容
             html_content = formatted_result.get("content", "")
-            print(f"HTML内容长度: {len(html_content)} 字符")
             
             # 2. 应用主题样式
-            print(f"2. 应用主题 '{theme_id}'...")
-            # 获取主题
             theme = self.theme_manager.get_theme(theme_id)
-            print(f"获取到主题: {theme.name}")
             
             # 3. 渲染最终HTML内容
-            print("3. 渲染最终HTML内容...")
-            from jinja2 import Template
-            template = Template(theme.template)
-            final_content = template.render(
+            final_content = get_template_registry().render(
+                theme,
                 content=html_content,
                 css_styles=theme.css_styles
             )
-            print(f"最终内容长度: {len(final_content)} 字符")
+            log.log_event(logger, logging.DEBUG, 'web.publish.rendered', title=title, theme=theme.name,
+                          content_chars=len(content), html_chars=len(html_content),
+                          final_chars=len(final_content))
+            
+            # 上传封面和调用接口之前检查内容大小
+            stats = formatted_result.get("stats")
+            if stats is not None:
+                problems = replace(stats, html_bytes=len(final_content.encode('utf-8'))).violations()
+                if problems:
+                    raise ContentTooLargeError(f"文章内容超出微信限制：{'；'.join(problems)}")
             
             # 4. 调用publisher的publish_to_draft方法发布到草稿箱
-            print("4. 发布到微信公众号草稿箱...")
             result = await self.publisher.publish_to_draft(
                 title=title,
                 content=final_content,
@@ -100,70 +113,78 @@ class XiayanMCP:
                 permanent_cover=permanent_cover,
                 author=author,
                 need_open_comment=need_open_comment,
-                only_fans_can_comment=only_fans_can_comment
+                only_fans_can_comment=only_fans_can_comment,
+                idempotency_key=kwargs.get("idempotency_key")
             )
-            print(f"发布结果: {result}")
             
+            if result.get("deduplicated"):
+                message = "相同内容的文章已发布过，返回已有草稿"
+            elif result.get("updated"):
+                message = "已更新之前发布的草稿"
+            else:
+                message = "文章已成功发布到微信公众号草稿箱"
             return {
-                "message": "文章已成功发布到微信公众号草稿箱",
+                "message": message,
                 "media_id": result.get("media_id"),
-                "cover_media_id": result.get("cover_media_id")
+                "cover_media_id": result.get("cover_media_id"),
+                "deduplicated": result.get("deduplicated", False),
+                "updated": result.get("updated", False)
             }
         except Exception as e:
-            print(f"发布文章失败: {str(e)}")
-            import traceback
-            print(f"错误堆栈: {traceback.format_exc()}")
+            log.log_event(logger, logging.ERROR, 'web.publish.failed', exc_info=True, error=e)
             raise Exception(f"发布文章失败: {str(e)}")
 
+    async def publish_multi_article_draft(self, **kwargs) -> Dict:
+        """将多篇文章作为一个多图文草稿发布到微信公众号草稿箱"""
+        try:
+            result = await self.draft_builder.build(
+                kwargs.get("articles", []),
+                theme_id=kwargs.get("theme_id", "default"),
+                author=kwargs.get("author", "Xiayan MCP"),
+                need_open_comment=kwargs.get("need_open_comment", 0),
+                only_fans_can_comment=kwargs.get("only_fans_can_comment", 0)
+            )
+            return {
+                "message": f"{len(result['articles'])}篇文章已作为多图文草稿发布到微信公众号草稿箱",
+                "media_id": result["media_id"],
+                "articles": result["articles"]
+            }
+        except Exception as e:
+            raise Exception(f"发布多图文草稿失败: {str(e)}")
+
     async def list_themes(self, detailed: bool = False) -> List[Dict]:
         """获取所有可用主题"""
+        return (await self.get_theme_listing(detailed)).themes
+
+    async def get_theme_listing(self, detailed: bool = False) -> ThemeListing:
+        """获取缓存的主题列表（含JSON和ETag）"""
         try:
-            # 调试信息
-            print(f"list_themes方法调用，detailed={detailed}")
-            print(f"theme_manager: {self.theme_manager}")
-            print(f"theme_manager._themes: {self.theme_manager._themes}")
-            print(f"theme_manager._themes类型: {type(self.theme_manager._themes)}")
-            
-            if detailed:
-                themes = self.theme_manager.get_available_themes()
-                print(f"detailed=True时，themes: {themes}")
-            else:
-                # 简化主题信息
-                themes = []
-                for theme_id, theme in self.theme_manager._themes.items():
-                    print(f"处理主题: {theme_id}, {theme.name}")
-                    themes.append({
-                        "id": theme.id,
-                        "name": theme.name,
-                        "description": theme.description
-                    })
-                print(f"detailed=False时，themes: {themes}")
-                print(f"themes类型: {type(themes)}")
-            
-            return themes
+            return self.theme_manager.get_theme_listing(detailed)
         except Exception as e:
-            print(f"list_themes方法异常: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.log_event(logger, logging.ERROR, 'web.list_themes.failed', exc_info=True, error=e)
             raise Exception(f"获取主题列表失败: {str(e)}")
 
     async def preview_theme(self, theme_id: str, sample_content: Optional[str] = None) -> str:
         """预览主题效果"""
+        return (await self.get_theme_preview(theme_id, sample_content)).html
+
+    async def get_theme_preview(self, theme_id: str, sample_content: Optional[str] = None) -> ThemePreview:
+        """获取缓存的主题预览（含ETag），同一主题版本和示例内容只渲染一次"""
         try:
-            return self.theme_manager.get_theme_preview(theme_id, sample_content)
+            return self.theme_manager.get_cached_preview(theme_id, sample_content)
         except Exception as e:
             raise Exception(f"预览主题失败: {str(e)}")
 
     async def add_custom_theme(self, **kwargs) -> str:
         """添加自定义主题"""
         try:
-            from src.xiayan_mcp.themes.theme import Theme
+            from xiayan_mcp.themes.theme import Theme
             
             custom_theme = Theme(
                 id=kwargs.get("id"),
                 name=kwargs.get("name"),
                 description=kwargs.get("description"),
-                template=kwargs.get("template", self.theme_manager._get_default_template()),
+                template=kwargs.get("template") or self.theme_manager._default_template,
                 css_styles=kwargs.get("css_styles", "")
             )
             
@@ -205,6 +226,7 @@ class XiayanMCP:
                 media_type=kwargs.get("media_type", "image"),
                 description=kwargs.get("description")
             )
+            self.material_store.invalidate(kwargs.get("media_type", "image"))
             return media_id
         except Exception as e:
             raise Exception(f"上传永久媒体素材失败: {str(e)}")
@@ -220,18 +242,64 @@ class XiayanMCP:
             raise Exception(f"上传新闻图片失败: {str(e)}")
 
     async def get_media_list(self, **kwargs) -> Dict:
-        """获取媒体素材列表"""
+        """获取媒体素材列表（永久素材从本地镜像读取）"""
         try:
+            media_type = kwargs.get("media_type", "image")
+            permanent = kwargs.get("permanent", True)
+            offset = kwargs.get("offset", 0)
+            count = kwargs.get("count", 20)
+            
+            if permanent and media_type in MATERIAL_TYPES:
+                if kwargs.get("refresh", False) or not self.material_store.is_synced(media_type):
+                    await self.material_store.sync([media_type])
+                return self.material_store.list_materials(media_type, offset, count)
+            
             result = await self.publisher.get_media_list(
-                media_type=kwargs.get("media_type", "image"),
-                permanent=kwargs.get("permanent", True),
-                offset=kwargs.get("offset", 0),
-                count=kwargs.get("count", 20)
+                media_type=media_type,
+                permanent=permanent,
+                offset=offset,
+                count=count
             )
             return result
         except Exception as e:
             raise Exception(f"获取媒体列表失败: {str(e)}")
 
+    async def sync_materials(self, **kwargs) -> Dict:
+        """增量同步永久素材到本地镜像"""
+        try:
+            return await self.material_store.sync(
+                kwargs.get("media_types") or None,
+                concurrency=kwargs.get("concurrency", 4)
+            )
+        except Exception as e:
+            raise Exception(f"同步素材失败: {str(e)}")
+
+    async def search_materials(self, **kwargs) -> List[Dict]:
+        """在本地镜像中搜索永久素材"""
+        try:
+            return self.material_store.search(
+                kwargs.get("query", ""),
+                media_type=kwargs.get("media_type"),
+                limit=kwargs.get("limit", 20)
+            )
+        except Exception as e:
+            raise Exception(f"搜索素材失败: {str(e)}")
+
+    async def gc_materials(self, **kwargs) -> Dict:
+        """清理未被引用或重复的永久素材（默认仅试运行）"""
+        try:
+            return await self.material_gc.run(
+                mode=kwargs.get("mode", "dry_run"),
+                include_orphans=kwargs.get("include_orphans", True),
+                include_duplicates=kwargs.get("include_duplicates", True),
+                min_age_days=kwargs.get("min_age_days", 1),
+                max_deletions=kwargs.get("max_deletions"),
+                concurrency=kwargs.get("concurrency", 4),
+                rate_per_second=kwargs.get("rate_per_second", 5)
+            )
+        except Exception as e:
+            raise Exception(f"清理素材失败: {str(e)}")
+
     async def upload_cover_image(self, **kwargs) -> str:
         """上传封面图片"""
         try:
@@ -249,6 +317,7 @@ class XiayanMCP:
                 media_id=kwargs.get("media_id")
             )
             if success:
+                self.material_store.remove(kwargs.get("media_id"))
                 return f"永久素材 {kwargs.get('media_id')} 删除成功"
             else:
                 return f"永久素材 {kwargs.get('media_id')} 删除失败"
@@ -280,6 +349,11 @@ class XiayanMCP:
             # 设置环境变量
             os.environ['WECHAT_APP_ID'] = app_id
             os.environ['WECHAT_APP_SECRET'] = app_secret
+            # 共享的publisher换用新凭证，丢弃旧凭证的access_token
+            self.publisher.app_id = app_id
+            self.publisher.app_secret = app_secret
+            self.publisher.access_token = None
+            self.publisher.token_expires_at = None
             
             if save_to_env:
                 # 保存到.env文件
@@ -3,6 +3,7 @@
 xiayan-mcp Web后端主应用
 """
 
+import logging
 import os
 import sys
 from fastapi import FastAPI
@@ -23,11 +24,14 @@ src_path = os.path.join(project_root, 'src')
 sys.path.insert(0, src_path)
 sys.path.insert(0, project_root)
 
-# 创建FastAPI应用
+from core.services import lifespan
+
+# 创建FastAPI应用，共享的XiayanMCP实例由lifespan创建和关闭
 app = FastAPI(
     title="xiayan-mcp Web API",
     description="xiayan-mcp的Web可视化界面API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置CORS中间件
@@ -61,6 +65,35 @@ async def api_root():
         "openapi": "/openapi.json"
     }
 
+# 按需性能分析：请求头X-Xiayan-Profile或环境变量XIAYAN_PROFILE开启
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from xiayan_mcp.utils import profiling
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    try:
+        mode = profiling.resolve_mode(request.headers.get(profiling.PROFILE_HEADER)) or profiling.env_mode()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    if not mode:
+        return await call_next(request)
+    async with profiling.profile(mode, f"http-{request.method}-{request.url.path}") as profiler:
+        response = await call_next(request)
+    if profiler.report.get('file'):
+        response.headers['X-Profile-File'] = profiler.report['file']
+    response.headers['X-Profile-Top'] = profiling.format_header(profiler.report)
+    return response
+
+# Prometheus指标
+from fastapi.responses import PlainTextResponse
+from xiayan_mcp.utils import metrics
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # 静态文件服务
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -90,22 +123,19 @@ async def api_path_not_found(path: str):
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from xiayan_mcp.utils import log
+
+logger = logging.getLogger(__name__)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """处理422验证错误，记录详细信息"""
-    print(f"=== 422验证错误详情 ===")
-    print(f"请求URL: {request.url}")
-    print(f"请求方法: {request.method}")
-    print(f"请求头: {dict(request.headers)}")
-    # 尝试获取请求体
-    try:
+    log.log_event(logger, logging.WARNING, 'api.validation_error', method=request.method,
+                  path=request.url.path, errors=exc.errors)
+    # 请求体只在DEBUG级别读取并截断输出
+    if logger.isEnabledFor(logging.DEBUG):
         body = await request.body()
-        print(f"请求体: {body.decode() if body else '空'}")
-    except Exception as e:
-        print(f"无法获取请求体: {e}")
-    print(f"验证错误: {exc}")
-    print(f"验证错误详情: {exc.errors()}")
+        log.log_event(logger, logging.DEBUG, 'api.validation_error.body', body=body.decode(errors='replace'))
     return JSONResponse(
         status_code=422,
         content={"detail": exc.errors()}